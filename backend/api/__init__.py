@@ -1,6 +1,11 @@
 from api.projects import router as projects_router
 from api.recordings import router as recordings_router
+from api.prompts import router as prompts_router
 from api.settings import router as settings_router
 from api.exports import router as exports_router
+from api.metrics import router as metrics_router
+from api.maintenance import router as maintenance_router
+from api.coverage import router as coverage_router
+from api.uploads import router as uploads_router
 
-__all__ = ['projects_router', 'recordings_router', 'settings_router', 'exports_router'] 
\ No newline at end of file
+__all__ = ['projects_router', 'recordings_router', 'prompts_router', 'settings_router', 'exports_router', 'metrics_router', 'maintenance_router', 'coverage_router', 'uploads_router'] 
\ No newline at end of file
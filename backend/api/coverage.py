@@ -0,0 +1,49 @@
+import csv
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request, Query
+from starlette.concurrency import run_in_threadpool
+from services.coverage_service import CoverageService, UNITS
+from utils.response_cache import response_cache, cached_json
+
+router = APIRouter(tags=["coverage"])
+
+_UNIT_PATTERN = f"^({'|'.join(UNITS)})$"
+
+
+def _corpus_lines(content: bytes, filename: str) -> list:
+    text = content.decode('utf-8-sig')
+    if filename.endswith('.csv'):
+        return [row[0] for row in csv.reader(text.splitlines()) if row and row[0].strip()]
+    return [line for line in text.splitlines() if line.strip()]
+
+
+@router.get("/projects/{project_id}/coverage")
+async def project_coverage(project_id: int, request: Request, unit: str = Query("char", pattern=_UNIT_PATTERN),
+                           rarest: int = Query(20, ge=0, le=500)):
+    """Character / bigram / word / token coverage of a project's prompts and of what is recorded so far"""
+    etag = (await response_cache.project_etag_async(project_id))[:-1] + f'-coverage-{unit}-{rarest}"'
+    return await cached_json(request, f"coverage:{project_id}:{unit}:{rarest}", etag,
+                             lambda: run_in_threadpool(CoverageService.project_coverage, project_id, unit, rarest))
+
+
+@router.post("/coverage/select")
+async def select_prompts(
+    count: int = Form(..., ge=1, le=100000),
+    unit: str = Form("char", pattern=_UNIT_PATTERN),
+    corpus: Optional[UploadFile] = File(None),
+    source_project_id: Optional[int] = Form(None),
+    project_name: Optional[str] = Form(None),
+    is_rtl: bool = Form(False),
+):
+    """Greedy pick of count prompts covering the most features, from an uploaded corpus (one prompt per
+    line, or the first column of a .csv) or an existing project; creates a project when project_name is given"""
+    if (corpus is None) == (source_project_id is None):
+        raise HTTPException(status_code=400, detail="Provide either a corpus file or source_project_id")
+    if corpus is not None:
+        texts = _corpus_lines(await corpus.read(), corpus.filename or "")
+    else:
+        texts = await run_in_threadpool(CoverageService.project_texts, source_project_id)
+
+    if project_name:
+        return await run_in_threadpool(CoverageService.create_project_from_selection, texts, count, project_name, unit, is_rtl)
+    return await run_in_threadpool(CoverageService.select_prompts, texts, count, unit)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from services.fsck_service import FsckService
+from utils.logging import log_interaction
+
+router = APIRouter(tags=["maintenance"])
+
+@router.post("/maintenance/fsck", status_code=202)
+def start_fsck(repair: bool = False, force: bool = False):
+    """force repairs even when the storage path looks unmounted (no files, or most recordings missing)"""
+    job = FsckService.start_job(repair, force)
+    log_interaction("fsck", {"job_id": job["id"], "repair": repair, "force": force})
+    return job
+
+@router.get("/maintenance/fsck")
+def list_fsck_jobs():
+    return {"jobs": FsckService.list_jobs()}
+
+@router.get("/maintenance/fsck/{job_id}")
+def get_fsck_job(job_id: str):
+    job = FsckService.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from utils.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,12 +1,19 @@
 import csv
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from services.project_service import ProjectService
+from services.recording_service import RecordingService
+from services.sampling_service import SamplingService
 from utils.logging import logger
+from utils.response_cache import response_cache, cached_json
 
 router = APIRouter(tags=["projects"])
 
 @router.post("/upload_csv/")
-async def upload_csv(file: UploadFile = File(...), project_name: str = Form(...), is_rtl: bool = Form(False)):
+async def upload_csv(file: UploadFile = File(...), project_name: str = Form(...), is_rtl: bool = Form(False),
+                     dedupe_across_projects: bool = Form(False)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
@@ -25,10 +32,12 @@ async def upload_csv(file: UploadFile = File(...), project_name: str = Form(...)
     if not prompts:
         raise HTTPException(status_code=400, detail="No valid prompts found in CSV")
     
-    return ProjectService.create_project_with_prompts(project_name, prompts, is_rtl)
+    return await run_in_threadpool(ProjectService.create_project_with_prompts, project_name, prompts, is_rtl,
+                                   dedupe_across_projects)
 
 @router.post("/create_project/")
-async def create_project_with_text(project_name: str = Form(...), prompts_text: str = Form(...), is_rtl: bool = Form(False)):
+async def create_project_with_text(project_name: str = Form(...), prompts_text: str = Form(...), is_rtl: bool = Form(False),
+                                   dedupe_across_projects: bool = Form(False)):
     """Create a project with prompts from multi-line text input"""
     if not prompts_text.strip():
         logger.error(f"no prompts provided")
@@ -41,20 +50,64 @@ async def create_project_with_text(project_name: str = Form(...), prompts_text:
     if not prompts:
         raise HTTPException(status_code=400, detail="No valid prompts found in text")
     
-    return ProjectService.create_project_with_prompts(project_name, prompts, is_rtl)
+    return await run_in_threadpool(ProjectService.create_project_with_prompts, project_name, prompts, is_rtl,
+                                   dedupe_across_projects)
+
+@router.post("/create_project/sample")
+async def create_project_from_sample(
+    project_name: str = Form(...),
+    count: int = Form(..., ge=1, le=1000000),
+    corpus: Optional[UploadFile] = File(None),
+    local_path: Optional[str] = Form(None),
+    seed: Optional[int] = Form(None),
+    min_length: int = Form(1, ge=1),
+    max_length: int = Form(500, ge=1),
+    charset: str = Form("any"),
+    strata: str = Form(""),
+    equal_strata: bool = Form(False),
+    is_rtl: bool = Form(False),
+):
+    """Create a project from a reproducible sample of count lines of a large text corpus (uploaded, or a
+    path inside CORPUS_DIR; .gz is decompressed on the fly), streamed in one pass in constant memory.
+    charset: any, latin, arabic or the allowed letters themselves; strata: length edges, e.g. 40,80"""
+    if (corpus is None) == (local_path is None):
+        raise HTTPException(status_code=400, detail="Provide either a corpus file or local_path")
+    if corpus is not None:
+        # the multipart parser has already spooled the upload to a temporary file
+        source, name = corpus.file, corpus.filename or ""
+    else:
+        source = name = SamplingService.local_corpus_path(local_path)
+    return await run_in_threadpool(
+        SamplingService.create_project_from_sample, project_name, source, count, is_rtl,
+        seed=seed, min_length=min_length, max_length=max_length, charset=charset, strata=strata,
+        equal_strata=equal_strata, gzipped=name.endswith(".gz"))
 
 @router.get("/projects/")
-def list_projects():
-    return ProjectService.list_projects()
+async def list_projects(request: Request):
+    return await cached_json(request, "projects", await response_cache.list_etag_async(),
+                             ProjectService.list_projects_async)
 
 @router.get("/projects/{project_id}")
-def get_project(project_id: int):
-    return ProjectService.get_project(project_id)
+async def get_project(project_id: int, request: Request):
+    return await cached_json(request, f"project:{project_id}", await response_cache.project_etag_async(project_id),
+                             lambda: ProjectService.get_project_async(project_id))
 
 @router.get("/projects/{project_id}/recordings")
-def get_project_recordings(project_id: int):
-    from services.recording_service import RecordingService
-    return RecordingService.get_project_recordings(project_id)
+async def get_project_recordings(project_id: int, request: Request,
+                                 shape: str = Query("rows", alias="format", pattern="^(rows|columns)$")):
+    """format=columns returns {"columns": {field: [values]}}, smaller and faster to parse for large projects"""
+    columns = shape == "columns"
+    etag = await response_cache.project_etag_async(project_id)
+    if columns:
+        etag = etag[:-1] + '-columns"'
+    return await cached_json(request, f"recordings:{project_id}:{shape}", etag,
+                             lambda: RecordingService.get_project_recordings_async(project_id, columns))
+
+@router.get("/projects/{project_id}/recordings/stream")
+async def stream_project_recordings(project_id: int, batch_size: int = Query(1000, ge=1, le=50000)):
+    """Recordings as newline-delimited JSON, streamed from a server-side cursor"""
+    chunks = await RecordingService.stream_project_recordings(project_id, batch_size)
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
 
 @router.delete("/projects/{project_id}")
 def delete_project(project_id: int):
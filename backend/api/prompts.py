@@ -0,0 +1,15 @@
+from typing import Optional
+from fastapi import APIRouter, Query
+from services.search_service import SearchService
+
+router = APIRouter(tags=["prompts"])
+
+@router.get("/prompts/search")
+async def search_prompts(
+    q: str = Query(..., min_length=1, max_length=500),
+    project_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Ranked full-text search over the prompts of all projects (or one project)"""
+    return await SearchService.search_prompts_async(q, project_id, limit, offset)
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Response
 from services.recording_service import RecordingService
 
 router = APIRouter(tags=["recordings"])
 
 @router.post("/upload_audio/")
-async def upload_audio(text: str = Form(...), audio: UploadFile = File(...), project_id: int = Form(...)):
-    return RecordingService.upload_audio(text, audio, project_id)
+async def upload_audio(response: Response, text: str = Form(...), audio: UploadFile = File(...), project_id: int = Form(...)):
+    """WAV is stored as sent; WebM / Ogg / MP4 recordings get 202 and are converted in the background"""
+    result = await RecordingService.upload_audio_async(text, audio, project_id)
+    if result["status"] == "processing":
+        response.status_code = 202
+    return result
 
 @router.post("/delete_audio/")
-async def delete_audio(text: str = Form(...), project_id: int = Form(...)):
+def delete_audio(text: str = Form(...), project_id: int = Form(...)):
     return RecordingService.delete_audio(text, project_id)
 
 @router.get("/list_recordings/")
@@ -0,0 +1,53 @@
+from typing import Optional
+from fastapi import APIRouter, Form, Header, HTTPException, Request, Response
+from services.resumable_upload_service import ResumableUploadService
+
+router = APIRouter(tags=["uploads"])
+
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+@router.post("/uploads/", status_code=201)
+async def create_upload(response: Response, text: str = Form(...), project_id: int = Form(...),
+                        length: int = Form(..., ge=1)):
+    """Start a resumable upload of a recording of length bytes; send the bytes to the Location with PATCH"""
+    upload = await ResumableUploadService.create(text, project_id, length)
+    response.headers["Location"] = f"/uploads/{upload['upload_id']}"
+    response.headers["Upload-Offset"] = "0"
+    return upload
+
+
+@router.head("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Bytes received so far (Upload-Offset), where a client resumes after a dropped connection"""
+    upload = await ResumableUploadService.status(upload_id)
+    return Response(status_code=200, headers={
+        "Upload-Offset": str(upload["offset"]),
+        "Upload-Length": str(upload["length"]),
+        "Cache-Control": "no-store",
+    })
+
+
+@router.patch("/uploads/{upload_id}", status_code=204)
+async def upload_chunk(upload_id: str, request: Request, upload_offset: int = Header(..., ge=0),
+                       content_type: str = Header(...), content_length: Optional[int] = Header(None, ge=0)):
+    """Append the request body at Upload-Offset, which must equal the bytes received so far"""
+    if content_type.split(";")[0].strip() != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Chunks must be sent as {CHUNK_CONTENT_TYPE}")
+    offset = await ResumableUploadService.append(upload_id, upload_offset, request.stream(), content_length)
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, response: Response):
+    """Store the completed upload as the prompt's recording, same response as /upload_audio/"""
+    result = await ResumableUploadService.finalize(upload_id)
+    if result["status"] == "processing":
+        response.status_code = 202
+    return result
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def cancel_upload(upload_id: str):
+    await ResumableUploadService.cancel(upload_id)
+    return Response(status_code=204)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Coverage analysis benchmark
+Times building the sentence x feature matrix and the greedy prompt selection over a synthetic
+corpus (mixed Latin / Arabic sentences) for each unit. No database is involved.
+
+    python benchmarks/bench_coverage.py --sentences 1000000 --select 1000 --units char,bigram,word --output coverage.json
+"""
+
+import os
+import sys
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.coverage_service import FeatureMatrix, greedy_select, UNITS
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import prompt_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=100000)
+    parser.add_argument("--select", type=int, default=1000, help="Prompts to pick")
+    parser.add_argument("--units", default="char,bigram,word")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    units = args.units.split(",")
+    unknown = [unit for unit in units if unit not in UNITS]
+    if unknown:
+        parser.error(f"unknown units: {', '.join(unknown)}")
+
+    print(f"🌱 Generating {args.sentences} sentences", file=sys.stderr)
+    rng = random.Random(42)
+    texts = [prompt_text(rng, 1, i, rng.random() < 0.5) for i in range(args.sentences)]
+
+    results = {}
+    for unit in units:
+        print(f"⏱️  {unit}", file=sys.stderr)
+        results[f"{unit}_build"] = time_call(lambda: FeatureMatrix(texts, unit), args.repeat, warmup=0)
+        matrix = FeatureMatrix(texts, unit)
+        results[f"{unit}_select"] = time_call(lambda: greedy_select(matrix, args.select), args.repeat, warmup=0)
+        selected, curve = greedy_select(matrix, args.select)
+        results[f"{unit}_coverage"] = {
+            "features": matrix.shape[1],
+            "covered": curve[-1] if curve else 0,
+            "prompts_to_full_coverage": next((i + 1 for i, covered in enumerate(curve) if covered == matrix.shape[1]), None),
+        }
+
+    write_results("coverage", results, args.output, sentences=args.sentences, select=args.select)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Legacy JSON prompts migration benchmark
+Builds a pre-prompts-table SQLite database (prompts as a JSON column on projects, recordings
+without prompt_id) and times migrate_legacy_prompts, the chunked insert + set-based link used
+by schema migration 4, against the previous per-project / per-recording implementation.
+The database is rebuilt (untimed) before every run.
+
+    python benchmarks/bench_prompt_migration.py --projects 100 --prompts 1000000 --recordings 500000 --output prompt_migration.json
+"""
+
+import os
+import sys
+import json
+import random
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from models.database import Base, Recording
+from database.migration import migrate_legacy_prompts
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import prompt_text, _insert_chunks
+
+
+def build_legacy_database(path: str, projects: int, prompts: int, recordings: int, seed_value: int = 42):
+    """Fresh SQLite database in the layout migration 4 expects"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(seed_value)
+    prompts_per_project = max(1, prompts // projects)
+    recordings_per_project = min(prompts_per_project, recordings // projects)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        conn.execute(text("ALTER TABLE projects ADD COLUMN prompts TEXT"))
+        recording_rows = []
+        for p in range(projects):
+            texts = [prompt_text(rng, p + 1, i, rng.random() < 0.5) for i in range(prompts_per_project)]
+            conn.execute(text("INSERT INTO projects (id, name, is_rtl, created_at, prompts) VALUES (:id, :name, 0, :now, :prompts)"),
+                         {"id": p + 1, "name": f"legacy-{p + 1}", "now": now, "prompts": json.dumps(texts, ensure_ascii=False)})
+            recording_rows.extend({
+                "text": texts[i], "filename": hashlib.md5(texts[i].encode()).hexdigest() + '.wav',
+                "project_id": p + 1, "recorded_at": now,
+            } for i in range(recordings_per_project))
+        _insert_chunks(conn, Recording.__table__, recording_rows)
+    return engine
+
+
+def row_by_row_migration(conn):
+    """The implementation migration 4 used before the bulk path: a COUNT per project, a lookup and update per recording"""
+    projects = conn.execute(text("SELECT id, prompts FROM projects WHERE prompts IS NOT NULL")).fetchall()
+    for project_id, prompts_json in projects:
+        if conn.execute(text("SELECT COUNT(*) FROM prompts WHERE project_id = :project_id"), {"project_id": project_id}).scalar():
+            continue
+        prompts = json.loads(prompts_json)
+        if prompts:
+            now = datetime.utcnow()
+            conn.execute(
+                text("INSERT INTO prompts (project_id, text, order_index, created_at) VALUES (:project_id, :text, :order_index, :created_at)"),
+                [{"project_id": project_id, "text": prompt, "order_index": index, "created_at": now} for index, prompt in enumerate(prompts)]
+            )
+    for recording_id, recording_text, project_id in conn.execute(
+        text("SELECT id, text, project_id FROM recordings WHERE prompt_id IS NULL")
+    ).fetchall():
+        prompt_id = conn.execute(
+            text("SELECT id FROM prompts WHERE project_id = :project_id AND text = :text"),
+            {"project_id": project_id, "text": recording_text}
+        ).scalar()
+        if prompt_id is not None:
+            conn.execute(text("UPDATE recordings SET prompt_id = :prompt_id WHERE id = :recording_id"),
+                         {"prompt_id": prompt_id, "recording_id": recording_id})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqlite", default=os.path.join(tempfile.gettempdir(), "tts_bench_legacy.db"))
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--prompts", type=int, default=100000, help="Total prompts, spread evenly over the projects")
+    parser.add_argument("--recordings", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Prompt rows per insert")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-row-by-row", action="store_true", help="Only time the bulk migration (the old path is slow at scale)")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    def setup():
+        print(f"🌱 Building legacy database ({args.projects} projects, {args.prompts} prompts, {args.recordings} recordings)", file=sys.stderr)
+        return build_legacy_database(args.sqlite, args.projects, args.prompts, args.recordings)
+
+    def timed(migration):
+        def run(engine):
+            with engine.begin() as conn:
+                migration(conn)
+            engine.dispose()
+        return run
+
+    cases = {"bulk": lambda conn: migrate_legacy_prompts(conn, args.chunk_size)}
+    if not args.skip_row_by_row:
+        cases["row_by_row"] = row_by_row_migration
+
+    results = {}
+    for name, migration in cases.items():
+        print(f"⏱️  {name}", file=sys.stderr)
+        results[name] = time_call(timed(migration), args.repeat, warmup=0, setup=setup)
+
+    # sanity check: every recording should be linked to its prompt
+    engine = setup()
+    with engine.begin() as conn:
+        migrate_legacy_prompts(conn, args.chunk_size)
+        results["linked_recordings"] = conn.execute(text("SELECT COUNT(*) FROM recordings WHERE prompt_id IS NOT NULL")).scalar()
+    engine.dispose()
+
+    write_results("prompt_migration", results, args.output, projects=args.projects, prompts=args.prompts,
+                  recordings=args.recordings, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
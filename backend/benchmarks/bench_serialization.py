@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Serialization and compression benchmark for the project / recordings listing payloads
+Builds synthetic payloads shaped like get_project and get_project_recordings (latin and RTL
+text, row and column shapes) and reports render time for the FastAPI default path
+(jsonable_encoder + json), jsonable_encoder + orjson, and orjson on the plain dicts (what the
+cached listing endpoints do), plus body size raw / gzip / brotli and compression time.
+
+    python benchmarks/bench_serialization.py --rows 100000 --repeat 5 --output serialization.json
+"""
+
+import os
+import sys
+import zlib
+import random
+import argparse
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import prompt_text
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RENDERERS = {
+    "fastapi_default": lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+    "fastapi_orjson": lambda payload: ORJSONResponse(jsonable_encoder(payload)).body,
+    "orjson_direct": lambda payload: ORJSONResponse(payload).body,
+}
+
+
+def build_payloads(rows: int, rtl: bool, seed_value: int = 42):
+    rng = random.Random(seed_value)
+    prompts = [prompt_text(rng, 1, i, rtl) for i in range(rows)]
+    recorded_at = datetime.utcnow().isoformat() + 'Z'
+    recordings = [{
+        "text": text,
+        "filename": f"{i:032x}.wav",
+        "prompt_id": i + 1,
+        "order_index": i,
+        "recorded_at": recorded_at,
+    } for i, text in enumerate(prompts)]
+    columns = {field: [row[field] for row in recordings] for field in recordings[0]} if recordings else {}
+    return {
+        "project": {
+            "id": 1, "name": "bench", "is_rtl": rtl, "created_at": recorded_at, "prompts": prompts,
+            "total_prompts": rows, "recorded_count": rows, "last_recorded_index": rows - 1,
+        },
+        "recordings_rows": {"recordings": recordings},
+        "recordings_columns": {"format": "columns", "count": rows, "columns": columns},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Prompts / recordings per payload")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = {}
+    for script, rtl in (("latin", False), ("rtl", True)):
+        for name, payload in build_payloads(args.rows, rtl).items():
+            case = f"{name}_{script}"
+            print(f"⏱️  {case}", file=sys.stderr)
+            for renderer, render in RENDERERS.items():
+                results[f"{case}_{renderer}"] = time_call(lambda: render(payload), args.repeat, args.warmup)
+
+            body = RENDERERS["orjson_direct"](payload)
+            sizes = {"raw_bytes": len(body)}
+            gzip_timing = time_call(lambda: zlib.compress(body, args.gzip_level, wbits=31), args.repeat, args.warmup)
+            sizes["gzip_bytes"] = len(zlib.compress(body, args.gzip_level, wbits=31))
+            sizes["gzip_median_ms"] = gzip_timing["median_ms"]
+            if brotli is not None:
+                brotli_timing = time_call(lambda: brotli.compress(body, quality=args.brotli_quality), args.repeat, args.warmup)
+                sizes["br_bytes"] = len(brotli.compress(body, quality=args.brotli_quality))
+                sizes["br_median_ms"] = brotli_timing["median_ms"]
+            results[f"{case}_size"] = sizes
+
+    write_results("serialization", results, args.output, rows=args.rows,
+                  gzip_level=args.gzip_level, brotli_quality=args.brotli_quality)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Service layer microbenchmarks
+Seeds a local SQLite database (or the configured MySQL database with --mysql) with synthetic
+data, times the service methods and writes machine-readable json results. The listings and
+uploads are timed through their async methods (the ones the routes await) on one event loop.
+
+    python benchmarks/bench_services.py --projects 1000 --prompts 1000000 --recordings 500000 --output before.json
+    python benchmarks/compare.py before.json after.json
+"""
+
+import os
+import io
+import sys
+import random
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqlite", default=os.path.join(tempfile.gettempdir(), "tts_bench.db"), help="SQLite database file")
+    parser.add_argument("--mysql", action="store_true", help="Use the MySQL database from the environment instead of SQLite")
+    parser.add_argument("--storage", default=None, help="Recordings directory (defaults to <sqlite>.recordings)")
+    parser.add_argument("--fresh", action="store_true", help="Delete the SQLite database and storage before seeding")
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--prompts", type=int, default=100000, help="Total prompts over all projects")
+    parser.add_argument("--recordings", type=int, default=20000, help="Total recordings over all projects")
+    parser.add_argument("--new-project-prompts", type=int, default=1000, help="Prompts per project created by create_project_with_prompts")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--s3-bucket", default="", help="Also time export_to_s3 against this bucket")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write json results here instead of stdout")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Point the application config at the benchmark database before anything imports it"""
+    if not args.mysql:
+        os.environ["SQLITE_DATABASE"] = args.sqlite
+        os.environ["MYSQL_PASSWORD_FILE"] = ""
+    storage = args.storage or (args.sqlite + ".recordings")
+    if args.fresh and not args.mysql:
+        import shutil
+        if os.path.exists(args.sqlite):
+            os.remove(args.sqlite)
+        shutil.rmtree(storage, ignore_errors=True)
+    return storage
+
+
+def main():
+    args = parse_args()
+    storage_path = configure_environment(args)
+
+    from sqlalchemy import select, func as sql_func
+    from database.connection import engine
+    from database.async_connection import async_engine, async_read_engine
+    from database.migration import migrate_schema
+    from models.database import Project, Prompt, Recording
+    from services.project_service import ProjectService
+    from services.recording_service import RecordingService
+    from services.settings_service import SettingsService
+    from services.export_service import ExportService
+    from benchmarks.common import time_call, write_results
+    from benchmarks.synthetic import seed, wav_bytes
+
+    log = lambda message: print(message, file=sys.stderr)
+    rng = random.Random(args.seed)
+
+    migrate_schema()
+    with engine.connect() as conn:
+        existing_projects = conn.execute(select(sql_func.count()).select_from(Project.__table__)).scalar()
+    if existing_projects:
+        log(f"♻️  Reusing existing database with {existing_projects} projects")
+        dataset = {"projects": existing_projects, "reused": True}
+    else:
+        dataset = seed(engine, args.projects, args.prompts, args.recordings, storage_path,
+                       seed_value=args.seed, progress=log)
+    SettingsService.set_setting("storage_path", storage_path)
+
+    with engine.connect() as conn:
+        project_ids = [row[0] for row in conn.execute(select(Project.id))]
+        unrecorded = conn.execute(
+            select(Prompt.project_id, Prompt.text)
+            .outerjoin(Recording, Recording.prompt_id == Prompt.id)
+            .where(Recording.id.is_(None))
+            .limit(args.repeat + args.warmup)
+        ).all()
+
+    audio = wav_bytes()
+    results = {}
+    # the async engines' connections belong to the loop that opened them, so every async call shares one
+    loop = asyncio.new_event_loop()
+    run = loop.run_until_complete
+    # services print interactions to stdout, keep stdout clean for the json results
+    with contextlib.redirect_stdout(sys.stderr):
+        log("⏱️  ProjectService.list_projects_async")
+        results["project.list_projects"] = time_call(
+            lambda: run(ProjectService.list_projects_async()), args.repeat, args.warmup
+        )
+
+        log("⏱️  ProjectService.get_project_async")
+        results["project.get_project"] = time_call(
+            lambda project_id: run(ProjectService.get_project_async(project_id)),
+            args.repeat, args.warmup, setup=lambda: rng.choice(project_ids)
+        )
+
+        log("⏱️  RecordingService.get_project_recordings_async")
+        results["recording.get_project_recordings"] = time_call(
+            lambda project_id: run(RecordingService.get_project_recordings_async(project_id)),
+            args.repeat, args.warmup, setup=lambda: rng.choice(project_ids)
+        )
+
+        if len(unrecorded) > args.warmup:
+            log("⏱️  RecordingService.upload_audio_async")
+            pending = iter(unrecorded)
+            results["recording.upload_audio"] = time_call(
+                lambda prompt: run(RecordingService.upload_audio_async(
+                    prompt[1], SimpleNamespace(file=io.BytesIO(audio)), prompt[0]
+                )),
+                min(args.repeat, len(unrecorded) - args.warmup), args.warmup, setup=lambda: next(pending)
+            )
+
+        log("⏱️  ProjectService.create_project_with_prompts")
+        counter = iter(range(10 ** 9))
+        results["project.create_project_with_prompts"] = time_call(
+            lambda new: ProjectService.create_project_with_prompts(new[0], new[1]),
+            args.repeat, args.warmup,
+            setup=lambda: (
+                f"bench-new-{rng.getrandbits(48):x}-{next(counter)}",
+                [f"new prompt {i} {rng.random()}" for i in range(args.new_project_prompts)]
+            )
+        )
+
+        log("⏱️  ExportService.build_dataset_rows")
+        results["export.build_dataset_rows"] = time_call(
+            lambda project_id: ExportService.build_dataset_rows(project_id, storage_path),
+            args.repeat, args.warmup, setup=lambda: rng.choice(project_ids)
+        )
+
+        try:
+            log("⏱️  ExportService.build_hf_dataset")
+            results["export.build_hf_dataset"] = time_call(
+                ExportService.build_hf_dataset, max(1, args.repeat // 4), 1,
+                setup=lambda: ExportService.build_dataset_rows(rng.choice(project_ids), storage_path)[1] or
+                              [{"audio": "missing.wav", "text": "", "prompt_id": 0, "order_index": 0, "recorded_at": None}]
+            )
+        except ImportError as e:
+            log(f"⚠️  Skipping Hugging Face dataset build: {e}")
+
+        if args.s3_bucket:
+            log("⏱️  ExportService.export_to_s3")
+            SettingsService.set_setting("s3_bucket", args.s3_bucket)
+            results["export.export_to_s3"] = time_call(lambda: ExportService.export_to_s3(None), 1, 0)
+
+    # aiosqlite connections run in their own threads, which would keep the process alive
+    run(async_engine.dispose())
+    if async_read_engine is not async_engine:
+        run(async_read_engine.dispose())
+    loop.close()
+
+    write_results(
+        "services", results, args.output,
+        database="mysql" if args.mysql else "sqlite",
+        dataset=dataset,
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
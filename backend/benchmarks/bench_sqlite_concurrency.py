@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write benchmark for SQLite journaling modes
+Seeds one database per mode, then runs reader threads (project recordings listing) against
+writer threads (single-row recording inserts) for a fixed duration and reports throughput,
+latency and lock errors for each mode.
+
+    python benchmarks/bench_sqlite_concurrency.py --readers 8 --writers 2 --duration 10 --output sqlite.json
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SQLITE_DATABASE", os.path.join(tempfile.gettempdir(), "tts_concurrency_app.db"))
+os.environ.setdefault("MYSQL_PASSWORD_FILE", "")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from config import DatabaseConfig
+from database.sqlite import apply_sqlite_pragmas
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import seed
+
+READ_QUERY = text("""
+    SELECT r.text, r.filename, r.prompt_id, p.order_index, r.recorded_at
+    FROM recordings r JOIN prompts p ON r.prompt_id = p.id
+    WHERE r.project_id = :project_id
+    ORDER BY p.order_index
+""")
+WRITE_QUERY = text("""
+    INSERT INTO recordings (text, filename, recorded_at, project_id, prompt_id)
+    VALUES (:text, :filename, :recorded_at, :project_id, :prompt_id)
+""")
+
+MODES = {
+    "default": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "tuned": None,  # DatabaseConfig.get_sqlite_pragmas()
+}
+
+
+def run_mode(name: str, pragmas: dict, args, log):
+    path = os.path.join(args.workdir, f"tts_concurrency_{name}.db")
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    engine = create_engine(
+        f"sqlite:///{path}",
+        pool_size=args.readers + args.writers,
+        connect_args={"check_same_thread": False, "timeout": args.busy_timeout / 1000},
+    )
+    apply_sqlite_pragmas(engine, {**pragmas, "busy_timeout": args.busy_timeout})
+    log(f"🌱 Seeding {name} database")
+    dataset = seed(engine, args.projects, args.prompts, args.recordings,
+                   os.path.join(args.workdir, f"tts_concurrency_{name}.recordings"), progress=log)
+    prompts_per_project = dataset["prompts_per_project"]
+
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(kind: str, seed_value: int):
+        rng = random.Random(seed_value)
+        local, failed = [], 0
+        with engine.connect() as conn:
+            while time.monotonic() < deadline:
+                project_id = rng.randint(1, args.projects)
+                start = time.perf_counter()
+                try:
+                    if kind == "read":
+                        conn.execute(READ_QUERY, {"project_id": project_id}).fetchall()
+                        conn.rollback()
+                    else:
+                        conn.execute(WRITE_QUERY, {
+                            "text": "benchmark write", "filename": f"{uuid.uuid4().hex}.wav",
+                            "recorded_at": datetime.utcnow(), "project_id": project_id,
+                            "prompt_id": (project_id - 1) * prompts_per_project + rng.randint(1, prompts_per_project),
+                        })
+                        conn.commit()
+                    local.append(time.perf_counter() - start)
+                except OperationalError:
+                    conn.rollback()
+                    failed += 1
+        with lock:
+            latencies[kind].extend(local)
+            errors[kind] += failed
+
+    log(f"⏱️  Running {name}: {args.readers} readers / {args.writers} writers for {args.duration}s")
+    threads = [threading.Thread(target=worker, args=("read", i)) for i in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=("write", 1000 + i)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    result = {"pragmas": pragmas}
+    for kind in ("read", "write"):
+        result[kind] = {
+            "ops_per_sec": round(len(latencies[kind]) / args.duration, 1),
+            "errors": errors[kind],
+            **(summarize(latencies[kind]) if latencies[kind] else {"runs": 0}),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per mode")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--prompts", type=int, default=50000)
+    parser.add_argument("--recordings", type=int, default=10000)
+    parser.add_argument("--busy-timeout", type=int, default=DatabaseConfig.SQLITE_BUSY_TIMEOUT_MS, help="Milliseconds")
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    log = lambda message: print(message, file=sys.stderr)
+    results = {}
+    for name, pragmas in MODES.items():
+        results[name] = run_mode(name, pragmas if pragmas is not None else DatabaseConfig.get_sqlite_pragmas(), args, log)
+    write_results("sqlite_concurrency", results, args.output,
+                  readers=args.readers, writers=args.writers, duration=args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Startup import-time and memory check
+Imports the application packages in a fresh interpreter under `python -X importtime`, reports
+total import time, peak RSS and the slowest modules, and fails when a budget is exceeded or
+when one of the heavy export dependencies gets imported at startup.
+
+    python benchmarks/bench_startup.py --max-import-ms 1500 --max-rss-mb 150 --output startup.json
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import BACKEND_DIR, summarize, write_results
+
+# only needed by exports, must never be imported when a worker boots
+HEAVY_MODULES = ("boto3", "botocore", "datasets", "pandas", "pyarrow", "huggingface_hub")
+
+CHILD_SCRIPT = """
+import sys, resource
+sys.path.insert(0, {backend!r})
+import {modules}
+print("RSS_KB", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print("MODULES", ",".join(sorted(m for m in sys.modules if "." not in m)))
+"""
+
+
+def run_once(modules: str, env: dict):
+    script = CHILD_SCRIPT.format(backend=BACKEND_DIR, modules=modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        env=env, cwd=tempfile.gettempdir(), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import failed:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        total_us += int(self_us)
+        cumulative[name.strip()] = int(cumulative_us)
+
+    rss_kb = 0
+    loaded = []
+    for line in proc.stdout.splitlines():
+        if line.startswith("RSS_KB"):
+            rss_kb = int(line.split()[1])
+        elif line.startswith("MODULES"):
+            loaded = line.split(" ", 1)[1].split(",")
+    return total_us / 1e6, rss_kb / 1024, cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default="api, services", help="Modules imported at startup")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Report the N slowest top-level imports")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="Fail if peak RSS after import exceeds this")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("SQLITE_DATABASE", os.path.join(tempfile.gettempdir(), "tts_startup_check.db"))
+    env.setdefault("MYSQL_PASSWORD_FILE", "")
+
+    durations, rss_values = [], []
+    for _ in range(args.repeat):
+        seconds, rss_mb, cumulative, loaded = run_once(args.modules, env)
+        durations.append(seconds)
+        rss_values.append(rss_mb)
+
+    heavy_loaded = sorted(set(HEAVY_MODULES) & set(loaded))
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+    top_level = [(name, us) for name, us in slowest if "." not in name][:args.top]
+
+    import_stats = summarize(durations)
+    results = {
+        "import": import_stats,
+        "rss_mb": {"max": round(max(rss_values), 1), "min": round(min(rss_values), 1)},
+        "heavy_modules_loaded": heavy_loaded,
+        "slowest_imports_ms": {name: round(us / 1000, 2) for name, us in top_level},
+    }
+    write_results("startup", results, args.output, modules=args.modules, repeat=args.repeat)
+
+    failures = []
+    if heavy_loaded:
+        failures.append(f"heavy export dependencies imported at startup: {', '.join(heavy_loaded)}")
+    if args.max_import_ms is not None and import_stats["median_ms"] > args.max_import_ms:
+        failures.append(f"median import time {import_stats['median_ms']}ms > {args.max_import_ms}ms")
+    if args.max_rss_mb is not None and max(rss_values) > args.max_rss_mb:
+        failures.append(f"peak RSS {max(rss_values):.1f}MB > {args.max_rss_mb}MB")
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Compressed upload benchmark
+Synthesizes speech-like takes (voiced harmonics with a moving pitch, syllable envelope, pauses
+and a noise floor), encodes them the way browsers' MediaRecorder does (Opus in WebM and Ogg at
+the given bitrates) and reports upload bytes per second of audio against WAV at 48 kHz (what a
+client-side WAV encoder sends) and at 16 kHz (the storage format). Then converts the WebM takes
+back to 16 kHz mono WAV through a spawned process pool with transcode_to_wav, the function the
+transcode service runs, and reports throughput per pool size.
+
+    python benchmarks/bench_transcode.py --takes 32 --seconds 6 --workers 1,2,4 --output transcode.json
+
+Needs ffmpeg (--ffmpeg, default FFMPEG_PATH) with libopus.
+"""
+
+import io
+import os
+import sys
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import write_results
+from utils.audio_utils import transcode_to_wav
+from config import AppConfig
+
+CONTAINERS = ("webm", "ogg")
+
+
+def speech_like(rng: np.random.Generator, seconds: float, sample_rate: int) -> np.ndarray:
+    """Mono float signal in [-1, 1] with the spectral and temporal shape of read speech"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 150 + 40 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi)) + 15 * rng.standard_normal() * np.sin(2 * np.pi * 3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 2
+    pauses = (np.sin(2 * np.pi * 0.35 * t + rng.uniform(0, np.pi)) > -0.6).astype(float)
+    signal = 0.3 * voiced * syllables * pauses + 0.01 * rng.standard_normal(len(t))
+    return np.clip(signal, -1, 1)
+
+
+def wav_bytes(signal: np.ndarray, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((signal * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def encode(ffmpeg: str, source: str, target: str, container: str, bitrate: int):
+    subprocess.run([ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", source, "-c:a", "libopus",
+                    "-b:a", str(bitrate), "-f", container, target], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--takes", type=int, default=32, help="Synthetic recordings")
+    parser.add_argument("--seconds", type=float, default=6, help="Length of each recording")
+    parser.add_argument("--bitrates", default="24000,32000,48000", help="Opus bitrates (bits/s), comma separated")
+    parser.add_argument("--workers", default="1,2,4", help="Transcode pool sizes, comma separated")
+    parser.add_argument("--ffmpeg", default=AppConfig.FFMPEG_PATH)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if shutil.which(args.ffmpeg) is None:
+        parser.error(f"{args.ffmpeg} not found, pass --ffmpeg")
+    bitrates = [int(bitrate) for bitrate in args.bitrates.split(",")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tts_transcode_")
+    rng = np.random.default_rng(42)
+    audio_seconds = args.takes * args.seconds
+
+    print(f"🎙️  Encoding {args.takes} takes of {args.seconds}s", file=sys.stderr)
+    sizes = {"wav_48k": 0, "wav_16k": 0}
+    webm_takes = {bitrate: [] for bitrate in bitrates}
+    for take in range(args.takes):
+        signal = speech_like(rng, args.seconds, 48000)
+        source = os.path.join(workdir, f"take{take}.wav")
+        with open(source, "wb") as out:
+            out.write(wav_bytes(signal, 48000))
+        sizes["wav_48k"] += os.path.getsize(source)
+        sizes["wav_16k"] += len(wav_bytes(signal[::3], 16000))
+        for bitrate in bitrates:
+            for container in CONTAINERS:
+                target = os.path.join(workdir, f"take{take}.{bitrate}.{container}")
+                encode(args.ffmpeg, source, target, container, bitrate)
+                key = f"{container}_{bitrate // 1000}k"
+                sizes[key] = sizes.get(key, 0) + os.path.getsize(target)
+                if container == "webm":
+                    webm_takes[bitrate].append(target)
+
+    results = {"upload_size": {
+        name: {
+            "bytes_per_audio_second": round(total / audio_seconds),
+            "vs_wav_48k": round(sizes["wav_48k"] / total, 1),
+            "vs_wav_16k": round(sizes["wav_16k"] / total, 1),
+        } for name, total in sizes.items()
+    }}
+
+    takes = webm_takes[bitrates[len(bitrates) // 2]]
+    context = multiprocessing.get_context("spawn")
+    for workers in [int(count) for count in args.workers.split(",")]:
+        print(f"⏱️  Converting {len(takes)} takes with {workers} pool process(es)", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            list(pool.map(int, range(workers)))  # start the processes before timing
+            start = time.perf_counter()
+            futures = [pool.submit(transcode_to_wav, take, take + ".out.wav", args.ffmpeg, AppConfig.AUDIO_SAMPLE_RATE, 300)
+                       for take in takes]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+        with wave.open(takes[0] + ".out.wav") as converted:
+            assert (converted.getframerate(), converted.getnchannels()) == (AppConfig.AUDIO_SAMPLE_RATE, 1)
+        results[f"transcode_workers_{workers}"] = {
+            "seconds": round(elapsed, 3),
+            "takes_per_second": round(len(takes) / elapsed, 1),
+            "audio_seconds_per_second": round(audio_seconds / elapsed, 1),
+        }
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    write_results("transcode", results, args.output, takes=args.takes, seconds=args.seconds,
+                  bitrates=args.bitrates, cpus=os.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+'''
+shared helpers for the benchmark scripts: timing, summaries and the json result format
+every benchmark writes: {"benchmark": ..., "meta": {...}, "results": {case: {stats}}}
+'''
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def summarize(samples: list) -> dict:
+    """Summary statistics in milliseconds for a list of durations in seconds"""
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(ordered[p95_index] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def time_call(func, repeat: int = 5, warmup: int = 1, setup=None) -> dict:
+    """Time func() repeat times after warmup calls; setup() runs untimed before each call and its result is passed in"""
+    samples = []
+    for i in range(warmup + repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+def write_results(benchmark: str, results: dict, output: str = None, **meta):
+    """Write benchmark results as json to output (or stdout)"""
+    payload = {
+        "benchmark": benchmark,
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + 'Z',
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": results,
+    }
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w") as out:
+            out.write(text + "\n")
+        print(f"📊 Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+    return payload
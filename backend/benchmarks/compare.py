@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.10
+Exits with status 1 when any case's median got slower than the threshold allows.
+"""
+
+import sys
+import json
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown of the median")
+    parser.add_argument("--metric", default="median_ms")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{'case':45} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    regressions = []
+    for case, stats in candidate["results"].items():
+        before = baseline["results"].get(case, {}).get(args.metric)
+        after = stats.get(args.metric)
+        if before is None or after is None:
+            print(f"{case:45} {'-':>12} {after if after is not None else '-':>12} {'new':>9}")
+            continue
+        change = (after - before) / before if before else 0.0
+        marker = ""
+        if change > args.threshold:
+            regressions.append(case)
+            marker = " ❌"
+        print(f"{case:45} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{marker}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Multi-worker HTTP load test
+Starts the app under `uvicorn --workers N` for each worker count, seeds a project through the
+API, then runs a mixed workload (recordings listing, project detail, prompt search, audio
+uploads) from client processes for a fixed duration and reports throughput, latency and errors
+per worker count, with the scaling efficiency relative to the smallest count.
+
+    python benchmarks/load_test.py --workers 1,2,4,8 --clients 64 --duration 30 --output load.json
+
+Each worker count gets a fresh SQLite database and storage directory in --workdir; pass --mysql
+to use the MySQL server configured in the environment instead (the app's own MYSQL_* settings).
+Scaling is bounded by the machine: give the server at least as many cores as workers and keep
+the clients (--client-procs) on cores of their own, or run them from another host with --url.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import multiprocessing
+from urllib.parse import urlencode, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import BACKEND_DIR, summarize, write_results
+from benchmarks.synthetic import prompt_text, wav_bytes
+
+OPERATIONS = ("recordings", "project", "search", "upload")
+
+
+def _multipart(fields: dict, file_field: str, filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: audio/wav\r\n\r\n'.encode() + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Client:
+    """Keep-alive HTTP connection that reconnects after errors"""
+
+    def __init__(self, url: str, timeout: float = 30):
+        parsed = urlparse(url)
+        self.host, self.port, self.timeout = parsed.hostname, parsed.port or 80, timeout
+        self.connection = None
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except Exception:
+            self.connection.close()
+            self.connection = None
+            raise
+
+
+def wait_until_ready(url: str, timeout: float, server=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}, see server.log")
+        try:
+            status, _ = Client(url, timeout=2).request("GET", "/projects/")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not become ready within {timeout}s")
+
+
+def seed_project(url: str, prompts: int, storage_path: str):
+    """Create the project the clients work on, returns (project_id, prompt texts)"""
+    client = Client(url, timeout=300)
+    if storage_path:
+        status, body = client.request("POST", "/settings/", json.dumps({"storage_path": storage_path}).encode(),
+                                      {"Content-Type": "application/json"})
+        if status != 200:
+            raise RuntimeError(f"setting storage_path failed: {status} {body[:200]}")
+    rng = random.Random(7)
+    run = uuid.uuid4().hex[:8]
+    texts = [prompt_text(rng, 0, i, rng.random() < 0.3) + f" {run}" for i in range(prompts)]
+    body = urlencode({"project_name": f"load-test-{run}", "prompts_text": "\n".join(texts)}).encode()
+    status, response = client.request("POST", "/create_project/", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    if status != 200:
+        raise RuntimeError(f"project creation failed: {status} {response[:200]}")
+    return json.loads(response)["project_id"], texts
+
+
+def client_process(url: str, threads: int, duration: float, mix: list, project_id: int, texts: list, seed: int, queue):
+    """Runs threads closed-loop clients for duration seconds, puts {op: [latencies]} and error counts on queue"""
+    audio = wav_bytes(1000)
+    search_terms = [text.split()[0] for text in texts[:200]]
+    latencies = {op: [] for op in OPERATIONS}
+    errors = {op: 0 for op in OPERATIONS}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def run(thread_seed: int):
+        rng = random.Random(thread_seed)
+        client = Client(url)
+        local = {op: [] for op in OPERATIONS}
+        local_errors = {op: 0 for op in OPERATIONS}
+        while time.monotonic() < deadline:
+            op = rng.choices(OPERATIONS, weights=mix)[0]
+            if op == "recordings":
+                args = ("GET", f"/projects/{project_id}/recordings")
+            elif op == "project":
+                args = ("GET", f"/projects/{project_id}")
+            elif op == "search":
+                args = ("GET", "/prompts/search?" + urlencode({"q": rng.choice(search_terms), "project_id": project_id}))
+            else:
+                body, content_type = _multipart({"text": rng.choice(texts), "project_id": project_id}, "audio", "take.wav", audio)
+                args = ("POST", "/upload_audio/", body, {"Content-Type": content_type})
+            start = time.perf_counter()
+            try:
+                status, _ = client.request(*args)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                local[op].append(elapsed)
+            else:
+                local_errors[op] += 1
+        with lock:
+            for op in OPERATIONS:
+                latencies[op].extend(local[op])
+                errors[op] += local_errors[op]
+
+    workers = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put((latencies, errors))
+
+
+def start_server(workers: int, port: int, workdir: str, use_mysql: bool, log):
+    env = dict(os.environ)
+    env.update({
+        "WEB_CONCURRENCY": str(workers),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "prometheus"),
+        # admission limits are per process and would cap the single worker runs, not the server
+        "ADMISSION_ENABLED": "false",
+        "REPLICATION_ENABLED": "false",
+    })
+    if not use_mysql:
+        env["SQLITE_DATABASE"] = os.path.join(workdir, "load_test.db")
+        env["MYSQL_PASSWORD_FILE"] = ""
+    os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    # run from the work directory (relative paths such as logs.log land there), with an empty
+    # static directory standing in for the frontend build
+    os.makedirs(os.path.join(workdir, "static"), exist_ok=True)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=log, start_new_session=True
+    )
+
+
+def stop_server(server):
+    if server.poll() is None:
+        os.killpg(server.pid, signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+
+def run_load(url: str, args, mix: list, project_id: int, texts: list) -> dict:
+    queue = multiprocessing.Queue()
+    threads = max(1, args.clients // args.client_procs)
+    procs = [multiprocessing.Process(target=client_process, args=(url, threads, args.duration, mix, project_id, texts, i, queue))
+             for i in range(args.client_procs)]
+    for proc in procs:
+        proc.start()
+    outcomes = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    results = {"requests": 0, "errors": 0}
+    for op in OPERATIONS:
+        samples = [sample for latencies, _ in outcomes for sample in latencies[op]]
+        errors = sum(errors[op] for _, errors in outcomes)
+        results["requests"] += len(samples)
+        results["errors"] += errors
+        if samples:
+            results[op] = {**summarize(samples), "errors": errors}
+    results["throughput_rps"] = round(results["requests"] / args.duration, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated uvicorn worker counts")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent closed-loop clients")
+    parser.add_argument("--client-procs", type=int, default=2, help="Client processes the clients are spread over")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per worker count")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of untimed load before each run")
+    parser.add_argument("--prompts", type=int, default=2000, help="Prompts in the seeded project")
+    parser.add_argument("--mix", default="recordings=40,project=20,search=20,upload=20", help="Operation weights")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", default=None, help="Load an already running server instead (single run)")
+    parser.add_argument("--mysql", action="store_true", help="Use the MySQL configured in the environment")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    weights = dict(item.split("=") for item in args.mix.split(","))
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    mix = [float(weights.get(op, 0)) for op in OPERATIONS]
+    worker_counts = [int(count) for count in args.workers.split(",")] if args.url is None else [None]
+    cpus = os.cpu_count() or 1
+    if args.url is None and max(worker_counts) + args.client_procs > cpus:
+        print(f"⚠️  {cpus} CPUs for up to {max(worker_counts)} workers and {args.client_procs} client processes: "
+              f"throughput cannot scale past the core count", file=sys.stderr)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tts_load_")
+    results = {}
+    for workers in worker_counts:
+        label = "external" if workers is None else f"workers_{workers}"
+        run_dir = os.path.join(workdir, label)
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.makedirs(run_dir)
+        server = None
+        with open(os.path.join(run_dir, "server.log"), "w") as log:
+            try:
+                if workers is None:
+                    url = args.url
+                else:
+                    url = f"http://127.0.0.1:{args.port}"
+                    print(f"🚀 Starting {workers} worker(s)", file=sys.stderr)
+                    server = start_server(workers, args.port, run_dir, args.mysql, log)
+                wait_until_ready(url, timeout=120, server=server)
+                project_id, texts = seed_project(url, args.prompts, None if workers is None else os.path.join(run_dir, "recordings"))
+                if args.warmup > 0:
+                    run_load(url, argparse.Namespace(**{**vars(args), "duration": args.warmup}), mix, project_id, texts)
+                print(f"⏱️  {label}: {args.clients} clients for {args.duration}s", file=sys.stderr)
+                results[label] = run_load(url, args, mix, project_id, texts)
+                print(f"   {results[label]['throughput_rps']} req/s, {results[label]['errors']} errors", file=sys.stderr)
+            finally:
+                if server is not None:
+                    stop_server(server)
+
+    if len(worker_counts) > 1:
+        base_workers = worker_counts[0]
+        base = results[f"workers_{base_workers}"]["throughput_rps"]
+        results["scaling"] = {
+            f"workers_{workers}": {
+                "speedup": round(results[f"workers_{workers}"]["throughput_rps"] / base, 2) if base else None,
+                "efficiency": round(results[f"workers_{workers}"]["throughput_rps"] / base / (workers / base_workers), 2) if base else None,
+            } for workers in worker_counts
+        }
+    write_results("load_test", results, args.output, clients=args.clients, client_procs=args.client_procs,
+                  duration=args.duration, mix=args.mix, cpus=cpus, database="mysql" if args.mysql else "sqlite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import io
+import sys
+import wave
+import random
+import hashlib
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import Project, Prompt, Recording
+from database.migration import migrate_schema
+from utils.text_utils import prompt_hash
+
+'''
+synthetic data generator for the benchmarks.
+seeds projects, prompts and recordings (plus small wav files on disk) with core executemany
+inserts so that millions of rows load in a reasonable time. generation is deterministic for a seed.
+'''
+
+LATIN_WORDS = (
+    "the quick brown fox jumps over lazy dog voice data speech model record sample "
+    "morning evening river mountain city language market window garden yellow silent"
+).split()
+ARABIC_WORDS = (
+    "السلام عليكم صباح الخير مساء النور كتاب مدرسة مدينة شمس قمر بحر جبل طريق "
+    "سوق نافذة حديقة لغة صوت كلمة جملة"
+).split()
+
+CHUNK_SIZE = 10000
+
+
+def prompt_text(rng: random.Random, project_index: int, prompt_index: int, rtl: bool) -> str:
+    """A random sentence; the trailing index keeps texts (and therefore filenames) globally unique"""
+    words = ARABIC_WORDS if rtl else LATIN_WORDS
+    sentence = " ".join(rng.choice(words) for _ in range(rng.randint(4, 14)))
+    return f"{sentence} {project_index}-{prompt_index}"
+
+
+def wav_bytes(duration_ms: int = 100, sample_rate: int = 16000) -> bytes:
+    """A small mono 16-bit silent wav"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * (sample_rate * duration_ms // 1000))
+    return buffer.getvalue()
+
+
+def _insert_chunks(conn, table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        conn.execute(table.insert(), chunk)
+
+
+def seed(engine, projects: int, prompts: int, recordings: int, storage_path: str,
+         rtl_fraction: float = 0.5, wav_ms: int = 100, seed_value: int = 42, progress=print):
+    """Seed an empty database; prompts and recordings are spread evenly over the projects"""
+    rng = random.Random(seed_value)
+    migrate_schema(engine)
+    os.makedirs(storage_path, exist_ok=True)
+
+    prompts_per_project = max(1, prompts // projects)
+    recordings_per_project = min(prompts_per_project, recordings // projects)
+    audio = wav_bytes(wav_ms)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        progress(f"🌱 Seeding {projects} projects")
+        project_rtl = [rng.random() < rtl_fraction for _ in range(projects)]
+        _insert_chunks(conn, Project.__table__, (
+            {"id": p + 1, "name": f"bench-project-{p + 1}", "is_rtl": int(project_rtl[p]), "created_at": now}
+            for p in range(projects)
+        ))
+
+    recording_texts = []
+
+    def prompt_rows():
+        prompt_id = 0
+        for p in range(projects):
+            for i in range(prompts_per_project):
+                prompt_id += 1
+                text = prompt_text(rng, p + 1, i, project_rtl[p])
+                if i < recordings_per_project:
+                    recording_texts.append((p + 1, prompt_id, text))
+                yield {"id": prompt_id, "project_id": p + 1, "text": text, "text_hash": prompt_hash(text),
+                       "order_index": i, "created_at": now}
+            if (p + 1) % max(1, projects // 10) == 0:
+                progress(f"  📝 {prompt_id} prompts")
+
+    with engine.begin() as conn:
+        progress(f"🌱 Seeding {prompts_per_project * projects} prompts")
+        _insert_chunks(conn, Prompt.__table__, prompt_rows())
+
+    def recording_rows():
+        for count, (project_id, prompt_id, text) in enumerate(recording_texts, start=1):
+            filename = hashlib.md5(text.encode()).hexdigest() + '.wav'
+            with open(os.path.join(storage_path, filename), "wb") as f:
+                f.write(audio)
+            if count % 50000 == 0:
+                progress(f"  🎵 {count} recordings")
+            yield {"text": text, "filename": filename, "project_id": project_id, "prompt_id": prompt_id, "recorded_at": now}
+
+    with engine.begin() as conn:
+        progress(f"🌱 Seeding {len(recording_texts)} recordings into {storage_path}")
+        _insert_chunks(conn, Recording.__table__, recording_rows())
+
+    return {
+        "projects": projects,
+        "prompts": prompts_per_project * projects,
+        "recordings": len(recording_texts),
+        "prompts_per_project": prompts_per_project,
+        "recordings_per_project": recordings_per_project,
+    }
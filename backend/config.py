@@ -17,9 +17,27 @@ class DatabaseConfig:
     
     # SQLite Configuration (default)
     SQLITE_DATABASE = os.getenv('SQLITE_DATABASE', 'data/tts_dataset.db')
+    # Probe MySQL at startup and fall back to a local SQLite file if it is unreachable (on by default,
+    # small sites rely on it); false skips the probe and fails at the first query instead
+    SQLITE_FALLBACK = os.getenv('DB_SQLITE_FALLBACK', 'true').lower() == 'true'
+    
+    # SQLite tuning, applied to every new connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+
+    # Optional read replica (SQLAlchemy URL, e.g. mysql+pymysql://... or sqlite:///data/replica.db);
+    # read-only service methods use it, writes and the writing client's following reads go to the primary
+    READ_REPLICA_URL = os.getenv('DB_READ_REPLICA_URL', '')
+    # Seconds after a write during which that client's reads stay on the primary (covers replication lag)
+    READ_AFTER_WRITE_SECONDS = float(os.getenv('DB_READ_AFTER_WRITE_SECONDS', 2))
     
     @classmethod
     def get_db_password(cls):
+        if not cls.MYSQL_PASSWORD_FILE:
+            return ''
         with open(cls.MYSQL_PASSWORD_FILE, 'r') as file:
             return file.read() 
          
@@ -37,6 +55,19 @@ class DatabaseConfig:
             print(f"failed to retrieve mysql creds, defaulting to sqlite connection creds...")
             return f"sqlite:///{cls.SQLITE_DATABASE}"
     
+    @classmethod
+    def get_sqlite_pragmas(cls):
+        """PRAGMAs for SQLite connections, in the order they must be applied"""
+        return {
+            # only takes effect on new databases, existing ones are converted by a schema migration
+            "auto_vacuum": "INCREMENTAL",
+            "journal_mode": cls.SQLITE_JOURNAL_MODE,
+            "synchronous": cls.SQLITE_SYNCHRONOUS,
+            "busy_timeout": cls.SQLITE_BUSY_TIMEOUT_MS,
+            "cache_size": -cls.SQLITE_CACHE_SIZE_KB,  # negative values are KiB
+            "mmap_size": cls.SQLITE_MMAP_SIZE,
+        }
+    
     @classmethod
     def validate_config(cls):
         """Validate database configuration"""
@@ -59,11 +90,92 @@ class AppConfig:
     # Export Timeouts
     HF_EXPORT_TIMEOUT = int(os.getenv('HF_EXPORT_TIMEOUT', 300))
     S3_EXPORT_TIMEOUT = int(os.getenv('S3_EXPORT_TIMEOUT', 300))
+    S3_EXPORT_CONCURRENCY = int(os.getenv('S3_EXPORT_CONCURRENCY', 8))  # parallel uploads per export
+    
+    # Metrics Configuration
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    STORAGE_METRICS_TTL = int(os.getenv('STORAGE_METRICS_TTL', 60))  # seconds between storage directory rescans
+    
+    # Database Maintenance (ANALYZE / incremental vacuum after bulk deletes and periodically)
+    DB_MAINTENANCE_ENABLED = os.getenv('DB_MAINTENANCE_ENABLED', 'true').lower() == 'true'
+    DB_MAINTENANCE_DELAY = int(os.getenv('DB_MAINTENANCE_DELAY', 30))  # seconds to wait for more deletes before running
+    DB_MAINTENANCE_INTERVAL = int(os.getenv('DB_MAINTENANCE_INTERVAL', 21600))  # periodic run, in seconds
+    
+    # Response compression (brotli is used when the package is installed and the client accepts it)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Rendered response cache behind the ETags of the listing endpoints
+    RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', 256))
+    RESPONSE_CACHE_MAX_MB = int(os.getenv('RESPONSE_CACHE_MAX_MB', 64))
+    
+    # Background removal of deleted projects' rows and files
+    CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', 1000))  # rows / files per transaction
+    CLEANUP_INTERVAL = int(os.getenv('CLEANUP_INTERVAL', 3600))  # periodic sweep, in seconds
+    
+    # Multi-worker / multi-node deployment (uvicorn --workers defaults to WEB_CONCURRENCY)
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+    # cache version stamps and background job leases kept in the database instead of the process;
+    # on by default with several workers, set it to true for several single-worker nodes
+    SHARED_STATE = os.getenv('SHARED_STATE', 'true' if WEB_CONCURRENCY > 1 else 'false').lower() == 'true'
+    SHARED_STATE_TTL = float(os.getenv('SHARED_STATE_TTL', 1.0))  # seconds a process reuses version stamps it read
+    
+    # Admission control: concurrent requests and wait queue per route class (a limit of 0 disables the class)
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_UPLOADS_LIMIT = int(os.getenv('ADMISSION_UPLOADS_LIMIT', 16))  # /upload_audio/, /delete_audio/, /uploads/
+    ADMISSION_UPLOADS_QUEUE = int(os.getenv('ADMISSION_UPLOADS_QUEUE', 64))
+    ADMISSION_EXPORTS_LIMIT = int(os.getenv('ADMISSION_EXPORTS_LIMIT', 2))  # exports, bulk imports, coverage selection
+    ADMISSION_EXPORTS_QUEUE = int(os.getenv('ADMISSION_EXPORTS_QUEUE', 4))
+    ADMISSION_LISTINGS_LIMIT = int(os.getenv('ADMISSION_LISTINGS_LIMIT', 16))  # project / recording listings, search, audio
+    ADMISSION_LISTINGS_QUEUE = int(os.getenv('ADMISSION_LISTINGS_QUEUE', 64))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))  # seconds queued before a 503
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 2))  # Retry-After seconds sent with the 503
+    
+    # Resumable uploads (POST /uploads/, then PATCH chunks, then POST /uploads/{id}/finalize)
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 1024 ** 3))  # largest Upload-Length accepted
+    UPLOAD_EXPIRY = int(os.getenv('UPLOAD_EXPIRY', 86400))  # seconds without a chunk before a partial upload is collected
+    
+    # Compressed browser recordings (WebM / Ogg Opus, MP4 AAC) are acknowledged at once and
+    # converted to 16 kHz mono WAV, the sampling rate of the Hugging Face export, by ffmpeg
+    FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
+    TRANSCODE_WORKERS = int(os.getenv('TRANSCODE_WORKERS', 2))  # conversion processes per worker process
+    TRANSCODE_QUEUE_LIMIT = int(os.getenv('TRANSCODE_QUEUE_LIMIT', 64))  # waiting conversions before uploads get 503
+    TRANSCODE_TIMEOUT = int(os.getenv('TRANSCODE_TIMEOUT', 300))  # seconds per file
+    AUDIO_SAMPLE_RATE = 16000  # of the stored WAV files, declared by the Hugging Face export
+    
+    # Directory of server-local corpora that POST /create_project/sample may read (empty disables local paths)
+    CORPUS_DIR = os.getenv('CORPUS_DIR', '')
+    
+    # Storage / database consistency check (fsck.py, POST /maintenance/fsck)
+    FSCK_ORPHAN_GRACE = int(os.getenv('FSCK_ORPHAN_GRACE', 3600))  # seconds before an unreferenced file may be deleted
+    FSCK_MAX_MISSING_FRACTION = float(os.getenv('FSCK_MAX_MISSING_FRACTION', 0.1))  # more missing files than this refuses repair
+    
+    # Profiling Configuration
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))  # fraction of requests profiled
+    PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile')  # request header forcing a profile
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 500))  # 0 disables slow query logging
+    
+    # Write-behind replication of new recordings to the S3 bucket from the settings
+    REPLICATION_ENABLED = os.getenv('REPLICATION_ENABLED', 'false').lower() == 'true'
+    REPLICATION_CONCURRENCY = int(os.getenv('REPLICATION_CONCURRENCY', 4))  # parallel uploads
+    REPLICATION_BATCH_SIZE = int(os.getenv('REPLICATION_BATCH_SIZE', 100))  # jobs claimed per round
+    REPLICATION_POLL_INTERVAL = int(os.getenv('REPLICATION_POLL_INTERVAL', 30))  # seconds, new uploads wake it up immediately
+    REPLICATION_RETRY_BASE = int(os.getenv('REPLICATION_RETRY_BASE', 10))  # seconds, doubled per failed attempt
+    REPLICATION_RETRY_MAX = int(os.getenv('REPLICATION_RETRY_MAX', 3600))
+    REPLICATION_LEASE = int(os.getenv('REPLICATION_LEASE', 600))  # seconds claimed jobs are hidden from other workers
+    REPLICATION_BACKFILL = os.getenv('REPLICATION_BACKFILL', 'true').lower() == 'true'  # queue older unreplicated recordings at startup
     
     # AWS Configuration
     AWS_ACCESS_KEY_ID_FILE = os.getenv('AWS_ACCESS_KEY_ID', '')
     AWS_SECRET_ACCESS_KEY_FILE = os.getenv('AWS_SECRET_ACCESS_KEY', '')
     AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '') or None  # S3 compatible stand-in, e.g. http://localhost:9000 (MinIO)
     
     # Hugging Face Configuration
     HUGGINGFACE_TOKEN_FILE = os.getenv('HUGGINGFACE_TOKEN_FILE', '/run/secrets/hf_token')
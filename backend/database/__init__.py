@@ -1,4 +1,12 @@
-from database.connection import engine, SessionLocal
+from database.connection import engine, SessionLocal, read_engine, ReadSessionLocal
+from database.async_connection import async_engine, AsyncSessionLocal, async_read_engine, AsyncReadSessionLocal
+from database.routing import read_session, async_read_session, mark_write
 from database.session import get_db
+from database.coordination import version_stamps, acquire_lease, WORKER_ID
 
-__all__ = ['engine', 'SessionLocal', 'get_db'] 
\ No newline at end of file
+__all__ = [
+    'engine', 'SessionLocal', 'read_engine', 'ReadSessionLocal',
+    'async_engine', 'AsyncSessionLocal', 'async_read_engine', 'AsyncReadSessionLocal',
+    'read_session', 'async_read_session', 'mark_write', 'get_db',
+    'version_stamps', 'acquire_lease', 'WORKER_ID'
+]
@@ -0,0 +1,43 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .connection import engine, read_engine
+from .sqlite import apply_sqlite_pragmas, is_sqlite
+
+'''
+asyncio engine and sessions for the I/O bound request paths (aiosqlite / aiomysql).
+it points at the same database as the sync engine, which stays in use for the remaining
+services and for scripts such as migrate_sqlite_to_mysql.py
+'''
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(url):
+    """Swap the sync DBAPI driver of a URL for its asyncio counterpart"""
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def create_async_engine_for(sync_engine):
+    """asyncio engine for the same database as a sync engine, with matching settings"""
+    if is_sqlite(sync_engine):
+        # aiosqlite defaults to NullPool, which reconnects (and drops the page cache) on every session
+        async_engine = create_async_engine(to_async_url(sync_engine.url), poolclass=AsyncAdaptedQueuePool)
+        apply_sqlite_pragmas(async_engine.sync_engine)
+        return async_engine
+    return create_async_engine(
+        to_async_url(sync_engine.url),
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=10,
+        max_overflow=20
+    )
+
+
+async_engine = create_async_engine_for(engine)
+async_read_engine = async_engine if read_engine is engine else create_async_engine_for(read_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
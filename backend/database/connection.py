@@ -7,6 +7,8 @@ from sqlalchemy.orm import sessionmaker
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import DatabaseConfig
+from utils.metrics import TimedQueuePool
+from database.sqlite import apply_sqlite_pragmas
 
 # Database configuration
 DATABASE_URL = DatabaseConfig.get_database_url()
@@ -15,28 +17,53 @@ engine = None
 # Check if we should use MySQL or SQLite
 if DATABASE_URL.startswith('mysql'):
     print(f"Retrieved db url: {DATABASE_URL}")
-    try:
-        engine = create_engine(
-            DATABASE_URL, 
-            pool_pre_ping=True, 
+    engine = create_engine(
+        DATABASE_URL, 
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True, 
+        pool_recycle=3600,
+        pool_size=10,
+        max_overflow=20
+    )
+    print (f"Created db engine {engine}")
+    # Connections are opened lazily (the first one is the schema version check at startup);
+    # the probe is only needed for the SQLite fallback, on unless DB_SQLITE_FALLBACK=false
+    if DatabaseConfig.SQLITE_FALLBACK:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1")).fetchone()
+            print("✅ Connected to MySQL database")
+        except Exception as e:
+            print(f"⚠️  MySQL connection failed: {e}")
+            print("🔄 Falling back to SQLite for development...")
+            # Fallback to SQLite
+            engine = create_engine('sqlite:///tts_dataset.db', poolclass=TimedQueuePool, connect_args={"check_same_thread": False})
+            apply_sqlite_pragmas(engine)
+            print("✅ Connected to SQLite database")
+else:
+    # Use SQLite directly
+    engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine)
+    print("✅ Connected to SQLite database")
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Optional read replica for the read-only service methods (routing in database/routing.py)
+if DatabaseConfig.READ_REPLICA_URL:
+    if DatabaseConfig.READ_REPLICA_URL.startswith('mysql'):
+        read_engine = create_engine(
+            DatabaseConfig.READ_REPLICA_URL,
+            poolclass=TimedQueuePool,
+            pool_pre_ping=True,
             pool_recycle=3600,
             pool_size=10,
             max_overflow=20
         )
-        print (f"Created db engine {engine}")
-        # Test the connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1")).fetchone()
-        print("✅ Connected to MySQL database")
-    except Exception as e:
-        print(f"⚠️  MySQL connection failed: {e}")
-        print("🔄 Falling back to SQLite for development...")
-        # Fallback to SQLite
-        engine = create_engine('sqlite:///tts_dataset.db', connect_args={"check_same_thread": False})
-        print("✅ Connected to SQLite database")
+    else:
+        read_engine = create_engine(DatabaseConfig.READ_REPLICA_URL, poolclass=TimedQueuePool, connect_args={"check_same_thread": False})
+        apply_sqlite_pragmas(read_engine)
+    print(f"✅ Using read replica {read_engine.url.render_as_string(hide_password=True)}")
 else:
-    # Use SQLite directly
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    print("✅ Connected to SQLite database")
+    read_engine = engine
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) 
\ No newline at end of file
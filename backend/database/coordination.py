@@ -0,0 +1,112 @@
+import os
+import time
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, insert, or_, text
+from sqlalchemy.exc import IntegrityError
+from models.database import CacheVersion, Lease
+from .connection import engine
+from .async_connection import async_engine
+from config import AppConfig
+
+'''
+coordination between processes that share the database (several uvicorn workers, several nodes).
+version stamps: a counter per cache scope in cache_versions, incremented after each write, so a
+process notices writes made by the others and drops its cached copies. each process trusts the
+stamps it read for SHARED_STATE_TTL seconds, which bounds how stale another worker's cache can be.
+leases: a named row in leases that one worker holds until it expires, for background work that
+should not run everywhere at once.
+statements run in their own short transactions outside the session lock; code on the event loop
+reads the stamps with get_async, which refreshes them through the asyncio engine.
+'''
+
+WORKER_ID = f"{socket.gethostname()[:40]}-{os.getpid()}-{os.urandom(2).hex()}"
+
+
+def _increment_statement(dialect: str):
+    if dialect == "mysql":
+        return text("INSERT INTO cache_versions (scope, version) VALUES (:scope, 1) ON DUPLICATE KEY UPDATE version = version + 1")
+    return text("INSERT INTO cache_versions (scope, version) VALUES (:scope, 1) ON CONFLICT (scope) DO UPDATE SET version = version + 1")
+
+
+class VersionStamps:
+    """Per-process view of the cache_versions counters, refreshed at most once per ttl and scope"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._read_at = {}
+        self._increment = _increment_statement(engine.dialect.name)
+
+    def get(self, *scopes) -> tuple:
+        now = time.monotonic()
+        stale = self._stale(scopes, now)
+        if stale:
+            with engine.connect() as conn:
+                self._store(stale, conn.execute(self._select(stale)).all(), now)
+        return self._current(scopes)
+
+    async def get_async(self, *scopes) -> tuple:
+        """get() for code on the event loop: a refresh goes through the asyncio engine"""
+        now = time.monotonic()
+        stale = self._stale(scopes, now)
+        if stale:
+            async with async_engine.connect() as conn:
+                self._store(stale, (await conn.execute(self._select(stale))).all(), now)
+        return self._current(scopes)
+
+    def _stale(self, scopes, now: float) -> list:
+        with self._lock:
+            return [scope for scope in scopes if now - self._read_at.get(scope, -self.ttl - 1) > self.ttl]
+
+    @staticmethod
+    def _select(scopes):
+        return select(CacheVersion.scope, CacheVersion.version).where(CacheVersion.scope.in_(scopes))
+
+    def _store(self, stale, rows, now: float):
+        versions = dict(rows)
+        with self._lock:
+            for scope in stale:
+                self._versions[scope] = versions.get(scope, 0)
+                self._read_at[scope] = now
+
+    def _current(self, scopes) -> tuple:
+        with self._lock:
+            return tuple(self._versions.get(scope, 0) for scope in scopes)
+
+    def bump(self, *scopes):
+        """Increment the scopes' stamps; this process sees the new values right away"""
+        with engine.begin() as conn:
+            for scope in scopes:
+                conn.execute(self._increment, {"scope": scope})
+            versions = conn.execute(self._select(scopes)).all()
+        now = time.monotonic()
+        with self._lock:
+            for scope, version in versions:
+                self._versions[scope] = version
+                self._read_at[scope] = now
+
+
+def acquire_lease(name: str, ttl: float) -> bool:
+    """Take or renew the named lease for ttl seconds; False while another worker holds it"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    with engine.begin() as conn:
+        taken = conn.execute(update(Lease).where(
+            Lease.name == name,
+            or_(Lease.owner == WORKER_ID, Lease.expires_at <= now)
+        ).values(owner=WORKER_ID, expires_at=expires_at)).rowcount
+    if taken:
+        return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(Lease).values(name=name, owner=WORKER_ID, expires_at=expires_at))
+        return True
+    except IntegrityError:
+        return False
+
+
+# None when the process keeps its cache versions to itself (single worker)
+version_stamps = VersionStamps(AppConfig.SHARED_STATE_TTL) if AppConfig.SHARED_STATE else None
@@ -1,120 +1,345 @@
-from sqlalchemy import text
-from .connection import engine, SessionLocal
+import os
+import json
+from datetime import datetime
+from contextlib import contextmanager
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import DBAPIError
+from models.database import Base, SchemaVersion, ReplicationJob, ExportManifest, CacheVersion, Lease, UploadSession, StoragePurge
+from utils.text_utils import prompt_hash
+from .connection import engine
 from .session import session_lock
 from utils.logging import logger
 
-def migrate_schema():
-    """Handle schema migrations for existing databases"""
-    with session_lock:
-        db = SessionLocal()
+'''
+versioned schema migrations.
+the applied version is kept in the schema_version table, so booting against an up to date
+database costs a single SELECT. steps run in order, each in its own transaction together with
+its schema_version row, and are written to be idempotent (MySQL commits DDL implicitly, and
+databases created before versioning may already have some of the changes).
+steps receive a Connection and must work on both SQLite and MySQL.
+every worker migrates at startup; a database level lock (GET_LOCK on MySQL, a lock file next to
+the SQLite database) lets one of them apply the steps while the others wait and then re-check.
+'''
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+
+def _add_column_if_missing(conn, table: str, column: str, ddl: str):
+    if _has_column(conn, table, column):
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    print(f"✅ Added {column} column to {table} table")
+
+
+def create_tables(conn):
+    """Create every missing table from the models"""
+    Base.metadata.create_all(bind=conn)
+
+
+def add_recording_prompt_id(conn):
+    _add_column_if_missing(conn, "recordings", "prompt_id", "INTEGER")
+
+
+def add_project_is_rtl(conn):
+    _add_column_if_missing(conn, "projects", "is_rtl", "INTEGER DEFAULT 0")
+
+
+LEGACY_PROJECTS_PER_BATCH = 100
+LEGACY_PROMPTS_CHUNK_SIZE = 10000
+
+
+def migrate_legacy_prompts(conn, chunk_size: int = LEGACY_PROMPTS_CHUNK_SIZE):
+    """Move prompts stored as a JSON column on projects into the prompts table and link recordings to them"""
+    if not _has_column(conn, "projects", "prompts"):
+        return
+
+    print("🔄 Migrating JSON prompts to the prompts table...")
+    total = conn.execute(text("SELECT COUNT(*) FROM projects WHERE prompts IS NOT NULL")).scalar()
+    # projects that already have prompt rows were migrated by an earlier, interrupted run
+    select_projects = text("""
+        SELECT id, name, prompts FROM projects
+        WHERE prompts IS NOT NULL AND id > :after
+        AND NOT EXISTS (SELECT 1 FROM prompts WHERE prompts.project_id = projects.id)
+        ORDER BY id LIMIT :limit
+    """)
+    insert_prompts = text(
+        "INSERT INTO prompts (project_id, text, order_index, created_at) VALUES (:project_id, :text, :order_index, :created_at)"
+    )
+    after, seen, migrated, chunk = 0, 0, 0, []
+    now = datetime.utcnow()
+    while True:
+        projects = conn.execute(select_projects, {"after": after, "limit": LEGACY_PROJECTS_PER_BATCH}).fetchall()
+        if not projects:
+            break
+        for project_id, project_name, prompts_json in projects:
+            try:
+                prompts = json.loads(prompts_json) if isinstance(prompts_json, str) else (prompts_json or [])
+            except ValueError as e:
+                print(f"  ⚠️  Skipping project {project_name}, invalid prompts JSON: {e}")
+                continue
+            for index, prompt in enumerate(prompts):
+                chunk.append({"project_id": project_id, "text": prompt, "order_index": index, "created_at": now})
+                if len(chunk) >= chunk_size:
+                    conn.execute(insert_prompts, chunk)
+                    migrated += len(chunk)
+                    chunk = []
+        after = projects[-1][0]
+        seen += len(projects)
+        print(f"  📥 {migrated + len(chunk)} prompts from {seen}/{total} projects")
+    if chunk:
+        conn.execute(insert_prompts, chunk)
+        migrated += len(chunk)
+    print(f"  ✅ Migrated {migrated} prompts from {seen} projects")
+
+    count_unlinked = text("SELECT COUNT(*) FROM recordings WHERE prompt_id IS NULL")
+    unlinked = conn.execute(count_unlinked).scalar()
+    if unlinked:
+        _link_recordings_to_prompts(conn)
+    linked = unlinked - conn.execute(count_unlinked).scalar()
+    print(f"  🔗 Linked {linked} of {unlinked} recordings to prompts")
+
+    try:
+        conn.execute(text("ALTER TABLE projects DROP COLUMN prompts"))
+        print("  🧹 Removed prompts column from projects table")
+    except DBAPIError as e:
+        # older SQLite builds cannot drop columns, the leftover column is ignored by the models
+        print(f"  ⚠️  Could not remove prompts column: {e}")
+
+
+def _link_recordings_to_prompts(conn):
+    """Set recordings.prompt_id from the prompt with the same project and text, in one statement"""
+    # the first prompt wins when a project has duplicate texts
+    first_prompts = "SELECT project_id, text, MIN(id) AS id FROM prompts GROUP BY project_id, text"
+    if conn.dialect.name == "mysql":
+        statement = f"""
+            UPDATE recordings JOIN ({first_prompts}) AS p
+            ON p.project_id = recordings.project_id AND p.text = recordings.text
+            SET recordings.prompt_id = p.id WHERE recordings.prompt_id IS NULL
+        """
+    elif conn.dialect.dbapi.sqlite_version_info >= (3, 33, 0):
+        statement = f"""
+            UPDATE recordings SET prompt_id = p.id FROM ({first_prompts}) AS p
+            WHERE p.project_id = recordings.project_id AND p.text = recordings.text AND recordings.prompt_id IS NULL
+        """
+    else:
+        # UPDATE ... FROM needs SQLite 3.33
+        statement = """
+            UPDATE recordings SET prompt_id = (
+                SELECT MIN(id) FROM prompts WHERE prompts.project_id = recordings.project_id AND prompts.text = recordings.text
+            ) WHERE prompt_id IS NULL
+        """
+    conn.execute(text(statement))
+
+
+def enable_sqlite_incremental_vacuum(conn):
+    """Switch existing SQLite databases to auto_vacuum=INCREMENTAL (new ones get it from the connect PRAGMAs)"""
+    if conn.dialect.name != "sqlite":
+        return
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+        return
+    print("🔄 Rebuilding SQLite database for incremental vacuum (one-off, may take a while)...")
+    # VACUUM cannot run inside a transaction, use a separate autocommit connection
+    with conn.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as vacuum_conn:
+        vacuum_conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        vacuum_conn.exec_driver_sql("VACUUM")
+    print("✅ Enabled incremental vacuum")
+
+
+def add_prompt_order_index(conn):
+    """Composite index so ordered per-project listings stream without sorting"""
+    if any(index["name"] == "ix_prompts_project_order" for index in inspect(conn).get_indexes("prompts")):
+        return
+    conn.execute(text("CREATE INDEX ix_prompts_project_order ON prompts (project_id, order_index)"))
+    print("✅ Added ix_prompts_project_order index")
+
+
+def add_replication_queue(conn):
+    """Write-behind replication: queue table and recordings.replicated flag"""
+    ReplicationJob.__table__.create(conn, checkfirst=True)
+    _add_column_if_missing(conn, "recordings", "replicated", "INTEGER DEFAULT 0")
+
+
+def add_export_manifest(conn):
+    ExportManifest.__table__.create(conn, checkfirst=True)
+
+
+def add_project_deleted_at(conn):
+    _add_column_if_missing(conn, "projects", "deleted_at", "DATETIME")
+
+
+def add_recording_size_bytes(conn):
+    _add_column_if_missing(conn, "recordings", "size_bytes", "BIGINT")
+
+
+def add_prompt_search(conn):
+    """Full-text index on prompts.text: a FULLTEXT index on MySQL, an FTS5 table kept in sync by triggers on SQLite"""
+    if conn.dialect.name == "mysql":
+        if not any(index["name"] == "ft_prompts_text" for index in inspect(conn).get_indexes("prompts")):
+            conn.execute(text("CREATE FULLTEXT INDEX ft_prompts_text ON prompts (text)"))
+            print("✅ Added ft_prompts_text full-text index")
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        # external content table: the index refers to prompts rows instead of storing a copy of the text;
+        # unicode61 tokenizes Arabic and other scripts on word boundaries and folds Latin accents
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5("
+            "text, content='prompts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+    except DBAPIError as e:
+        print(f"⚠️  SQLite was built without FTS5, prompt search falls back to LIKE: {e}")
+        return
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS prompts_fts_insert AFTER INSERT ON prompts BEGIN
+            INSERT INTO prompts_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS prompts_fts_delete AFTER DELETE ON prompts BEGIN
+            INSERT INTO prompts_fts (prompts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS prompts_fts_update AFTER UPDATE OF text ON prompts BEGIN
+            INSERT INTO prompts_fts (prompts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO prompts_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    print("🔄 Building the prompt search index...")
+    conn.exec_driver_sql("INSERT INTO prompts_fts (prompts_fts) VALUES ('rebuild')")
+    print("✅ Added prompts_fts search index")
+
+
+def add_prompt_text_hash(conn, chunk_size: int = 10000):
+    """prompts.text_hash for deduplication and prompt lookups, backfilled in chunks"""
+    _add_column_if_missing(conn, "prompts", "text_hash", "VARCHAR(32)")
+    select_prompts = text("SELECT id, text FROM prompts WHERE id > :after AND text_hash IS NULL ORDER BY id LIMIT :limit")
+    update_hash = text("UPDATE prompts SET text_hash = :text_hash WHERE id = :id")
+    after, backfilled = 0, 0
+    while True:
+        rows = conn.execute(select_prompts, {"after": after, "limit": chunk_size}).fetchall()
+        if not rows:
+            break
+        conn.execute(update_hash, [{"id": prompt_id, "text_hash": prompt_hash(prompt_text or "")} for prompt_id, prompt_text in rows])
+        after = rows[-1][0]
+        backfilled += len(rows)
+        print(f"  #️⃣  Hashed {backfilled} prompts")
+    if not any(index["name"] == "ix_prompts_text_hash" for index in inspect(conn).get_indexes("prompts")):
+        conn.execute(text("CREATE INDEX ix_prompts_text_hash ON prompts (text_hash)"))
+        print("✅ Added ix_prompts_text_hash index")
+
+
+def add_worker_coordination(conn):
+    """Shared cache version stamps, background job leases and replication job claims (multi-worker deployments)"""
+    CacheVersion.__table__.create(conn, checkfirst=True)
+    Lease.__table__.create(conn, checkfirst=True)
+    _add_column_if_missing(conn, "replication_queue", "claim_token", "VARCHAR(32)")
+    # random start for the database's ETags, so tags issued against another database never match
+    if conn.execute(text("SELECT 1 FROM cache_versions WHERE scope = 'instance'")).first() is None:
+        conn.execute(CacheVersion.__table__.insert(), {"scope": "instance", "version": int.from_bytes(os.urandom(4), "big")})
+
+
+def add_upload_sessions(conn):
+    UploadSession.__table__.create(conn, checkfirst=True)
+
+
+def add_recording_status(conn):
+    _add_column_if_missing(conn, "recordings", "status", "VARCHAR(16) NOT NULL DEFAULT 'ready'")
+
+
+def add_storage_purges(conn):
+    StoragePurge.__table__.create(conn, checkfirst=True)
+
+
+# (version, description, step) in application order; append new steps, never reorder or edit applied ones
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "add recordings.prompt_id", add_recording_prompt_id),
+    (3, "add projects.is_rtl", add_project_is_rtl),
+    (4, "move JSON prompts to the prompts table", migrate_legacy_prompts),
+    (5, "enable incremental vacuum on SQLite", enable_sqlite_incremental_vacuum),
+    (6, "add prompts (project_id, order_index) index", add_prompt_order_index),
+    (7, "add replication queue", add_replication_queue),
+    (8, "add S3 export manifest", add_export_manifest),
+    (9, "add projects.deleted_at", add_project_deleted_at),
+    (10, "add recordings.size_bytes", add_recording_size_bytes),
+    (11, "add prompt full-text search index", add_prompt_search),
+    (12, "add prompts.text_hash", add_prompt_text_hash),
+    (13, "add worker coordination tables", add_worker_coordination),
+    (14, "add resumable upload sessions", add_upload_sessions),
+    (15, "add recordings.status", add_recording_status),
+    (16, "add pending storage purges", add_storage_purges),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(bind=None) -> int:
+    """Applied schema version, 0 for databases that predate versioning"""
+    bind = bind if bind is not None else engine
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+@contextmanager
+def _migration_lock(bind):
+    """Held by one process at a time, across workers and nodes sharing the database"""
+    if bind.dialect.name == "mysql":
+        with bind.connect() as conn:
+            conn.execute(text("SELECT GET_LOCK('schema_migration', 600)"))
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT RELEASE_LOCK('schema_migration')"))
+        return
+    try:
+        import fcntl
+    except ImportError:  # no file locks on this platform: single process only
+        fcntl = None
+    database = bind.url.database if bind.dialect.name == "sqlite" else None
+    if fcntl is None or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.migration.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
         try:
-            # Check if we're using SQLite
-            if 'sqlite' in str(engine.url):
-                print("🔄 Checking SQLite database schema...")
-                
-                # Check if prompt_id column exists in recordings table
-                try:
-                    db.execute(text("SELECT prompt_id FROM recordings LIMIT 1"))
-                    print("✅ Recordings table schema is up to date")
-                except Exception:
-                    print("🔄 Migrating recordings table schema...")
-                    
-                    # Add prompt_id column to recordings table
-                    try:
-                        db.execute(text("ALTER TABLE recordings ADD COLUMN prompt_id INTEGER"))
-                        print("✅ Added prompt_id column to recordings table")
-                    except Exception as e:
-                        print(f"⚠️  Could not add prompt_id column: {e}")
-                
-                # Check if is_rtl column exists in projects table
-                try:
-                    db.execute(text("SELECT is_rtl FROM projects LIMIT 1"))
-                    print("✅ Projects table schema is up to date")
-                except Exception:
-                    print("🔄 Migrating projects table schema...")
-                    
-                    # Add is_rtl column to projects table
-                    try:
-                        db.execute(text("ALTER TABLE projects ADD COLUMN is_rtl INTEGER DEFAULT 0"))
-                        print("✅ Added is_rtl column to projects table")
-                    except Exception as e:
-                        print(f"⚠️  Could not add is_rtl column: {e}")
-                    
-                    # Check if prompts table exists
-                    try:
-                        db.execute(text("SELECT COUNT(*) FROM prompts"))
-                        print("✅ Prompts table exists")
-                    except Exception:
-                        print("🔄 Creating prompts table...")
-                        # Create prompts table manually for SQLite
-                        db.execute(text("""
-                            CREATE TABLE prompts (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                project_id INTEGER NOT NULL,
-                                text TEXT NOT NULL,
-                                order_index INTEGER NOT NULL,
-                                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                            )
-                        """))
-                        print("✅ Created prompts table")
-                    
-                    db.commit()
-                    print("✅ Schema migration completed")
-            
-            # For MySQL, check and add missing columns
-            else:
-                print("🔄 Checking MySQL database schema...")
-                
-                # Check if prompt_id column exists in recordings table
-                try:
-                    db.execute(text("SELECT prompt_id FROM recordings LIMIT 1"))
-                    print("✅ Recordings table schema is up to date")
-                except Exception:
-                    print("🔄 Migrating recordings table schema...")
-                    
-                    # Add prompt_id column to recordings table
-                    try:
-                        db.execute(text("ALTER TABLE recordings ADD COLUMN prompt_id INT"))
-                        print("✅ Added prompt_id column to recordings table")
-                    except Exception as e:
-                        print(f"⚠️  Could not add prompt_id column: {e}")
-                
-                # Check if is_rtl column exists in projects table
-                try:
-                    db.execute(text("SELECT is_rtl FROM projects LIMIT 1"))
-                    print("✅ Projects table schema is up to date")
-                except Exception:
-                    print("🔄 Migrating projects table schema...")
-                    
-                    # Add is_rtl column to projects table
-                    try:
-                        db.execute(text("ALTER TABLE projects ADD COLUMN is_rtl INT DEFAULT 0"))
-                        print("✅ Added is_rtl column to projects table")
-                    except Exception as e:
-                        print(f"⚠️  Could not add is_rtl column: {e}")
-                    
-                    # Check if prompts table exists
-                    try:
-                        db.execute(text("SELECT COUNT(*) FROM prompts"))
-                        print("✅ Prompts table exists")
-                    except Exception:
-                        print("🔄 Creating prompts table...")
-                        # Create prompts table manually for MySQL
-                        db.execute(text("""
-                            CREATE TABLE prompts (
-                                id INT AUTO_INCREMENT PRIMARY KEY,
-                                project_id INT NOT NULL,
-                                text TEXT NOT NULL,
-                                order_index INT NOT NULL,
-                                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                            )
-                        """))
-                        print("✅ Created prompts table")
-                    
-                    db.commit()
-                    print("✅ Schema migration completed")
-                
-        except Exception as e:
-            print(f"⚠️  Schema migration check failed: {e}")
+            yield
         finally:
-            db.close() 
\ No newline at end of file
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def migrate_schema(bind=None) -> int:
+    """Apply pending schema migrations and return the resulting schema version"""
+    bind = bind if bind is not None else engine
+    current = get_schema_version(bind)
+    if current >= LATEST_VERSION:
+        print(f"✅ Database schema is up to date (version {current})")
+        return current
+
+    with session_lock, _migration_lock(bind):
+        # another worker may have migrated while this one waited for the lock
+        current = get_schema_version(bind)
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            print(f"🔄 Applying schema migration {version}: {name}")
+            try:
+                with bind.begin() as conn:
+                    step(conn)
+                    conn.execute(SchemaVersion.__table__.insert(), {
+                        "version": version, "name": name, "applied_at": datetime.utcnow()
+                    })
+            except Exception as e:
+                # the failed step is not recorded and is retried on the next start
+                logger.error(f"schema migration {version} ({name}) failed: {e}")
+                print(f"⚠️  Schema migration {version} failed: {e}")
+                return current
+            current = version
+
+    print(f"✅ Schema migration completed (version {current})")
+    return current
@@ -0,0 +1,93 @@
+import math
+import time
+from contextvars import ContextVar
+from config import DatabaseConfig
+from .connection import engine, read_engine, SessionLocal, ReadSessionLocal
+from .async_connection import AsyncSessionLocal, AsyncReadSessionLocal
+
+'''
+read/write routing between the primary and the optional read replica.
+read-only service methods open their session with read_session() / async_read_session(),
+everything else uses the primary session factories and calls mark_write() after committing.
+read-your-writes is scoped to the client that wrote: reads go to the primary for the rest of a
+request that has written, and the response carries a short-lived cookie (the write time, kept for
+DB_READ_AFTER_WRITE_SECONDS) so that client's next requests also read from the primary while the
+replica may lag. other clients keep reading from the replica.
+the request state is a mutable dict rather than a flag in the ContextVar itself, because sync
+services run in the threadpool with a copy of the request context.
+'''
+
+_request_state = ContextVar("db_request_state", default=None)
+WROTE_COOKIE = "db_wrote"
+
+
+def has_replica() -> bool:
+    return read_engine is not engine
+
+
+def mark_write():
+    """Record a write so following reads of this client are served by the primary"""
+    state = _request_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+def reads_from_primary() -> bool:
+    if not has_replica():
+        return True
+    state = _request_state.get()
+    return state is not None and (state["wrote"] or state["wrote_recently"])
+
+
+def read_session():
+    """Session for a read-only service method"""
+    return SessionLocal() if reads_from_primary() else ReadSessionLocal()
+
+
+def async_read_session():
+    """asyncio session for a read-only service method"""
+    return AsyncSessionLocal() if reads_from_primary() else AsyncReadSessionLocal()
+
+
+class DatabaseRoutingMiddleware:
+    """Scopes the read-your-writes state to a single request and its client"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        state = {"wrote": False, "wrote_recently": _wrote_recently(scope)}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state["wrote"] and has_replica():
+                message = {**message, "headers": [*message.get("headers", []), _wrote_cookie()]}
+            await send(message)
+
+        token = _request_state.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_state.reset(token)
+
+
+def _wrote_cookie():
+    window = DatabaseConfig.READ_AFTER_WRITE_SECONDS
+    cookie = f"{WROTE_COOKIE}={time.time():.3f}; Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+    return b"set-cookie", cookie.encode("latin-1")
+
+
+def _wrote_recently(scope) -> bool:
+    """Whether the request carries the cookie of a write made within DB_READ_AFTER_WRITE_SECONDS"""
+    for name, value in scope.get("headers", []):
+        if name != b"cookie":
+            continue
+        for morsel in value.decode("latin-1").split(";"):
+            key, _, written_at = morsel.strip().partition("=")
+            if key == WROTE_COOKIE:
+                try:
+                    return 0 <= time.time() - float(written_at) < DatabaseConfig.READ_AFTER_WRITE_SECONDS
+                except ValueError:
+                    return False
+    return False
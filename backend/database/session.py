@@ -1,9 +1,9 @@
-import threading
 from sqlalchemy.orm import Session
 from .connection import SessionLocal
+from utils.metrics import TimedLock
 
-# Session lock for thread safety
-session_lock = threading.Lock()
+# Session lock for thread safety (records wait time for /metrics)
+session_lock = TimedLock()
 
 def get_db() -> Session:
     """Get database session with thread safety"""
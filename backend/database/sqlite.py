@@ -0,0 +1,27 @@
+from sqlalchemy import event
+from config import DatabaseConfig
+
+'''
+production settings for SQLite engines: WAL so readers don't block on the writer,
+synchronous=NORMAL (durable in WAL mode except for the last transactions on power loss),
+a busy timeout instead of immediate "database is locked" errors, and larger page cache / mmap
+'''
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict = None):
+    """Set the PRAGMAs on every new DBAPI connection of the engine"""
+    pragmas = DatabaseConfig.get_sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return engine
+
+
+def is_sqlite(engine) -> bool:
+    return engine.dialect.name == "sqlite"
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Storage / database consistency check
+Compares the files in the storage path with the recordings table and reports orphaned files,
+recordings whose file is missing and size mismatches. With --repair, orphans older than the
+grace period are deleted, recordings of missing files are removed and unknown sizes are filled
+in; size mismatches (truncated or partial files) are reported, never overwritten.
+Repair is refused when the storage path looks unmounted (no files, or more than
+FSCK_MAX_MISSING_FRACTION of the recordings missing) unless --force is given.
+The same check runs in the application via POST /maintenance/fsck.
+
+    python fsck.py [--repair [--force]] [--grace 3600] [--sample 20] [--output report.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.migration import migrate_schema
+from services.fsck_service import FsckService
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="Fix what the check finds")
+    parser.add_argument("--force", action="store_true", help="Repair even when the storage path looks unmounted")
+    parser.add_argument("--grace", type=int, default=None, help="Seconds before an orphaned file may be deleted (default FSCK_ORPHAN_GRACE)")
+    parser.add_argument("--sample", type=int, default=20, help="Filenames listed per finding")
+    parser.add_argument("--output", default=None, help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    print("🩺 Storage consistency check" + (" (repair)" if args.repair else ""))
+    print("=" * 40)
+    migrate_schema()
+    report = FsckService.run(repair=args.repair, grace_seconds=args.grace, sample=args.sample, progress=print,
+                             force=args.force)
+
+    print(f"\n📊 {report['recordings']} recordings, {report['files']} files in {report['storage_path']} ({report['duration_s']}s)")
+    for label, key in (("Orphaned files", "orphans"), ("Missing files", "missing"), ("Size mismatches", "size_mismatches")):
+        finding = report[key]
+        print(f"{'✅' if finding['count'] == 0 else '⚠️ '} {label}: {finding['count']}")
+        for item in finding["sample"]:
+            print(f"     {item}")
+    if report["orphans"]["count"] != report["orphans"]["older_than_grace"]:
+        print(f"ℹ️  {report['orphans']['count'] - report['orphans']['older_than_grace']} orphaned files are within the grace period")
+    if report["unknown_sizes"]:
+        print(f"ℹ️  {report['unknown_sizes']} recordings without a stored size")
+    if "repair_refused" in report:
+        print(f"\n🛑 Repair refused: {report['repair_refused']} (rerun with --force if this is intended)")
+    if "repaired" in report:
+        print(f"\n🔧 Repaired: {report['repaired']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,40 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from config import AppConfig
-from models.database import Base
-from database.connection import engine
+from database.connection import engine, read_engine
+from database.async_connection import async_engine, async_read_engine
+from database.routing import DatabaseRoutingMiddleware, has_replica
 from database.migration import migrate_schema
 from services.settings_service import SettingsService
-from api import projects_router, recordings_router, settings_router, exports_router
+from services.maintenance_service import MaintenanceService
+from services.replication_service import ReplicationService
+from services.cleanup_service import CleanupService
+from services.transcode_service import TranscodeService
+from utils.metrics import MetricsMiddleware, instrument_engine, register_storage_collector
+from utils.compression import CompressionMiddleware
+from utils.admission import AdmissionMiddleware
+from utils.profiling import ProfilingMiddleware, install_slow_query_logging
+from api import projects_router, recordings_router, prompts_router, settings_router, exports_router, metrics_router, maintenance_router, coverage_router, uploads_router
 
 # Create FastAPI app
-app = FastAPI(title="TTS Dataset Generator", version="1.0.0")
+app = FastAPI(title="TTS Dataset Generator", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Per route class concurrency limits with bounded queues (innermost, so 503s get CORS headers and metrics)
+if AppConfig.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        limits={
+            "uploads": (AppConfig.ADMISSION_UPLOADS_LIMIT, AppConfig.ADMISSION_UPLOADS_QUEUE),
+            "exports": (AppConfig.ADMISSION_EXPORTS_LIMIT, AppConfig.ADMISSION_EXPORTS_QUEUE),
+            "listings": (AppConfig.ADMISSION_LISTINGS_LIMIT, AppConfig.ADMISSION_LISTINGS_QUEUE),
+        },
+        queue_timeout=AppConfig.ADMISSION_QUEUE_TIMEOUT,
+        retry_after=AppConfig.ADMISSION_RETRY_AFTER
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -26,22 +48,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Location", "Upload-Offset", "Upload-Length"],  # resumable uploads
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Per-request read-your-writes state for the primary / read replica routing
+app.add_middleware(DatabaseRoutingMiddleware)
+
+# gzip / brotli for JSON responses above the size threshold
+if AppConfig.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=AppConfig.COMPRESSION_MIN_SIZE,
+        gzip_level=AppConfig.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=AppConfig.COMPRESSION_BROTLI_QUALITY
+    )
+
+# Prometheus instrumentation
+if AppConfig.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine, "async")
+    if has_replica():
+        instrument_engine(read_engine, "replica")
+        instrument_engine(async_read_engine.sync_engine, "async_replica")
+    register_storage_collector(
+        lambda: SettingsService.get_setting("storage_path", "recordings"),
+        ttl=AppConfig.STORAGE_METRICS_TTL
+    )
+
+# Request profiling and slow query logging
+if AppConfig.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profile_dir=AppConfig.PROFILE_DIR,
+        sample_rate=AppConfig.PROFILE_SAMPLE_RATE,
+        header=AppConfig.PROFILE_HEADER,
+        slow_request_ms=AppConfig.SLOW_REQUEST_MS,
+        interval_ms=AppConfig.PROFILE_INTERVAL_MS
+    )
+if AppConfig.SLOW_QUERY_MS > 0:
+    install_slow_query_logging(engine, AppConfig.SLOW_QUERY_MS)
+    install_slow_query_logging(async_engine.sync_engine, AppConfig.SLOW_QUERY_MS)
+    if has_replica():
+        install_slow_query_logging(read_engine, AppConfig.SLOW_QUERY_MS)
+        install_slow_query_logging(async_read_engine.sync_engine, AppConfig.SLOW_QUERY_MS)
 
-# Run schema migration
+# Create or upgrade the database schema (a single version check when it is current)
 migrate_schema()
 
 # Ensure storage directory exists
 SettingsService.ensure_storage_path()
 
+# Background ANALYZE / incremental vacuum
+MaintenanceService.start()
+
+# Background removal of deleted projects' rows and files
+CleanupService.start()
+
+# Write-behind replication of new recordings to S3 (opt-in)
+ReplicationService.start()
+
+# Process pool converting compressed browser recordings to WAV (needs ffmpeg)
+TranscodeService.start()
+
 # Include API routers
 app.include_router(projects_router)
 app.include_router(recordings_router)
+app.include_router(prompts_router)
 app.include_router(settings_router)
 app.include_router(exports_router)
+app.include_router(maintenance_router)
+app.include_router(coverage_router)
+app.include_router(uploads_router)
+if AppConfig.METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
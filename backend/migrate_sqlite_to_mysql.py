@@ -2,142 +2,197 @@
 """
 Migration script to transfer data from SQLite to MySQL
 Run this script if you have existing data in SQLite that you want to migrate to MySQL
+
+Both databases are first brought to the current schema (see database/migration.py), then every
+table is copied in rowid order in chunks of --chunk-size rows: one executemany upsert and one
+commit per chunk, with tables copied in parallel by --workers threads (foreign key checks are
+disabled on the copying connections, so tables do not wait for each other). Progress is saved
+to a JSON checkpoint after every chunk; running the script again resumes where it stopped.
+Rows of a chunk that was copied but not yet checkpointed are simply upserted again.
+
+    python migrate_sqlite_to_mysql.py [--sqlite data/tts_dataset.db] [--chunk-size 5000] [--workers 4]
 """
 
 import os
 import sys
-import sqlite3
-import pymysql
 import json
+import time
+import sqlite3
+import argparse
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import create_engine
 from config import DatabaseConfig
+from models.database import Base, SchemaVersion
+from database.migration import migrate_schema, LATEST_VERSION
+
+# schema_version is written by migrate_schema on the target itself
+TABLES = [table for table in Base.metadata.sorted_tables if table.name != SchemaVersion.__tablename__]
+
+
+class Checkpoint:
+    """Per table progress ({"last_rowid", "rows", "done"}), saved atomically after every chunk"""
+
+    def __init__(self, path: str, source: str, restart: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {"source": os.path.abspath(source), "tables": {}}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("source") == self.state["source"]:
+                self.state = saved
+            else:
+                print(f"⚠️  Checkpoint {path} belongs to {saved.get('source')}, starting over")
+
+    def table(self, name: str) -> dict:
+        with self._lock:
+            return dict(self.state["tables"].get(name, {"last_rowid": 0, "rows": 0, "done": False}))
+
+    def update(self, name: str, **progress):
+        with self._lock:
+            self.state["tables"].setdefault(name, {"last_rowid": 0, "rows": 0, "done": False}).update(progress)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.path)
 
-def connect_sqlite():
-    """Connect to SQLite database"""
+
+def connect_sqlite(path: str):
+    """Read-only connection to the SQLite source (one per thread)"""
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+def connect_mysql(mysql_engine):
+    """DBAPI connection to the MySQL target with foreign key checks off for this session"""
+    conn = mysql_engine.raw_connection()
+    with conn.cursor() as cursor:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    return conn
+
+def upsert_statement(table_name: str, columns: list) -> str:
+    quoted = [f"`{column}`" for column in columns]
+    return (
+        f"INSERT INTO `{table_name}` ({', '.join(quoted)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in quoted)}"
+    )
+
+def source_columns(sqlite_conn, table_name: str) -> list:
+    return [row[1] for row in sqlite_conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+def copy_table(table, sqlite_path: str, mysql_engine, checkpoint: Checkpoint, chunk_size: int) -> int:
+    """Copy one table in rowid order, resuming from the checkpoint, returns the rows copied in total"""
+    progress = checkpoint.table(table.name)
+    if progress["done"]:
+        print(f"⏭️  {table.name}: already copied ({progress['rows']} rows)")
+        return progress["rows"]
+
+    sqlite_conn = connect_sqlite(sqlite_path)
+    mysql_conn = connect_mysql(mysql_engine)
     try:
-        return sqlite3.connect('tts_dataset.db')
-    except sqlite3.Error as e:
-        print(f"❌ Error connecting to SQLite: {e}")
-        return None
+        # columns present on both sides (the source is at the current schema, the target too)
+        columns = [column for column in source_columns(sqlite_conn, table.name) if column in table.columns]
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        select = f'SELECT rowid, {quoted} FROM "{table.name}" WHERE rowid > ? ORDER BY rowid LIMIT ?'
+        insert = upsert_statement(table.name, columns)
+        last_rowid, copied = progress["last_rowid"], progress["rows"]
+        if last_rowid:
+            print(f"↪️  {table.name}: resuming after rowid {last_rowid} ({copied} rows copied)")
+        while True:
+            rows = sqlite_conn.execute(select, (last_rowid, chunk_size)).fetchall()
+            if not rows:
+                break
+            with mysql_conn.cursor() as cursor:
+                cursor.executemany(insert, [row[1:] for row in rows])
+            mysql_conn.commit()
+            last_rowid = rows[-1][0]
+            copied += len(rows)
+            checkpoint.update(table.name, last_rowid=last_rowid, rows=copied)
+        checkpoint.update(table.name, done=True)
+        print(f"✅ {table.name}: {copied} rows")
+        return copied
+    finally:
+        sqlite_conn.close()
+        mysql_conn.close()
 
-def connect_mysql():
-    """Connect to MySQL database"""
+def verify_counts(sqlite_path: str, mysql_engine) -> bool:
+    """Compare row counts per table, returns True when they all match"""
+    sqlite_conn = connect_sqlite(sqlite_path)
+    mysql_conn = mysql_engine.raw_connection()
+    ok = True
     try:
-        return pymysql.connect(
-            host=DatabaseConfig.MYSQL_HOST,
-            port=DatabaseConfig.MYSQL_PORT,
-            user=DatabaseConfig.MYSQL_USER,
-            password=DatabaseConfig.MYSQL_PASSWORD,
-            database=DatabaseConfig.MYSQL_DATABASE,
-            charset='utf8mb4'
-        )
-    except pymysql.Error as e:
-        print(f"❌ Error connecting to MySQL: {e}")
-        return None
-
-def migrate_data():
+        for table in TABLES:
+            source_count = sqlite_conn.execute(f'SELECT COUNT(*) FROM "{table.name}"').fetchone()[0]
+            with mysql_conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM `{table.name}`")
+                target_count = cursor.fetchone()[0]
+            if source_count == target_count:
+                print(f"   - {table.name}: {target_count}")
+            else:
+                ok = False
+                print(f"   - {table.name}: ⚠️  {source_count} in SQLite, {target_count} in MySQL")
+    finally:
+        sqlite_conn.close()
+        mysql_conn.close()
+    return ok
+
+def migrate_data(sqlite_path: str, mysql_url: str, checkpoint_path: str, chunk_size: int = 5000,
+                 workers: int = 4, restart: bool = False) -> bool:
     """Migrate data from SQLite to MySQL"""
-    sqlite_conn = connect_sqlite()
-    mysql_conn = connect_mysql()
-    
-    if not sqlite_conn or not mysql_conn:
-        return False
-    
+    sqlite_engine = create_engine(f"sqlite:///{sqlite_path}")
+    mysql_engine = create_engine(mysql_url, pool_pre_ping=True, pool_size=workers + 1, max_overflow=0)
     try:
-        sqlite_cursor = sqlite_conn.cursor()
-        mysql_cursor = mysql_conn.cursor()
-        
-        print("🔄 Starting migration from SQLite to MySQL...")
-        
-        # Migrate settings
-        print("📝 Migrating settings...")
-        sqlite_cursor.execute("SELECT key, value FROM settings")
-        settings = sqlite_cursor.fetchall()
-        
-        for key, value in settings:
-            mysql_cursor.execute(
-                "INSERT INTO settings (key, value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE value = VALUES(value)",
-                (key, value)
-            )
-        print(f"✅ Migrated {len(settings)} settings")
-        
-        # Migrate projects
-        print("📁 Migrating projects...")
-        sqlite_cursor.execute("SELECT id, name, prompts, created_at FROM projects")
-        projects = sqlite_cursor.fetchall()
-        
-        for project_id, name, prompts, created_at in projects:
-            # Parse prompts JSON if it's a string
-            if isinstance(prompts, str):
-                prompts = json.loads(prompts)
-            
-            mysql_cursor.execute(
-                "INSERT INTO projects (id, name, prompts, created_at) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE name = VALUES(name), prompts = VALUES(prompts), created_at = VALUES(created_at)",
-                (project_id, name, json.dumps(prompts), created_at)
-            )
-        print(f"✅ Migrated {len(projects)} projects")
-        
-        # Migrate recordings
-        print("🎵 Migrating recordings...")
-        sqlite_cursor.execute("SELECT id, text, filename, recorded_at, project_id FROM recordings")
-        recordings = sqlite_cursor.fetchall()
-        
-        for recording_id, text, filename, recorded_at, project_id in recordings:
-            mysql_cursor.execute(
-                "INSERT INTO recordings (id, text, filename, recorded_at, project_id) VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE text = VALUES(text), filename = VALUES(filename), recorded_at = VALUES(recorded_at), project_id = VALUES(project_id)",
-                (recording_id, text, filename, recorded_at, project_id)
-            )
-        print(f"✅ Migrated {len(recordings)} recordings")
-        
-        # Migrate interactions
-        print("📊 Migrating interactions...")
-        sqlite_cursor.execute("SELECT id, action, details, timestamp FROM interactions")
-        interactions = sqlite_cursor.fetchall()
-        
-        for interaction_id, action, details, timestamp in interactions:
-            # Parse details JSON if it's a string
-            if isinstance(details, str):
-                details = json.loads(details)
-            
-            mysql_cursor.execute(
-                "INSERT INTO interactions (id, action, data, timestamp) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE action = VALUES(action), data = VALUES(data), timestamp = VALUES(timestamp)",
-                (interaction_id, action, json.dumps(details), timestamp)
-            )
-        print(f"✅ Migrated {len(interactions)} interactions")
-        
-        # Commit all changes
-        mysql_conn.commit()
-        
-        print("\n✅ Migration completed successfully!")
-        print(f"📊 Summary:")
-        print(f"   - Settings: {len(settings)}")
-        print(f"   - Projects: {len(projects)}")
-        print(f"   - Recordings: {len(recordings)}")
-        print(f"   - Interactions: {len(interactions)}")
-        
-        return True
-        
+        print("🔄 Bringing the SQLite database to the current schema...")
+        if migrate_schema(sqlite_engine) < LATEST_VERSION:
+            return False
+        print("🔄 Creating the MySQL schema...")
+        if migrate_schema(mysql_engine) < LATEST_VERSION:
+            return False
+
+        checkpoint = Checkpoint(checkpoint_path, sqlite_path, restart)
+        started = time.monotonic()
+        print(f"🚚 Copying {len(TABLES)} tables ({workers} workers, {chunk_size} rows per chunk)...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {table.name: executor.submit(copy_table, table, sqlite_path, mysql_engine, checkpoint, chunk_size)
+                       for table in TABLES}
+            failed = []
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(name)
+                    print(f"❌ {name}: {e}")
+        if failed:
+            print(f"\n❌ Copy failed for {', '.join(failed)}; run the script again to resume from {checkpoint_path}")
+            return False
+
+        print(f"\n📊 Summary ({time.monotonic() - started:.1f}s):")
+        return verify_counts(sqlite_path, mysql_engine)
+
     except Exception as e:
         print(f"❌ Migration failed: {e}")
-        mysql_conn.rollback()
         return False
-        
+
     finally:
-        sqlite_conn.close()
-        mysql_conn.close()
+        sqlite_engine.dispose()
+        mysql_engine.dispose()
 
-def backup_sqlite():
+def backup_sqlite(sqlite_path: str):
     """Create a backup of the SQLite database"""
-    import shutil
-    from datetime import datetime
-    
-    backup_name = f"tts_dataset_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    root, ext = os.path.splitext(sqlite_path)
+    backup_name = f"{root}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
     try:
-        shutil.copy2('tts_dataset.db', backup_name)
+        # the backup API copies a consistent snapshot, including pages still in the WAL
+        source = sqlite3.connect(sqlite_path)
+        target = sqlite3.connect(backup_name)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
         print(f"💾 SQLite backup created: {backup_name}")
         return True
     except Exception as e:
@@ -145,33 +200,51 @@ def backup_sqlite():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqlite", default=DatabaseConfig.SQLITE_DATABASE, help="SQLite database to copy")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per insert batch and commit")
+    parser.add_argument("--workers", type=int, default=4, help="Tables copied in parallel")
+    parser.add_argument("--checkpoint", default=None, help="Progress file (default: <sqlite>.mysql-migration.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+    checkpoint_path = args.checkpoint or f"{args.sqlite}.mysql-migration.json"
+
     print("🚀 SQLite to MySQL Migration Tool")
     print("=" * 40)
-    
+
     # Check if SQLite database exists
-    import os
-    if not os.path.exists('tts_dataset.db'):
-        print("❌ SQLite database 'tts_dataset.db' not found")
-        print("   Make sure you're running this script from the backend directory")
+    if not os.path.exists(args.sqlite):
+        print(f"❌ SQLite database '{args.sqlite}' not found")
+        print("   Make sure you're running this script from the backend directory or pass --sqlite")
         return
-    
-    # Create backup
-    print("💾 Creating backup of SQLite database...")
-    if not backup_sqlite():
-        print("❌ Backup failed. Aborting migration.")
+
+    mysql_url = DatabaseConfig.get_database_url()
+    if not mysql_url.startswith("mysql"):
+        print("❌ MySQL is not configured (MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD_FILE, MYSQL_DATABASE)")
         return
-    
+
+    resuming = os.path.exists(checkpoint_path) and not args.restart
+    # Create backup (once, not again when resuming)
+    if not resuming:
+        print("💾 Creating backup of SQLite database...")
+        if not backup_sqlite(args.sqlite):
+            print("❌ Backup failed. Aborting migration.")
+            return
+
     # Confirm migration
-    print("\n⚠️  This will migrate all data from SQLite to MySQL")
-    print("   Make sure MySQL is running and configured correctly")
-    response = input("\nContinue with migration? (y/N): ")
-    
-    if response.lower() != 'y':
-        print("❌ Migration cancelled")
-        return
-    
+    if not args.yes:
+        print(f"\n⚠️  This will {'resume migrating' if resuming else 'migrate'} all data from SQLite to MySQL")
+        print("   Make sure MySQL is running and configured correctly")
+        response = input("\nContinue with migration? (y/N): ")
+
+        if response.lower() != 'y':
+            print("❌ Migration cancelled")
+            return
+
     # Perform migration
-    if migrate_data():
+    if migrate_data(args.sqlite, mysql_url, checkpoint_path, args.chunk_size, args.workers, args.restart):
+        os.remove(checkpoint_path)
         print("\n🎉 Migration completed successfully!")
         print("\n📝 Next steps:")
         print("1. Update your application to use MySQL")
@@ -182,4 +255,4 @@ def main():
         print("\n❌ Migration failed. Check the error messages above.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,7 +1,7 @@
-from models.database import Setting, Project, Prompt, Recording, Interaction
+from models.database import SchemaVersion, Setting, Project, Prompt, Recording, ReplicationJob, ExportManifest, StoragePurge, Interaction
 from models.schemas import Settings
 
 __all__ = [
-    'Setting', 'Project', 'Prompt', 'Recording', 'Interaction',
+    'SchemaVersion', 'Setting', 'Project', 'Prompt', 'Recording', 'ReplicationJob', 'ExportManifest', 'StoragePurge', 'Interaction',
     'Settings'
 ] 
\ No newline at end of file
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, DateTime, JSON, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 class Setting(Base):
     __tablename__ = 'settings'
     id = Column(Integer, primary_key=True, index=True)
@@ -17,17 +23,22 @@ class Project(Base):
     name = Column(String(255), unique=True, index=True)
     is_rtl = Column(Integer, default=0)  # 0 for LTR, 1 for RTL
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # tombstone, rows and files are removed in the background
 
 class Prompt(Base):
     __tablename__ = 'prompts'
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, index=True)
     text = Column(Text, nullable=False)
+    text_hash = Column(String(32), index=True)  # md5 of the normalized text (utils.text_utils.prompt_hash)
     order_index = Column(Integer, nullable=False)  # To maintain order of prompts
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship to Recordings
     recordings = relationship("Recording", back_populates="prompt")
+    
+    # Walks a project's prompts in order (ordered listings/streams without a sort)
+    __table_args__ = (Index('ix_prompts_project_order', 'project_id', 'order_index'),)
 
 class Recording(Base):
     __tablename__ = 'recordings'
@@ -37,10 +48,69 @@ class Recording(Base):
     recorded_at = Column(DateTime, default=datetime.utcnow)
     project_id = Column(Integer)
     prompt_id = Column(Integer, ForeignKey('prompts.id'), index=True)  # Link to specific prompt
+    replicated = Column(Integer, default=0)  # 1 once the file was copied to object storage
+    size_bytes = Column(BigInteger)  # size of the stored file, checked by fsck
+    status = Column(String(16), default='ready', nullable=False)  # 'processing' while a compressed upload is transcoded, 'failed' if that failed
     
     # Relationship to Prompt
     prompt = relationship("Prompt", back_populates="recordings")
 
+class ReplicationJob(Base):
+    """Pending upload of a recording to object storage (write-behind replication queue)"""
+    __tablename__ = 'replication_queue'
+    id = Column(Integer, primary_key=True)
+    filename = Column(String(255), nullable=False, index=True)  # recordings.filename (unique)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_error = Column(Text)
+    claim_token = Column(String(32))  # set by the worker that claimed the job for its current attempt
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ExportManifest(Base):
+    """Objects exported to S3 with the fingerprint of the exported file, for delta exports"""
+    __tablename__ = 'export_manifest'
+    id = Column(Integer, primary_key=True)
+    bucket = Column(String(255), nullable=False)
+    key = Column(String(255), nullable=False)
+    project_id = Column(Integer, index=True)
+    size = Column(BigInteger)
+    mtime_ns = Column(BigInteger)
+    checksum = Column(String(32))  # md5 hex
+    exported_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (UniqueConstraint('bucket', 'key', name='uq_export_manifest_bucket_key'),)
+
+class CacheVersion(Base):
+    """Version stamp of cached data, bumped after writes so every worker drops its stale copies"""
+    __tablename__ = 'cache_versions'
+    scope = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+class Lease(Base):
+    """Named lease on background work, held by one worker until it expires"""
+    __tablename__ = 'leases'
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class UploadSession(Base):
+    """Resumable upload in progress; the bytes received so far are in its staging file"""
+    __tablename__ = 'upload_sessions'
+    id = Column(String(32), primary_key=True)
+    project_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    length = Column(BigInteger, nullable=False)  # announced size of the complete file
+    received = Column(BigInteger, nullable=False, default=0)  # offset of the next chunk
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)  # last chunk, for expiry
+
+class StoragePurge(Base):
+    """Files left in a storage directory by clear_database, removed by the cleanup worker"""
+    __tablename__ = 'storage_purges'
+    id = Column(Integer, primary_key=True)
+    storage_path = Column(Text, nullable=False)
+    cleared_at = Column(Float, nullable=False)  # epoch seconds, files modified before it are removed
+
 class Interaction(Base):
     __tablename__ = 'interactions'
     id = Column(Integer, primary_key=True, index=True)
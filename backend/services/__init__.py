@@ -2,5 +2,14 @@ from services.project_service import ProjectService
 from services.recording_service import RecordingService
 from services.export_service import ExportService
 from services.settings_service import SettingsService
+from services.maintenance_service import MaintenanceService
+from services.replication_service import ReplicationService
+from services.cleanup_service import CleanupService
+from services.fsck_service import FsckService
+from services.search_service import SearchService
+from services.coverage_service import CoverageService
+from services.sampling_service import SamplingService
+from services.resumable_upload_service import ResumableUploadService
+from services.transcode_service import TranscodeService
 
-__all__ = ['ProjectService', 'RecordingService', 'ExportService', 'SettingsService'] 
\ No newline at end of file
+__all__ = ['ProjectService', 'RecordingService', 'ExportService', 'SettingsService', 'MaintenanceService', 'ReplicationService', 'CleanupService', 'FsckService', 'SearchService', 'CoverageService', 'SamplingService', 'ResumableUploadService', 'TranscodeService'] 
\ No newline at end of file
@@ -0,0 +1,275 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import String, cast, func
+from models.database import Project, Prompt, Recording, UploadSession, StoragePurge
+from database.connection import SessionLocal
+from database.session import session_lock
+from database.routing import mark_write
+from services.settings_service import SettingsService
+from services.maintenance_service import MaintenanceService
+from utils.file_utils import delete_audio_file, upload_staging_dir, transcode_staging_dir
+from utils.audio_utils import conversion_stale_after
+from utils.logging import logger
+from utils.response_cache import response_cache
+from config import AppConfig
+
+'''
+background garbage collection for deleted projects.
+deleting a project (or clearing the database) only tombstones the project rows and returns;
+this worker then removes the audio files and the recording / prompt rows of tombstoned projects
+in batches of CLEANUP_BATCH_SIZE, taking the session lock for one short transaction per batch.
+files of a batch are removed before its rows are committed, so an interrupted run simply resumes,
+and overlapping runs of several workers only repeat some deletes (missing files are ignored).
+a live project uploading the same text takes the row (and so the file name) over; the batch's
+rows are deleted first, in the transaction that stays open while the files are removed, so a
+takeover either happened before (its file is kept) or waits until the batch is gone.
+storage purges after clear_database are rows of storage_purges, committed with the clear, so a
+restart or another worker picks them up like tombstones; they scan the directory with os.scandir
+and only remove files older than the clear, so recordings made in the meantime survive.
+resumable uploads idle for UPLOAD_EXPIRY seconds are dropped with their staging files, and
+conversions of compressed uploads that outlived conversion_stale_after() (their process
+died) are marked failed.
+'''
+
+
+def _tombstone_name(name: str, project_id: int) -> str:
+    """Frees the unique project name for reuse"""
+    return f"{name[:200]}~deleted~{project_id}"
+
+
+class CleanupService:
+    _pending = threading.Event()
+    _thread = None
+
+    @classmethod
+    def start(cls):
+        """Start the cleanup thread (idempotent); tombstones left by a previous run are collected right away"""
+        if cls._thread is not None:
+            return
+        cls._pending.set()
+        cls._thread = threading.Thread(target=cls._run, name="cleanup", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def schedule(cls):
+        cls._pending.set()
+
+    @staticmethod
+    def schedule_purge(db, storage_path: str, cleared_at: float):
+        """Queue the removal of every file modified before cleared_at (epoch seconds) from storage_path,
+        in the caller's transaction; call schedule() after the commit"""
+        db.add(StoragePurge(storage_path=storage_path, cleared_at=cleared_at))
+
+    @staticmethod
+    def tombstone_project(project):
+        """Mark a project deleted in the caller's transaction"""
+        project.deleted_at = datetime.utcnow()
+        CleanupService.release_name(project)
+
+    @staticmethod
+    def release_name(project):
+        """Rename a tombstoned project so a live project can take its name"""
+        project.name = _tombstone_name(project.name, project.id)
+
+    @staticmethod
+    def tombstone_all_projects(db):
+        """Mark every live project deleted in the caller's transaction"""
+        db.query(Project).filter(Project.deleted_at.is_(None)).update({
+            Project.deleted_at: datetime.utcnow(),
+            # same as _tombstone_name, as SQL
+            Project.name: func.substr(Project.name, 1, 200) + "~deleted~" + cast(Project.id, String),
+        }, synchronize_session=False)
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._pending.wait(timeout=AppConfig.CLEANUP_INTERVAL)
+            cls._pending.clear()
+            try:
+                cls.collect()
+            except Exception as e:
+                logger.error(f"cleanup failed: {e}")
+
+    @classmethod
+    def collect(cls):
+        """Remove tombstoned projects and pending storage purges, returns a summary"""
+        summary = {"projects": 0, "recordings": 0, "prompts": 0, "purged_files": 0, "stale_uploads": 0, "stale_conversions": 0}
+        with session_lock:
+            db = SessionLocal()
+            try:
+                project_ids = [project_id for (project_id,) in db.query(Project.id).filter(Project.deleted_at.isnot(None))]
+            finally:
+                db.close()
+
+        for project_id in project_ids:
+            summary["recordings"] += cls._delete_recordings(project_id)
+            summary["prompts"] += cls._delete_in_batches(Prompt, Prompt.project_id == project_id)
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    db.query(Project).filter(Project.id == project_id).delete()
+                    db.commit()
+                finally:
+                    db.close()
+            mark_write()
+            response_cache.bump_project(project_id)
+            summary["projects"] += 1
+
+        with session_lock:
+            db = SessionLocal()
+            try:
+                purges = db.query(StoragePurge.id, StoragePurge.storage_path, StoragePurge.cleared_at).all()
+            finally:
+                db.close()
+        for purge_id, storage_path, cleared_at in purges:
+            summary["purged_files"] += cls._purge_storage(storage_path, cleared_at)
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    db.query(StoragePurge).filter(StoragePurge.id == purge_id).delete()
+                    db.commit()
+                finally:
+                    db.close()
+
+        summary["stale_uploads"] = cls._collect_stale_uploads()
+        summary["stale_conversions"] = cls._collect_stale_conversions()
+
+        if any(summary.values()):
+            logger.info(f"cleanup completed: {summary}")
+            MaintenanceService.schedule()
+        return summary
+
+    @staticmethod
+    def _delete_recordings(project_id: int) -> int:
+        storage_path = SettingsService.get_setting("storage_path", "recordings")
+        deleted = 0
+        while True:
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    batch = db.query(Recording.id, Recording.filename).filter(
+                        Recording.project_id == project_id
+                    ).limit(AppConfig.CLEANUP_BATCH_SIZE).all()
+                finally:
+                    db.close()
+            if not batch:
+                return deleted
+            filenames = [filename for _, filename in batch]
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    deleted += db.query(Recording).filter(
+                        Recording.id.in_([recording_id for recording_id, _ in batch]),
+                        Recording.project_id == project_id
+                    ).delete(synchronize_session=False)
+                    # rows still there were taken over by a live project since the query above
+                    taken_over = {filename for (filename,) in db.query(Recording.filename).filter(Recording.filename.in_(filenames))}
+                    for filename in filenames:
+                        if filename not in taken_over:
+                            delete_audio_file(filename, storage_path)
+                    db.commit()
+                finally:
+                    db.close()
+
+    @staticmethod
+    def _delete_in_batches(model, condition) -> int:
+        deleted = 0
+        while True:
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    ids = [row_id for (row_id,) in db.query(model.id).filter(condition).limit(AppConfig.CLEANUP_BATCH_SIZE)]
+                    if ids:
+                        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                        db.commit()
+                finally:
+                    db.close()
+            if not ids:
+                return deleted
+            deleted += len(ids)
+
+    @staticmethod
+    def _collect_stale_uploads() -> int:
+        """Drop idle resumable uploads, then staging files no upload refers to; returns the files removed"""
+        cutoff = datetime.utcnow() - timedelta(seconds=AppConfig.UPLOAD_EXPIRY)
+        with session_lock:
+            db = SessionLocal()
+            try:
+                db.query(UploadSession).filter(UploadSession.updated_at < cutoff).delete(synchronize_session=False)
+                db.commit()
+                live = {upload_id for (upload_id,) in db.query(UploadSession.id)}
+            finally:
+                db.close()
+        staging_dir = upload_staging_dir(SettingsService.get_setting("storage_path", "recordings"))
+        if not os.path.isdir(staging_dir):
+            return 0
+        # files of uploads created after the query above are recent, the mtime check keeps them
+        stale_before = time.time() - AppConfig.UPLOAD_EXPIRY
+        removed = 0
+        with os.scandir(staging_dir) as entries:
+            for entry in entries:
+                try:
+                    if (entry.name.removesuffix(".part") not in live and entry.is_file(follow_symlinks=False)
+                            and entry.stat().st_mtime < stale_before):
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    @staticmethod
+    def _collect_stale_conversions() -> int:
+        """Remove conversion files older than any live conversion and mark their recordings failed, returns how many were lost"""
+        staging_dir = transcode_staging_dir(SettingsService.get_setting("storage_path", "recordings"))
+        if not os.path.isdir(staging_dir):
+            return 0
+        stale_before = time.time() - conversion_stale_after()
+        lost, converting = set(), set()
+        with os.scandir(staging_dir) as entries:
+            for entry in entries:
+                filename = entry.name.rsplit(".", 2)[0]  # <filename>.<token>.src / .out
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if entry.stat().st_mtime >= stale_before:
+                        converting.add(filename)
+                        continue
+                    os.remove(entry.path)
+                    if entry.name.endswith(".src"):
+                        lost.add(filename)
+                except FileNotFoundError:
+                    pass
+        # a newer upload of the same prompt may still be converted
+        lost -= converting
+        if not lost:
+            return 0
+        with session_lock:
+            db = SessionLocal()
+            try:
+                condition = (Recording.filename.in_(list(lost)), Recording.status == "processing")
+                project_ids = {project_id for (project_id,) in db.query(Recording.project_id).filter(*condition)}
+                db.query(Recording).filter(*condition).update({"status": "failed"}, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+        mark_write()
+        for project_id in project_ids:
+            response_cache.bump_project(project_id)
+        return len(lost)
+
+    @staticmethod
+    def _purge_storage(storage_path: str, cleared_at: float) -> int:
+        if not os.path.isdir(storage_path):
+            return 0
+        removed = 0
+        with os.scandir(storage_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cleared_at:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError as e:
+                    logger.error(f"failed to purge {entry.path}: {e}")
+        return removed
@@ -0,0 +1,299 @@
+import string
+from array import array
+from fastapi import HTTPException
+from sqlalchemy import select, exists
+from models.database import Prompt, Project, Recording
+from database.session import session_lock
+from database.routing import read_session
+from services.project_service import ProjectService
+from utils.text_utils import normalize_prompt
+
+'''
+character / bigram / word coverage of prompt corpora and greedy prompt subset selection.
+a corpus is turned into a sparse sentence x feature count matrix in CSR form (indptr, indices,
+counts numpy arrays): characters are read as one utf-32 buffer per block of sentences, words
+get vocabulary ids in a single pass, and one sort over packed (sentence, feature) pairs per
+block yields the entries and their counts. selection is lazy greedy set
+cover: every sentence keeps an upper bound of its gain (new features it covers), which only
+shrinks as features get covered, so a pick re-evaluates the sentences at the top bound (one
+numpy chunk, or every sentence that could still beat its best) rather than the whole corpus. once every feature is covered the next
+round aims to cover everything again, so larger selections spread over features evenly.
+ties go to the shorter sentence.
+phoneme coverage needs a G2P, which is not part of this app: phonemize the corpus upstream
+and use the "token" unit (space separated symbols).
+numpy is imported on first use so it stays out of worker startup.
+'''
+
+UNITS = ("char", "bigram", "word", "token")
+BITSET_MAX_FEATURES = 512  # up to 8 uint64 words per sentence
+BUILD_BLOCK_SIZE = 100000  # sentences per sort while building, bounds memory on large corpora
+_KEY_BITS = 42  # feature keys (code point pairs) fit 42 bits, block rows the 21 above them
+_WORD_STRIP = string.punctuation + "،؛؟«»“”‘’…"
+
+
+def _occurrences(texts: list, unit: str, vocabulary: dict):
+    """(row, integer feature key) of every feature occurrence in a block of the corpus: code points
+    (pairs) for char / bigram, ids from the shared vocabulary for word / token"""
+    import numpy as np
+
+    if unit in ("char", "bigram"):
+        folded = [text.casefold() for text in texts]
+        if unit == "bigram":
+            # padded with spaces so word starts and ends are features too
+            folded = [f" {text} " for text in folded]
+        lengths = np.fromiter(map(len, folded), dtype=np.int64, count=len(folded))
+        codes = np.frombuffer("".join(folded).encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int64)
+        rows = np.repeat(np.arange(len(folded), dtype=np.int64), lengths)
+        if unit == "char":
+            keep = codes != ord(" ")  # normalized text has no other whitespace
+            return rows[keep], codes[keep]
+        same_row = rows[1:] == rows[:-1]
+        return rows[1:][same_row], ((codes[:-1] << 21) | codes[1:])[same_row]
+
+    ids, lengths = array("q"), array("q")
+    for text in texts:
+        tokens = text.split()
+        if unit == "word":
+            tokens = [word for word in (token.strip(_WORD_STRIP) for token in text.casefold().split()) if word]
+        ids.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+        lengths.append(len(tokens))
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), np.frombuffer(lengths, dtype=np.int64))
+    return rows, np.frombuffer(ids, dtype=np.int64)
+
+
+class FeatureMatrix:
+    """Sentence x feature counts in CSR form plus the vocabulary"""
+
+    def __init__(self, texts: list, unit: str = "char"):
+        import numpy as np
+
+        if unit not in UNITS:
+            raise HTTPException(status_code=400, detail=f"Unknown unit {unit!r}, expected one of {', '.join(UNITS)}")
+        self.unit = unit
+        vocabulary = {}
+        row_sizes, keys, counts = [], [], []
+        for start in range(0, len(texts), BUILD_BLOCK_SIZE):
+            block = texts[start:start + BUILD_BLOCK_SIZE]
+            rows, block_keys = _occurrences(block, unit, vocabulary)
+            # one sort over packed (row, key) pairs gives the block's entries in row order with their counts
+            entries, block_counts = np.unique((rows << _KEY_BITS) | block_keys, return_counts=True)
+            row_sizes.append(np.bincount(entries >> _KEY_BITS, minlength=len(block)))
+            keys.append(entries & ((1 << _KEY_BITS) - 1))
+            counts.append(block_counts.astype(np.int32))
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+
+        if unit in ("char", "bigram"):
+            distinct_keys = np.unique(keys)
+            if unit == "char":
+                self.features = [chr(key) for key in distinct_keys.tolist()]
+            else:
+                self.features = [chr(key >> 21) + chr(key & 0x1FFFFF) for key in distinct_keys.tolist()]
+            self.indices = np.searchsorted(distinct_keys, keys).astype(np.int32)
+        else:
+            self.features = list(vocabulary)
+            self.indices = keys.astype(np.int32)
+        self.indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        if row_sizes:
+            np.cumsum(np.concatenate(row_sizes), out=self.indptr[1:])
+        self.counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.int32)
+        self.lengths = np.fromiter(map(len, texts), dtype=np.int32, count=len(texts))
+        self._bitsets = None
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, len(self.features)
+
+    def row(self, i: int):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def bitsets(self):
+        """Every row's feature set as uint64 words (ceil(features / 64) x rows), built on first use"""
+        import numpy as np
+
+        if self._bitsets is None:
+            words = max(1, -(-self.shape[1] // 64))
+            bits = np.zeros(self.shape[0] * words, dtype=np.uint64)
+            owners = np.repeat(np.arange(self.shape[0], dtype=np.int64), np.diff(self.indptr))
+            # features of a row are distinct, so adding their bits is the same as or-ing them
+            np.add.at(bits, (self.indices >> 6) * self.shape[0] + owners, np.left_shift(np.uint64(1), (self.indices & 63).astype(np.uint64)))
+            self._bitsets = bits.reshape(words, self.shape[0])
+        return self._bitsets
+
+    def feature_totals(self, rows=None):
+        """Occurrences of every feature, over all sentences or the given row indices"""
+        import numpy as np
+
+        if rows is None:
+            return np.bincount(self.indices, weights=self.counts, minlength=self.shape[1]).astype(np.int64)
+        in_rows = np.zeros(self.shape[0], dtype=bool)
+        in_rows[np.asarray(rows, dtype=np.int64)] = True
+        entries = np.repeat(in_rows, np.diff(self.indptr))
+        return np.bincount(self.indices[entries], weights=self.counts[entries], minlength=self.shape[1]).astype(np.int64)
+
+
+def _row_gains(matrix: FeatureMatrix, rows, uncovered):
+    """Uncovered features in each of the given rows, gathered from their CSR slices in one go"""
+    import numpy as np
+
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[rows + 1] - starts
+    positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    return np.bincount(owners, weights=uncovered[matrix.indices[positions]], minlength=len(rows)).astype(np.int32)
+
+
+def _all_gains(matrix: FeatureMatrix, uncovered):
+    """Uncovered features in every row: popcounts of the row bitsets for small vocabularies,
+    otherwise differences of a running sum over the CSR entries"""
+    import numpy as np
+
+    if matrix.shape[1] <= BITSET_MAX_FEATURES:
+        mask = np.packbits(np.pad(uncovered, (0, -len(uncovered) % 64)), bitorder="little").view(np.uint64)
+        gains = np.zeros(matrix.shape[0], dtype=np.int32)
+        for word, bits in zip(mask, matrix.bitsets()):
+            if word:
+                gains += np.bitwise_count(bits & word)
+        return gains
+    running = np.zeros(len(matrix.indices) + 1, dtype=np.int64)
+    np.cumsum(uncovered[matrix.indices], out=running[1:])
+    return (running[matrix.indptr[1:]] - running[matrix.indptr[:-1]]).astype(np.int32)
+
+
+def greedy_select(matrix: FeatureMatrix, count: int, chunk_size: int = 1024):
+    """Lazy greedy set cover, returns (selected row indices, covered feature count after each pick)"""
+    import numpy as np
+
+    sentences, feature_count = matrix.shape
+    count = min(count, sentences)
+    distinct = np.diff(matrix.indptr).astype(np.int32)  # the gain of every sentence while nothing is covered
+    bound = distinct.copy()  # upper bound of every sentence's gain, -1 once taken
+    uncovered = np.ones(feature_count, dtype=bool)
+    remaining = feature_count
+    selected, curve = [], []
+    covered_total = 0
+
+    while len(selected) < count:
+        if remaining == 0 or bound.max() == 0:
+            # everything (still coverable) covered: start another round so further picks spread over all features again
+            uncovered[:] = True
+            remaining = feature_count
+            bound = distinct.copy()
+            bound[selected] = -1
+        top = int(bound.max())
+        chunk = np.flatnonzero(bound == top)[:chunk_size]
+        gains = _row_gains(matrix, chunk, uncovered)
+        bound[chunk] = gains
+        if not (gains == top).any():
+            # the chunk's best gain is a floor for this pick: every row bounded at or above it needs
+            # its true gain, in one full pass when that is a large share (small vocabularies)
+            at_or_above = bound >= gains.max()
+            if np.count_nonzero(at_or_above) > sentences // 8:
+                bound = _all_gains(matrix, uncovered)
+                bound[selected] = -1
+            else:
+                stale = np.flatnonzero(at_or_above)
+                for start in range(0, len(stale), chunk_size):
+                    rows = stale[start:start + chunk_size]
+                    bound[rows] = _row_gains(matrix, rows, uncovered)
+            top = int(bound.max())
+            chunk = np.flatnonzero(bound == top)
+        hits = chunk[bound[chunk] == top]
+        pick = int(hits[np.argmin(matrix.lengths[hits])])
+        selected.append(pick)
+        bound[pick] = -1
+        row = matrix.row(pick)
+        newly_covered = row[uncovered[row]]
+        uncovered[newly_covered] = False
+        remaining -= len(newly_covered)
+        covered_total = max(covered_total, feature_count - remaining)
+        curve.append(covered_total)
+    return selected, curve
+
+
+def _coverage_summary(matrix: FeatureMatrix, rows=None, rarest: int = 20):
+    import numpy as np
+
+    totals = matrix.feature_totals(rows)
+    covered = np.flatnonzero(totals)
+    by_count = covered[np.argsort(totals[covered], kind="stable")]
+    return {
+        "features_covered": int(len(covered)),
+        "features_total": matrix.shape[1],
+        "coverage": round(len(covered) / matrix.shape[1], 4) if matrix.shape[1] else 1.0,
+        "rarest": [{"feature": matrix.features[f], "count": int(totals[f])} for f in by_count[:rarest]],
+    }
+
+
+def _sampled_curve(curve: list, feature_total: int, points: int = 50):
+    step = max(1, len(curve) // points)
+    sampled = [{"prompts": i + 1, "coverage": round(covered / feature_total, 4) if feature_total else 1.0}
+               for i, covered in enumerate(curve) if (i + 1) % step == 0 or i + 1 == len(curve)]
+    return sampled
+
+
+class CoverageService:
+    @staticmethod
+    def _project_prompts(project_id: int):
+        """(texts, recorded flags) of a live project's prompts in order"""
+        with session_lock:
+            db = read_session()
+            try:
+                if not db.query(Project.id).filter(Project.id == project_id, Project.deleted_at.is_(None)).first():
+                    raise HTTPException(status_code=404, detail="Project not found")
+                rows = db.execute(select(
+                    Prompt.text, exists().where(Recording.prompt_id == Prompt.id)
+                ).where(Prompt.project_id == project_id).order_by(Prompt.order_index)).all()
+            finally:
+                db.close()
+        return [text for text, _ in rows], [bool(recorded) for _, recorded in rows]
+
+    @staticmethod
+    def project_coverage(project_id: int, unit: str = "char", rarest: int = 20):
+        """Feature coverage of a project's prompts and of the prompts recorded so far"""
+        import numpy as np
+
+        texts, recorded = CoverageService._project_prompts(project_id)
+        matrix = FeatureMatrix(texts, unit)
+        recorded_rows = [i for i, flag in enumerate(recorded) if flag]
+        recorded_summary = _coverage_summary(matrix, recorded_rows, rarest)
+        missing = np.flatnonzero((matrix.feature_totals() > 0) & (matrix.feature_totals(recorded_rows) == 0))
+        return {
+            "project_id": project_id,
+            "unit": unit,
+            "prompts": len(texts),
+            "recorded": len(recorded_rows),
+            "prompt_coverage": _coverage_summary(matrix, None, rarest),
+            "recorded_coverage": recorded_summary,
+            "not_yet_recorded_features": [matrix.features[f] for f in missing[:200]],
+        }
+
+    @staticmethod
+    def select_prompts(texts: list, count: int, unit: str = "char"):
+        """Pick count prompts from a corpus that cover as many features as possible"""
+        texts = [text for text in (normalize_prompt(text) for text in texts) if text]
+        if not texts:
+            raise HTTPException(status_code=400, detail="The corpus has no prompts")
+        matrix = FeatureMatrix(texts, unit)
+        selected, curve = greedy_select(matrix, count)
+        summary = _coverage_summary(matrix, selected)
+        summary.pop("rarest")
+        return {
+            "unit": unit,
+            "corpus_prompts": len(texts),
+            "selected": len(selected),
+            **summary,
+            "coverage_curve": _sampled_curve(curve, matrix.shape[1]),
+            "prompts": [texts[i] for i in selected],
+        }
+
+    @staticmethod
+    def create_project_from_selection(texts: list, count: int, project_name: str, unit: str = "char", is_rtl: bool = False):
+        """Select prompts for coverage and create a project from them (in selection order)"""
+        selection = CoverageService.select_prompts(texts, count, unit)
+        project = ProjectService.create_project_with_prompts(project_name, selection["prompts"], is_rtl)
+        selection["project"] = project
+        return selection
+
+    @staticmethod
+    def project_texts(project_id: int) -> list:
+        return CoverageService._project_prompts(project_id)[0]
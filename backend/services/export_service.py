@@ -1,39 +1,54 @@
 import os
-import boto3
-from boto3 import client
-import pandas as pd
-from datasets import Dataset, Audio
+import time
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
-from models.database import Project, Recording, Prompt, Setting, Interaction
+from models.database import Project, Recording, Prompt, Setting, Interaction, ReplicationJob, ExportManifest
 from database.connection import SessionLocal
 from database.session import session_lock
+from database.routing import read_session
 from services.settings_service import SettingsService
-from utils.logging import log_interaction
+from services.cleanup_service import CleanupService
+from utils.logging import log_interaction, logger
+from utils.metrics import observe_export
+from utils.response_cache import response_cache
 from config import AppConfig
 
 '''
 export services offers 2 export methods to S3 and to huggingface
+boto3 and datasets are imported on first use: they cost seconds of startup and hundreds of MB
+per worker and are only needed by the (rare) export calls
 '''
 
+MANIFEST_CHUNK_SIZE = 500
+S3_DELETE_BATCH = 1000  # DeleteObjects limit
+
+_live_project_ids = select(Project.id).where(Project.deleted_at.is_(None))
+
 
 class ExportService:
     @staticmethod
-    def get_s3_client()-> client:
-        s3:client = client("s3", 
+    def get_s3_client():
+        import boto3
+        s3 = boto3.client("s3", 
                         aws_access_key_id= AppConfig.get_aws_access_id(),
-                        aws_secret_access_key= AppConfig.get_aws_access_secret()
+                        aws_secret_access_key= AppConfig.get_aws_access_secret(),
+                        region_name=AppConfig.AWS_DEFAULT_REGION,
+                        endpoint_url=AppConfig.S3_ENDPOINT_URL
                         )
         return s3
     @classmethod
+    @observe_export("s3")
     def export_to_s3(cls, payload: dict = None):
-        """Export recordings to Amazon S3"""
+        """Export recordings to Amazon S3: a single file (payload filename) or a delta export of
+        one project (payload project_id) or all projects, optionally deleting removed recordings (delete_removed)"""
         bucket: str = SettingsService.get_setting("s3_bucket", "")
         storage_path = SettingsService.get_setting("storage_path", "recordings")
-        s3:client = cls.get_s3_client()
-        print(s3)
-
         if not bucket:
             return {"status": "error", "detail": "S3 bucket not configured"}
+        s3 = cls.get_s3_client()
         if payload and payload.get("filename"):
             fname = payload["filename"]
             fpath = os.path.join(storage_path, fname)
@@ -46,43 +61,163 @@ class ExportService:
             else:
                 return {"status": "error", "detail": "File not found"}
         
-        # fallback: upload all
-        uploaded = []
-        for fname in os.listdir(storage_path):
-            fpath = os.path.join(storage_path, fname)
-            if os.path.isfile(fpath):
+        # delta export of one project (payload project_id) or of every project
+        delete_removed = bool(payload and payload.get("delete_removed"))
+        if payload and payload.get("project_id") is not None:
+            project_ids = [int(payload["project_id"])]
+        else:
+            with session_lock:
+                db = SessionLocal()
                 try:
-                    print(f"uploading file {fname} to {bucket} at {fpath}")
-                    s3.upload_file(fpath, bucket, fname)
-
-                    uploaded.append(fname)
-                except Exception as e:
-                    continue
+                    project_ids = [project_id for (project_id,) in db.query(Project.id).filter(Project.deleted_at.is_(None)).order_by(Project.id)]
+                    if delete_removed:
+                        # objects of deleted (or cleared) projects are still in the manifest, remove them too
+                        exported_ids = {project_id for (project_id,) in db.query(ExportManifest.project_id).filter(
+                            ExportManifest.bucket == bucket, ExportManifest.project_id.isnot(None)
+                        ).distinct()}
+                        project_ids += sorted(exported_ids - set(project_ids))
+                finally:
+                    db.close()
         
-        return {"status": "ok", "uploaded": uploaded}
+        totals = {"uploaded": 0, "unchanged": 0, "deleted": 0, "missing": 0, "failed": []}
+        for project_id in project_ids:
+            result = cls.export_project_to_s3(s3, bucket, storage_path, project_id, delete_removed)
+            for key in ("uploaded", "unchanged", "deleted", "missing"):
+                totals[key] += result[key]
+            totals["failed"] += result["failed"]
+        return {"status": "ok" if not totals["failed"] else "partial", "projects": len(project_ids), **totals}
 
     @staticmethod
-    def export_to_huggingface(project_id: int):
-        """Export project recordings to Hugging Face"""
-        token = SettingsService.get_setting("huggingface_token", default=AppConfig.get_hf_token())
-        repo_id = SettingsService.get_setting("huggingface_repo", default=AppConfig.HUGGINGFACE_REPO)
+    def file_fingerprint(file_path: str):
+        """(size, mtime_ns, md5 hex) of a file"""
+        stat = os.stat(file_path)
+        digest = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+    @staticmethod
+    def save_manifest(db, bucket: str, entries: list):
+        """Upsert export_manifest rows (dicts with key, project_id, size, mtime_ns, checksum) in the caller's transaction"""
+        table = ExportManifest.__table__
+        now = datetime.utcnow()
+        for start in range(0, len(entries), MANIFEST_CHUNK_SIZE):
+            chunk = entries[start:start + MANIFEST_CHUNK_SIZE]
+            db.execute(table.delete().where(table.c.bucket == bucket, table.c.key.in_([entry["key"] for entry in chunk])))
+            db.execute(table.insert(), [{**entry, "bucket": bucket, "exported_at": now} for entry in chunk])
+
+    @classmethod
+    def export_project_to_s3(cls, s3, bucket: str, storage_path: str, project_id: int, delete_removed: bool = False):
+        """Upload a project's new or changed recordings, using the manifest to skip unchanged ones.
+        files whose size and mtime match the manifest are not read at all; otherwise the md5 decides.
+        with delete_removed, objects exported for recordings that no longer exist (all of them for a
+        deleted project) are deleted; manifest rows stay until then."""
+        with session_lock:
+            db = SessionLocal()
+            try:
+                recordings = db.query(Recording.filename, Recording.status).filter(
+                    Recording.project_id == project_id, Recording.project_id.in_(_live_project_ids)
+                ).all()
+                manifest = {
+                    row.key: row for row in db.query(
+                        ExportManifest.key, ExportManifest.size, ExportManifest.mtime_ns, ExportManifest.checksum
+                    ).filter(ExportManifest.bucket == bucket, ExportManifest.project_id == project_id)
+                }
+            finally:
+                db.close()
         
-        if not token or not repo_id:
-            return {"status": "error", "detail": "Hugging Face token or repo not configured"}
+        # recordings still being converted keep their exported object until the next export
+        filenames = [filename for filename, status in recordings if status == "ready"]
+        result = {"project_id": project_id, "uploaded": 0, "unchanged": 0, "deleted": 0, "missing": 0, "failed": []}
+        candidates = []
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(storage_path, filename))
+            except FileNotFoundError:
+                result["missing"] += 1
+                continue
+            entry = manifest.get(filename)
+            if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                result["unchanged"] += 1
+            else:
+                candidates.append(filename)
         
-        storage_path = SettingsService.get_setting("storage_path", "recordings")
+        def sync_file(filename):
+            file_path = os.path.join(storage_path, filename)
+            size, mtime_ns, checksum = cls.file_fingerprint(file_path)
+            entry = manifest.get(filename)
+            fingerprint = {"key": filename, "project_id": project_id, "size": size, "mtime_ns": mtime_ns, "checksum": checksum}
+            if entry is not None and entry.checksum == checksum:
+                return "unchanged", fingerprint  # touched but identical, only the manifest is refreshed
+            s3.upload_file(file_path, bucket, filename)
+            return "uploaded", fingerprint
+        
+        exported = []
+        with ThreadPoolExecutor(max_workers=AppConfig.S3_EXPORT_CONCURRENCY) as executor:
+            futures = {executor.submit(sync_file, filename): filename for filename in candidates}
+            for future in as_completed(futures):
+                try:
+                    outcome, fingerprint = future.result()
+                except Exception as e:
+                    logger.error(f"S3 export of {futures[future]} failed: {e}")
+                    result["failed"].append(futures[future])
+                    continue
+                result[outcome] += 1
+                exported.append(fingerprint)
+        
+        removed = sorted(set(manifest) - {filename for filename, _ in recordings}) if delete_removed else []
+        if removed:
+            # the key is the file name: a live project that recorded the same text still needs the object
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    in_use = set()
+                    for start in range(0, len(removed), MANIFEST_CHUNK_SIZE):
+                        in_use.update(filename for (filename,) in db.query(Recording.filename).filter(
+                            Recording.filename.in_(removed[start:start + MANIFEST_CHUNK_SIZE]),
+                            Recording.project_id.in_(_live_project_ids)
+                        ))
+                finally:
+                    db.close()
+            removed = [key for key in removed if key not in in_use]
+        for start in range(0, len(removed), S3_DELETE_BATCH):
+            batch = removed[start:start + S3_DELETE_BATCH]
+            s3.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True})
+            result["deleted"] += len(batch)
         
-        # Get project info
+        if exported or removed:
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    cls.save_manifest(db, bucket, exported)
+                    for start in range(0, len(removed), MANIFEST_CHUNK_SIZE):
+                        db.query(ExportManifest).filter(
+                            ExportManifest.bucket == bucket, ExportManifest.key.in_(removed[start:start + MANIFEST_CHUNK_SIZE])
+                        ).delete(synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+        logger.info(f"S3 delta export of project {project_id}: {result['uploaded']} uploaded, "
+                    f"{result['unchanged']} unchanged, {result['deleted']} deleted, {len(result['failed'])} failed")
+        return result
+
+    @staticmethod
+    def build_dataset_rows(project_id: int, storage_path: str):
+        """Collect a project's recordings as dataset rows, returns (project name, rows); name is None if the project is missing"""
         with session_lock:
-            db = SessionLocal()
+            db = read_session()
             try:
-                project = db.query(Project).filter(Project.id == project_id).first()
+                project = db.query(Project).filter(Project.id == project_id, Project.deleted_at.is_(None)).first()
                 if not project:
-                    return {"status": "error", "detail": "Project not found"}
+                    return None, []
                 
                 # Get recordings for this project with prompt information
-                recordings = db.query(Recording).join(Prompt, Recording.prompt_id == Prompt.id).filter(
-                    Recording.project_id == project_id
+                recordings = db.query(Recording).join(Prompt, Recording.prompt_id == Prompt.id).options(
+                    joinedload(Recording.prompt)
+                ).filter(
+                    Recording.project_id == project_id,
+                    Recording.status == "ready"  # compressed uploads still being converted are left out
                 ).order_by(Prompt.order_index).all()
                 
                 dataset_rows = []
@@ -94,69 +229,87 @@ class ExportService:
                         "order_index": rec.prompt.order_index,
                         "recorded_at": rec.recorded_at.isoformat() + 'Z' if rec.recorded_at else None
                     })
-                
-                if not dataset_rows:
-                    return {"status": "error", "detail": "No audio files found for this project"}
-                
-                # Create dataset with project name
-                dataset_name = f"{repo_id}-{project.name.lower().replace(' ', '-')}"
-                
-                try:
-                    # Create dataset
-                    
-                    ds = Dataset.from_list(dataset_rows)
-                    ds = ds.cast_column("audio", Audio(sampling_rate=16000, decode=False, mono=False))
-                    
-                    try:
-                        # Push to hub with timeout
-                        ds.push_to_hub(dataset_name, token=token, private=True)
-                    except TimeoutError:
-                        log_interaction("export_hf_timeout", {"project_id": project_id, "dataset_name": dataset_name})
-                        return {"status": "error", "detail": "Upload timed out. Please try again or check your internet connection."}
-                    except Exception as e:
-                        log_interaction("export_hf_error", {"error": str(e), "project_id": project_id})
-                        return {"status": "error", "detail": f"Failed to push dataset: {str(e)}"}
-                    
-                except Exception as e:
-                    log_interaction("export_hf_error", {"error": str(e), "project_id": project_id})
-                    return {"status": "error", "detail": f"Failed to create dataset: {str(e)}"}
-                
-                log_interaction("export_hf", {"count": len(dataset_rows), "project_id": project_id, "dataset_name": dataset_name})
-                return {"status": "ok", "uploaded": [row["audio"] for row in dataset_rows], "dataset_name": dataset_name}
+                return project.name, dataset_rows
             finally:
                 db.close()
 
     @staticmethod
-    def clear_database():
-        """Clear all data from the database and delete all audio files"""
+    def build_hf_dataset(dataset_rows: list):
+        """Build the Hugging Face dataset for the given rows"""
+        from datasets import Dataset, Audio
+        ds = Dataset.from_list(dataset_rows)
+        return ds.cast_column("audio", Audio(sampling_rate=AppConfig.AUDIO_SAMPLE_RATE, decode=False, mono=False))
+
+    @classmethod
+    @observe_export("huggingface")
+    def export_to_huggingface(cls, project_id: int):
+        """Export project recordings to Hugging Face"""
+        token = SettingsService.get_setting("huggingface_token", default=AppConfig.get_hf_token())
+        repo_id = SettingsService.get_setting("huggingface_repo", default=AppConfig.HUGGINGFACE_REPO)
+        
+        if not token or not repo_id:
+            return {"status": "error", "detail": "Hugging Face token or repo not configured"}
+        
         storage_path = SettingsService.get_setting("storage_path", "recordings")
         
-        # Delete all audio files
-        if os.path.exists(storage_path):
-            for filename in os.listdir(storage_path):
-                file_path = os.path.join(storage_path, filename)
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                except Exception as e:
-                    print(f"Failed to delete file {filename}: {e}")
+        # Rows are collected under the session lock, the dataset build and upload run without it
+        project_name, dataset_rows = cls.build_dataset_rows(project_id, storage_path)
+        if project_name is None:
+            return {"status": "error", "detail": "Project not found"}
+        
+        if not dataset_rows:
+            return {"status": "error", "detail": "No audio files found for this project"}
+        
+        # Create dataset with project name
+        dataset_name = f"{repo_id}-{project_name.lower().replace(' ', '-')}"
+        
+        try:
+            # Create dataset
+            ds = cls.build_hf_dataset(dataset_rows)
+            
+            try:
+                # Push to hub with timeout
+                ds.push_to_hub(dataset_name, token=token, private=True)
+            except TimeoutError:
+                log_interaction("export_hf_timeout", {"project_id": project_id, "dataset_name": dataset_name})
+                return {"status": "error", "detail": "Upload timed out. Please try again or check your internet connection."}
+            except Exception as e:
+                log_interaction("export_hf_error", {"error": str(e), "project_id": project_id})
+                return {"status": "error", "detail": f"Failed to push dataset: {str(e)}"}
+            
+        except Exception as e:
+            log_interaction("export_hf_error", {"error": str(e), "project_id": project_id})
+            return {"status": "error", "detail": f"Failed to create dataset: {str(e)}"}
+        
+        log_interaction("export_hf", {"count": len(dataset_rows), "project_id": project_id, "dataset_name": dataset_name})
+        return {"status": "ok", "uploaded": [row["audio"] for row in dataset_rows], "dataset_name": dataset_name}
+
+    @staticmethod
+    def clear_database():
+        """Clear all data: projects are tombstoned and, like the audio files, removed in the background"""
+        storage_path = SettingsService.get_setting("storage_path", "recordings")
+        cleared_at = time.time()
         
-        # Clear all database tables
+        # Clear the small tables, tombstone the projects (recordings and prompts go with them)
         with session_lock:
             db = SessionLocal()
             try:
-                # Clear all tables in reverse dependency order
                 db.query(Interaction).delete()
-                db.query(Recording).delete()
-                db.query(Prompt).delete()
-                db.query(Project).delete()
+                db.query(ReplicationJob).delete()
+                # the export manifest is kept: an export with delete_removed still finds the old objects
+                CleanupService.tombstone_all_projects(db)
+                # Delete all audio files, including ones no recording refers to
+                CleanupService.schedule_purge(db, storage_path, cleared_at)
                 db.query(Setting).delete()
-                db.commit()
+                SettingsService.commit(db)
+                response_cache.bump_all()
                 
                 log_interaction("clear_database", {"message": "All data cleared"})
-                return {"status": "ok", "message": "All data cleared successfully"}
             except Exception as e:
                 db.rollback()
                 return {"status": "error", "detail": f"Failed to clear database: {str(e)}"}
             finally:
-                db.close() 
\ No newline at end of file
+                db.close()
+        
+        CleanupService.schedule()
+        return {"status": "ok", "message": "All data cleared successfully"}
@@ -0,0 +1,255 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, bindparam
+from models.database import Project, Recording
+from database.connection import engine, SessionLocal
+from database.session import session_lock
+from database.routing import mark_write
+from services.settings_service import SettingsService
+from utils.logging import logger
+from utils.response_cache import response_cache
+from config import AppConfig
+
+'''
+storage / database consistency check.
+the recordings table is streamed through a server-side cursor while another thread scans
+storage_path with os.scandir, then both sides are compared:
+- orphans: files no recording refers to (dot files are temporary files and are ignored)
+- missing: recordings whose file does not exist
+- size mismatches: files whose size differs from recordings.size_bytes
+- unknown sizes: recordings from before size_bytes was recorded
+recordings of tombstoned projects are left to the cleanup worker; recordings that are not
+'ready' (being converted, or a failed conversion waiting for a new take) are skipped too.
+the scan does not hold the session lock; repair re-checks every item before acting on it and
+works in short batches: orphans older than the grace period are deleted, rows of missing files
+are deleted and unknown sizes are set from the files. size mismatches are only reported: a file
+shorter than the upload it came from is truncated, and overwriting size_bytes would hide that.
+an unmounted or misconfigured storage path makes every recording look missing, so repair is
+refused (unless forced) when storage holds no files or more than FSCK_MAX_MISSING_FRACTION of
+the recordings are missing.
+'''
+
+REPAIR_BATCH_SIZE = 1000
+
+
+def _scan_storage(storage_path: str) -> dict:
+    """{filename: (size, mtime)} of the regular files in storage_path"""
+    files = {}
+    if not os.path.isdir(storage_path):
+        return files
+    with os.scandir(storage_path) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            files[entry.name] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def _repair_refusal(files_on_disk: int, missing: int, recordings: int):
+    """Why repairing would be unsafe, None when it is not"""
+    if recordings and files_on_disk == 0:
+        return "the storage path holds no files"
+    if recordings and missing / recordings > AppConfig.FSCK_MAX_MISSING_FRACTION:
+        return f"{missing} of {recordings} recordings are missing their file (more than FSCK_MAX_MISSING_FRACTION)"
+    return None
+
+
+def _stream_recordings(batch_size: int = 10000) -> tuple:
+    """{filename: (id, project_id, size_bytes)} for the ready recordings of live projects, plus the filenames
+    left alone: recordings of tombstoned projects and those whose conversion is not done"""
+    rows = {}
+    skipped = set()
+    with engine.connect() as conn:
+        deleted_projects = {project_id for (project_id,) in conn.execute(
+            select(Project.id).where(Project.deleted_at.isnot(None))
+        )}
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            select(Recording.id, Recording.filename, Recording.project_id, Recording.size_bytes, Recording.status)
+        )
+        for recording_id, filename, project_id, size_bytes, status in result:
+            if project_id in deleted_projects or status != "ready":
+                skipped.add(filename)
+            else:
+                rows[filename] = (recording_id, project_id, size_bytes)
+    return rows, skipped
+
+
+class FsckService:
+    _jobs = OrderedDict()
+    _jobs_lock = threading.Lock()
+    MAX_JOBS = 20
+
+    @classmethod
+    def run(cls, repair: bool = False, grace_seconds: float = None, sample: int = 100, progress=None, force: bool = False):
+        """Check (and optionally repair) storage against the recordings table, returns a report;
+        force repairs even when storage looks unmounted"""
+        grace_seconds = AppConfig.FSCK_ORPHAN_GRACE if grace_seconds is None else grace_seconds
+        progress = progress or (lambda message: None)
+        storage_path = SettingsService.get_setting("storage_path", "recordings")
+        started = time.monotonic()
+
+        progress(f"🔍 Scanning {storage_path} and the recordings table")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            files_future = executor.submit(_scan_storage, storage_path)
+            rows_future = executor.submit(_stream_recordings)
+            files = files_future.result()
+            rows, skipped = rows_future.result()
+        progress(f"  📁 {len(files)} files, 🗄️  {len(rows)} recordings")
+
+        missing, mismatched, unknown = [], [], []
+        for filename, (recording_id, project_id, size_bytes) in rows.items():
+            on_disk = files.pop(filename, None)
+            if on_disk is None:
+                missing.append((recording_id, project_id, filename))
+            elif size_bytes is None:
+                unknown.append((recording_id, filename, on_disk[0]))
+            elif size_bytes != on_disk[0]:
+                mismatched.append((recording_id, filename, size_bytes, on_disk[0]))
+        cutoff = time.time() - grace_seconds
+        orphans = [filename for filename in files if filename not in skipped]
+        old_orphans = [filename for filename in orphans if files[filename][1] < cutoff]
+
+        report = {
+            "storage_path": storage_path,
+            "files": len(files) + len(rows) - len(missing),
+            "recordings": len(rows),
+            "orphans": {"count": len(orphans), "older_than_grace": len(old_orphans), "sample": orphans[:sample]},
+            "missing": {"count": len(missing), "sample": [filename for _, _, filename in missing[:sample]]},
+            "size_mismatches": {"count": len(mismatched), "sample": [
+                {"filename": filename, "expected": expected, "actual": actual}
+                for _, filename, expected, actual in mismatched[:sample]
+            ]},
+            "unknown_sizes": len(unknown),
+        }
+        refusal = None if force else _repair_refusal(report["files"], len(missing), len(rows))
+        if repair and refusal:
+            progress(f"🛑 Not repairing: {refusal} (check the storage path, or force)")
+            report["repair_refused"] = refusal
+        elif repair:
+            progress("🔧 Repairing")
+            report["repaired"] = {
+                "orphans_deleted": cls._delete_orphans(storage_path, old_orphans),
+                "missing_rows_deleted": cls._delete_missing_rows(storage_path, missing),
+                "sizes_updated": cls._update_sizes(unknown),
+            }
+        report["duration_s"] = round(time.monotonic() - started, 2)
+        return report
+
+    @staticmethod
+    def _delete_orphans(storage_path: str, orphans: list) -> int:
+        deleted = 0
+        for start in range(0, len(orphans), REPAIR_BATCH_SIZE):
+            batch = orphans[start:start + REPAIR_BATCH_SIZE]
+            # a recording may have been committed for the file since the scan
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    referenced = {filename for (filename,) in db.query(Recording.filename).filter(Recording.filename.in_(batch))}
+                finally:
+                    db.close()
+            for filename in batch:
+                if filename in referenced:
+                    continue
+                try:
+                    os.remove(os.path.join(storage_path, filename))
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"fsck: failed to delete orphan {filename}: {e}")
+        return deleted
+
+    @staticmethod
+    def _delete_missing_rows(storage_path: str, missing: list) -> int:
+        deleted = 0
+        for start in range(0, len(missing), REPAIR_BATCH_SIZE):
+            # the file may have been written again since the scan
+            batch = [(recording_id, project_id) for recording_id, project_id, filename in missing[start:start + REPAIR_BATCH_SIZE]
+                     if not os.path.exists(os.path.join(storage_path, filename))]
+            if not batch:
+                continue
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    deleted += db.query(Recording).filter(
+                        Recording.id.in_([recording_id for recording_id, _ in batch])
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+            mark_write()
+            for project_id in {project_id for _, project_id in batch}:
+                response_cache.bump_project(project_id)
+        return deleted
+
+    @staticmethod
+    def _update_sizes(unknown: list) -> int:
+        """Record the file size of recordings stored before size_bytes existed (still NULL)"""
+        updates = [{"recording_id": recording_id, "size": actual} for recording_id, _, actual in unknown]
+        table = Recording.__table__
+        statement = table.update().where(
+            table.c.id == bindparam("recording_id"), table.c.size_bytes.is_(None)
+        ).values(size_bytes=bindparam("size"))
+        for start in range(0, len(updates), REPAIR_BATCH_SIZE):
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    db.execute(statement, updates[start:start + REPAIR_BATCH_SIZE])
+                    db.commit()
+                finally:
+                    db.close()
+        return len(updates)
+
+    @classmethod
+    def start_job(cls, repair: bool = False, force: bool = False):
+        """Run a check in a background thread, returns the job (the running one if a check is in progress)"""
+        with cls._jobs_lock:
+            for job in cls._jobs.values():
+                if job["status"] == "running":
+                    return dict(job)
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "running",
+                "repair": repair,
+                "force": force,
+                "started_at": datetime.utcnow().isoformat() + 'Z',
+                "finished_at": None,
+                "report": None,
+                "error": None,
+            }
+            cls._jobs[job["id"]] = job
+            while len(cls._jobs) > cls.MAX_JOBS:
+                cls._jobs.popitem(last=False)
+        threading.Thread(target=cls._run_job, args=(job,), name="fsck", daemon=True).start()
+        return dict(job)
+
+    @classmethod
+    def _run_job(cls, job: dict):
+        try:
+            report = cls.run(repair=job["repair"], force=job["force"])
+            job.update(status="done", report=report)
+            logger.info(f"fsck job {job['id']} finished: {report}")
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+            logger.error(f"fsck job {job['id']} failed: {e}")
+        job["finished_at"] = datetime.utcnow().isoformat() + 'Z'
+
+    @classmethod
+    def get_job(cls, job_id: str):
+        with cls._jobs_lock:
+            job = cls._jobs.get(job_id)
+            return dict(job) if job else None
+
+    @classmethod
+    def list_jobs(cls):
+        with cls._jobs_lock:
+            return [dict(job) for job in reversed(cls._jobs.values())]
@@ -0,0 +1,73 @@
+import time
+import threading
+from database.connection import engine
+from database.coordination import acquire_lease
+from database.sqlite import is_sqlite
+from utils.logging import logger
+from config import AppConfig
+
+'''
+background database maintenance: refreshes planner statistics and returns pages freed by bulk
+deletes to the filesystem. runs after deletes (debounced, so a burst of deletes costs one run)
+and periodically; with several workers the periodic run is leased to one worker per interval.
+statements run without the session lock; on SQLite the busy timeout covers the short write
+locks, and incremental vacuum works in small batches to keep them short.
+'''
+
+VACUUM_BATCH_PAGES = 2000
+
+
+class MaintenanceService:
+    _pending = threading.Event()
+    _thread = None
+
+    @classmethod
+    def start(cls):
+        """Start the maintenance thread (idempotent)"""
+        if cls._thread is not None or not AppConfig.DB_MAINTENANCE_ENABLED:
+            return
+        cls._thread = threading.Thread(target=cls._run, name="db-maintenance", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def schedule(cls):
+        """Request a maintenance run, e.g. after a bulk delete"""
+        cls._pending.set()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            triggered = cls._pending.wait(timeout=AppConfig.DB_MAINTENANCE_INTERVAL)
+            if triggered:
+                # let a burst of deletes finish before running
+                time.sleep(AppConfig.DB_MAINTENANCE_DELAY)
+                cls._pending.clear()
+            try:
+                # with several workers, one of them (the lease holder) does the periodic runs
+                if triggered or not AppConfig.SHARED_STATE or acquire_lease("db-maintenance", AppConfig.DB_MAINTENANCE_INTERVAL):
+                    cls.run_maintenance()
+            except Exception as e:
+                logger.error(f"database maintenance failed: {e}")
+
+    @staticmethod
+    def run_maintenance():
+        """Refresh statistics and reclaim free pages, returns a summary"""
+        summary = {}
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if is_sqlite(engine):
+                conn.exec_driver_sql("ANALYZE")
+                free_pages = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                summary["free_pages_before"] = free_pages
+                if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+                    while free_pages > 0:
+                        conn.exec_driver_sql(f"PRAGMA incremental_vacuum({VACUUM_BATCH_PAGES})").fetchall()
+                        remaining = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                        if remaining >= free_pages:
+                            break
+                        free_pages = remaining
+                summary["free_pages_after"] = free_pages
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            else:
+                conn.exec_driver_sql("ANALYZE TABLE projects, prompts, recordings").fetchall()
+        logger.info(f"database maintenance completed: {summary}")
+        return summary
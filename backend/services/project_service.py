@@ -1,23 +1,113 @@
 from fastapi import HTTPException
+from sqlalchemy import select, func, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
-from models.database import Project, Prompt
+from models.database import Project, Prompt, Recording
 from database.connection import SessionLocal
 from database.session import session_lock
+from database.routing import async_read_session, mark_write
 from utils.logging import logger
+from utils.response_cache import response_cache
+from utils.text_utils import dedupe_prompts
+from services.cleanup_service import CleanupService
+
+
+def _existing_prompt_hashes(db: Session, hashes: list, chunk_size: int = 500) -> set:
+    """The given prompt hashes that already exist in a live project"""
+    existing = set()
+    for start in range(0, len(hashes), chunk_size):
+        existing.update(text_hash for (text_hash,) in db.query(Prompt.text_hash).filter(
+            Prompt.text_hash.in_(hashes[start:start + chunk_size]),
+            Prompt.project_id.in_(select(Project.id).where(Project.deleted_at.is_(None)))
+        ).distinct())
+    return existing
+
+
+def _project_stats_statement(project_id: int = None):
+    """Projects with their prompt/recording counts and last recorded prompt index in one query"""
+    prompt_counts = select(
+        Prompt.project_id, func.count().label("total_prompts")
+    ).group_by(Prompt.project_id).subquery()
+    recording_counts = select(
+        Recording.project_id, func.count().label("recorded_count")
+    ).group_by(Recording.project_id).subquery()
+    last_recorded = select(
+        Prompt.project_id, func.max(Prompt.order_index).label("last_recorded_index")
+    ).join(Recording, Prompt.id == Recording.prompt_id).group_by(Prompt.project_id).subquery()
+
+    statement = select(
+        Project,
+        func.coalesce(prompt_counts.c.total_prompts, 0),
+        func.coalesce(recording_counts.c.recorded_count, 0),
+        last_recorded.c.last_recorded_index,
+    ).outerjoin(prompt_counts, prompt_counts.c.project_id == Project.id
+    ).outerjoin(recording_counts, recording_counts.c.project_id == Project.id
+    ).outerjoin(last_recorded, last_recorded.c.project_id == Project.id
+    ).where(Project.deleted_at.is_(None))
+    if project_id is not None:
+        statement = statement.where(Project.id == project_id)
+    return statement
+
+
+def _project_summary(project, total_prompts: int, recorded_count: int, last_recorded_index):
+    return {
+        "id": project.id, 
+        "name": project.name, 
+        "is_rtl": bool(project.is_rtl),
+        "created_at": project.created_at.isoformat() + 'Z' if project.created_at else None,
+        "total_prompts": total_prompts,
+        "recorded_count": recorded_count,
+        "last_recorded_index": last_recorded_index if recorded_count and last_recorded_index is not None else -1
+    }
+
+
+def _project_prompts_statement(project_id: int):
+    return select(Prompt.text).where(Prompt.project_id == project_id).order_by(Prompt.order_index)
+
+
+def _project_detail(row, prompts: list):
+    project, _, recorded_count, last_recorded_index = row
+    summary = _project_summary(project, len(prompts), recorded_count, last_recorded_index)
+    return {
+        "id": summary["id"],
+        "name": summary["name"],
+        "is_rtl": summary["is_rtl"],
+        "created_at": summary["created_at"],
+        "prompts": prompts,
+        "total_prompts": summary["total_prompts"],
+        "recorded_count": summary["recorded_count"],
+        "last_recorded_index": summary["last_recorded_index"]
+    }
 
 
 class ProjectService:
     @staticmethod
-    def create_project_with_prompts(project_name: str, prompts: list, is_rtl: bool = False):
-        """Create a project with given prompts"""
+    def create_project_with_prompts(project_name: str, prompts: list, is_rtl: bool = False, dedupe_across_projects: bool = False):
+        """Create a project with given prompts (normalized, repeats dropped)"""
+        prompts, hashes, duplicates_dropped = dedupe_prompts(prompts)
         with session_lock:
             db = SessionLocal()
             logger.debug(f"Retrieved db session: {SessionLocal.kw}")
             try:
                 # Check if project name already exists
-                existing_project = db.query(Project).filter(Project.name == project_name).first()
+                existing_project = db.query(Project).filter(Project.name == project_name, Project.deleted_at.is_(None)).first()
                 if existing_project:
                     raise HTTPException(status_code=400, detail="Project name already exists")
+                # a tombstoned project can still hold the name (e.g. a name ending in its tombstone suffix)
+                tombstoned = db.query(Project).filter(Project.name == project_name, Project.deleted_at.isnot(None)).first()
+                if tombstoned:
+                    CleanupService.release_name(tombstoned)
+                    db.flush()
+                
+                cross_project_duplicates = 0
+                if dedupe_across_projects:
+                    existing_hashes = _existing_prompt_hashes(db, hashes)
+                    kept = [(text, text_hash) for text, text_hash in zip(prompts, hashes) if text_hash not in existing_hashes]
+                    cross_project_duplicates = len(prompts) - len(kept)
+                    prompts = [text for text, _ in kept]
+                    hashes = [text_hash for _, text_hash in kept]
+                if not prompts:
+                    raise HTTPException(status_code=400, detail="No new prompts left after removing duplicates")
                 
                 # Create project
                 project = Project(name=project_name, is_rtl=1 if is_rtl else 0)
@@ -25,18 +115,32 @@ class ProjectService:
                 db.flush()  # Get the project ID
                 
                 # Create prompt records
-                for index, prompt_text in enumerate(prompts):
-                    prompt = Prompt(
-                        project_id=project.id,
-                        text=prompt_text,
-                        order_index=index
-                    )
-                    db.add(prompt)
+                db.execute(insert(Prompt), [
+                    {"project_id": project.id, "text": text, "text_hash": text_hash, "order_index": index}
+                    for index, (text, text_hash) in enumerate(zip(prompts, hashes))
+                ])
             
                 db.commit()
+                mark_write()
+                response_cache.bump_project(project.id)
                 logger.debug(f"project_id: {project.id}, prompt_count: {len(prompts)}, is_rtl: {is_rtl}")
-                return {"project_id": project.id, "prompt_count": len(prompts), "is_rtl": is_rtl}
+                result = {
+                    "project_id": project.id,
+                    "prompt_count": len(prompts),
+                    "is_rtl": is_rtl,
+                    "duplicates_dropped": duplicates_dropped + cross_project_duplicates,
+                }
+                if dedupe_across_projects:
+                    result["cross_project_duplicates"] = cross_project_duplicates
+                return result
                 
+            except HTTPException:
+                db.rollback()
+                raise
+            except IntegrityError:
+                # created by a concurrent request (possibly on another worker) after the check above
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Project name already exists")
             except Exception as e:
                 db.rollback()
                 raise HTTPException(status_code=500, detail=f"Failed to create project: {str(e)}")
@@ -44,126 +148,49 @@ class ProjectService:
                 db.close()
 
     @staticmethod
-    def list_projects():
-        """List all projects with their statistics"""
-        with session_lock:
-            db = SessionLocal()
-            try:
-                projects = db.query(Project).all()
-                result = []
-                for p in projects:
-                    # Get total prompts for this project
-                    total_prompts = db.query(Prompt).filter(Prompt.project_id == p.id).count()
-                    
-                    # Get recordings for this project
-                    from models.database import Recording
-                    recordings = db.query(Recording).filter(Recording.project_id == p.id).all()
-                    recorded_count = len(recordings)
-                    
-                    # Find last recorded index
-                    last_recorded_index = -1
-                    if recordings:
-                        # Get the highest order_index from recorded prompts
-                        recorded_prompts = db.query(Prompt).join(Recording, Prompt.id == Recording.prompt_id).filter(
-                            Prompt.project_id == p.id
-                        ).all()
-                        if recorded_prompts:
-                            last_recorded_index = max(p.order_index for p in recorded_prompts)
-                    
-                    result.append({
-                        "id": p.id, 
-                        "name": p.name, 
-                        "is_rtl": bool(p.is_rtl),
-                        "created_at": p.created_at.isoformat() + 'Z' if p.created_at else None,
-                        "total_prompts": total_prompts,
-                        "recorded_count": recorded_count,
-                        "last_recorded_index": last_recorded_index
-                    })
-                return {"projects": result}
-            finally:
-                db.close()
+    async def list_projects_async():
+        """List all projects with their statistics (asyncio session)"""
+        async with async_read_session() as db:
+            rows = (await db.execute(_project_stats_statement())).all()
+            return {"projects": [_project_summary(*row) for row in rows]}
 
     @staticmethod
-    def get_project(project_id: int):
-        """Get a specific project with its prompts"""
-        with session_lock:
-            db = SessionLocal()
-            try:
-                project = db.query(Project).filter(Project.id == project_id).first()
-                if not project:
-                    raise HTTPException(status_code=404, detail="Project not found")
-                
-                # Get prompts for this project
-                prompts = db.query(Prompt).filter(
-                    Prompt.project_id == project_id
-                ).order_by(Prompt.order_index).all()
-                
-                # Get recordings for this project
-                from models.database import Recording
-                recordings = db.query(Recording).filter(Recording.project_id == project_id).all()
-                recorded_count = len(recordings)
-                
-                # Find last recorded index
-                last_recorded_index = -1
-                if recordings:
-                    # Get the highest order_index from recorded prompts
-                    recorded_prompts = db.query(Prompt).join(Recording, Prompt.id == Recording.prompt_id).filter(
-                        Prompt.project_id == project_id
-                    ).all()
-                    if recorded_prompts:
-                        last_recorded_index = max(p.order_index for p in recorded_prompts)
-                
-                return {
-                    "id": project.id,
-                    "name": project.name,
-                    "is_rtl": bool(project.is_rtl),
-                    "created_at": project.created_at.isoformat() + 'Z' if project.created_at else None,
-                    "prompts": [p.text for p in prompts],
-                    "total_prompts": len(prompts),
-                    "recorded_count": recorded_count,
-                    "last_recorded_index": last_recorded_index
-                }
-            finally:
-                db.close()
+    async def get_project_async(project_id: int):
+        """Get a specific project with its prompts (asyncio session)"""
+        async with async_read_session() as db:
+            row = (await db.execute(_project_stats_statement(project_id))).first()
+            if not row:
+                raise HTTPException(status_code=404, detail="Project not found")
+            
+            prompts = (await db.execute(_project_prompts_statement(project_id))).scalars().all()
+            return _project_detail(row, prompts)
 
     @staticmethod
     def delete_project(project_id: int):
-        """Delete a project and all its associated data"""
-        from services.settings_service import SettingsService
-        from models.database import Recording
-        from utils.file_utils import delete_audio_file
-        
-        storage_path = SettingsService.get_setting("storage_path", "recordings")
-        
+        """Delete a project: the project is tombstoned right away, its recordings, prompts and files are removed in the background"""
         with session_lock:
             db = SessionLocal()
             try:
-                project = db.query(Project).filter(Project.id == project_id).first()
+                project = db.query(Project).filter(Project.id == project_id, Project.deleted_at.is_(None)).first()
                 if not project:
                     raise HTTPException(status_code=404, detail="Project not found")
                 
-                # Delete all recordings for this project
-                recordings = db.query(Recording).filter(Recording.project_id == project_id).all()
-                
-                for recording in recordings:
-                    delete_audio_file(recording.filename, storage_path)
-                
-                # Delete recordings from database
-                db.query(Recording).filter(Recording.project_id == project_id).delete()
-                
-                # Delete prompts from database
-                db.query(Prompt).filter(Prompt.project_id == project_id).delete()
-                
-                # Delete project
-                db.delete(project)
+                name = project.name
+                CleanupService.tombstone_project(project)
                 db.commit()
+                mark_write()
+                response_cache.bump_project(project_id)
                 
                 from utils.logging import log_interaction
-                log_interaction("delete_project", {"project_id": project_id, "name": project.name})
+                log_interaction("delete_project", {"project_id": project_id, "name": name})
                 
-                return {"status": "ok", "message": f"Project '{project.name}' deleted successfully"}
+                CleanupService.schedule()
+                
+                return {"status": "ok", "message": f"Project '{name}' deleted successfully"}
+            except HTTPException:
+                raise
             except Exception as e:
                 db.rollback()
                 raise HTTPException(status_code=500, detail=f"Failed to delete project: {str(e)}")
             finally:
-                db.close() 
\ No newline at end of file
+                db.close()
@@ -1,55 +1,177 @@
+import orjson
 from fastapi import HTTPException
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
-from models.database import Recording, Prompt
+from starlette.concurrency import run_in_threadpool
+from models.database import Recording, Prompt, Project
 from database.connection import SessionLocal
+from database.async_connection import AsyncSessionLocal
 from database.session import session_lock
+from database.routing import async_read_session, mark_write
 from services.settings_service import SettingsService
-from utils.file_utils import save_audio_file, delete_audio_file
+from services.replication_service import ReplicationService
+from services.transcode_service import TranscodeService
+from utils.audio_utils import compressed_format
+from utils.file_utils import audio_filename, stage_audio_file, save_transcode_source, delete_audio_file
 from utils.logging import log_interaction
+from utils.metrics import observe_upload
+from utils.response_cache import response_cache
+from utils.text_utils import prompt_hash
 import os
 from fastapi.responses import FileResponse
 
+
+_FILENAME_CONFLICT = "A recording of the same text belongs to another project"
+
+# projects that are not tombstoned (deleted, waiting for the cleanup worker)
+_live_project_ids = select(Project.id).where(Project.deleted_at.is_(None))
+
+
+def _prompt_conditions(project_id: int, text: str):
+    """A live project's prompt by text, compared in normalized form (see utils.text_utils)"""
+    return (
+        Prompt.project_id == project_id,
+        Prompt.text_hash == prompt_hash(text),
+        Prompt.project_id.in_(_live_project_ids),
+    )
+
+
+def _project_recordings_statement(project_id: int):
+    """Recordings of a project with their prompt position, in prompt order"""
+    return select(
+        Recording.text, Recording.filename, Recording.prompt_id, Prompt.order_index, Recording.recorded_at, Recording.status
+    ).join(Prompt, Recording.prompt_id == Prompt.id).where(
+        Recording.project_id == project_id,
+        Recording.project_id.in_(_live_project_ids)
+    ).order_by(Prompt.order_index)
+
+
+def _recording_row(text, filename, prompt_id, order_index, recorded_at, status):
+    return {
+        "text": text,
+        "filename": filename,
+        "prompt_id": prompt_id,
+        "order_index": order_index,
+        "recorded_at": recorded_at.isoformat() + 'Z' if recorded_at else None,
+        "status": status
+    }
+
+
+async def _recordings_ndjson(project_id: int, batch_size: int):
+    """Yield a project's recordings as NDJSON, one batch of lines per server-side cursor fetch"""
+    statement = _project_recordings_statement(project_id).where(
+        Prompt.project_id == project_id  # lets the planner walk ix_prompts_project_order instead of sorting
+    ).execution_options(yield_per=batch_size)
+    async with async_read_session() as db:
+        result = await db.stream(statement)
+        async for rows in result.partitions():
+            yield b"".join(orjson.dumps(_recording_row(*row)) + b"\n" for row in rows)
+
+
+def _recording_columns(rows):
+    """Column-oriented recordings listing: one array per field instead of one object per recording"""
+    columns = {"text": [], "filename": [], "prompt_id": [], "order_index": [], "recorded_at": [], "status": []}
+    for text, filename, prompt_id, order_index, recorded_at, status in rows:
+        columns["text"].append(text)
+        columns["filename"].append(filename)
+        columns["prompt_id"].append(prompt_id)
+        columns["order_index"].append(order_index)
+        columns["recorded_at"].append(recorded_at.isoformat() + 'Z' if recorded_at else None)
+        columns["status"].append(status)
+    return {"format": "columns", "count": len(rows), "columns": columns}
+
+
 class RecordingService:
     @staticmethod
-    def upload_audio(text: str, audio_file, project_id: int):
-        """Upload audio recording for a specific prompt"""
-        storage_path = SettingsService.get_setting("storage_path", "recordings")
+    async def upload_audio_async(text: str, audio_file, project_id: int):
+        """Upload audio recording for a specific prompt (asyncio session, file I/O in the threadpool)"""
+        storage_path = await SettingsService.get_setting_async("storage_path", "recordings")
         
-        with session_lock:
-            db = SessionLocal()
+        async with AsyncSessionLocal() as db:
+            filename = token = source = staged = None
             try:
                 # Find the prompt for this text and project
-                prompt = db.query(Prompt).filter(
-                    Prompt.project_id == project_id,
-                    Prompt.text == text
-                ).first()
+                prompt = (await db.execute(select(Prompt.id, Prompt.text).where(
+                    *_prompt_conditions(project_id, text)
+                ).order_by(Prompt.order_index).limit(1))).first()
                 
                 if not prompt:
                     raise HTTPException(status_code=404, detail="Prompt not found for this project")
                 
-                # Generate filename and save audio
-                filename = save_audio_file(audio_file, text, storage_path)
+                # The file is named after the prompt text, another live project may have recorded the same text
+                owner = (await db.execute(select(Recording.project_id, Recording.prompt_id).where(
+                    Recording.filename == audio_filename(prompt.text),
+                    Recording.project_id.in_(_live_project_ids)
+                ).limit(1))).first()
+                if owner is not None and tuple(owner) != (project_id, prompt.id):
+                    raise HTTPException(status_code=409, detail=_FILENAME_CONFLICT)
                 
-                # Check if recording already exists
-                existing = db.query(Recording).filter(
-                    Recording.filename == filename,
-                    Recording.project_id == project_id,
-                    Recording.prompt_id == prompt.id
-                ).first()
+                # The upload is written aside and only reaches the shared file once its row is claimed below:
+                # compressed recordings go to the transcode pool after the commit, anything else is renamed
+                # over the file, so an upload that loses the claim never touches another project's audio
+                filename = audio_filename(prompt.text)
+                compressed = TranscodeService.enabled() and (await run_in_threadpool(compressed_format, audio_file.file)) is not None
+                if compressed:
+                    token = TranscodeService.reserve(filename)
+                    source = await run_in_threadpool(save_transcode_source, audio_file, filename, token, storage_path)
+                    size_bytes = os.path.getsize(source)
+                    values = {"status": "processing", "size_bytes": None}
+                else:
+                    TranscodeService.supersede(filename)
+                    staged = await run_in_threadpool(stage_audio_file, audio_file, filename, storage_path)
+                    size_bytes = os.path.getsize(staged)
+                    values = {"status": "ready", "size_bytes": size_bytes}
+                observe_upload(size_bytes)
+                status = "processing" if compressed else "ok"
                 
-                if existing:
-                    # If recording already exists, just return success (idempotent behavior)
-                    return {"status": "ok", "filename": filename, "message": "Recording already exists"}
-                
-                # Save recording
-                recording = Recording(
-                    text=text,
-                    filename=filename,
-                    project_id=project_id,
-                    prompt_id=prompt.id
-                )
-                db.add(recording)
-                db.commit()
+                # Claim the recording; uniqueness rests on recordings.filename, so a concurrent upload of the
+                # same prompt that inserted first turns this into an update, one of another project into a 409
+                created = False
+                if owner is None:
+                    db.add(Recording(
+                        text=prompt.text,
+                        filename=filename,
+                        project_id=project_id,
+                        prompt_id=prompt.id,
+                        **values
+                    ))
+                    if not compressed:
+                        ReplicationService.enqueue(db, filename)
+                    try:
+                        await db.commit()
+                        created = True
+                    except IntegrityError:
+                        await db.rollback()
+                
+                if not created:
+                    # If recording already exists, just return success (idempotent behavior); the file is
+                    # overwritten, so it is replicated again. The row of a deleted project that the cleanup
+                    # worker has not removed yet is taken over (the worker then leaves the file alone)
+                    updated = (await db.execute(update(Recording).where(
+                        Recording.filename == filename,
+                        or_(
+                            and_(Recording.project_id == project_id, Recording.prompt_id == prompt.id),
+                            Recording.project_id.notin_(_live_project_ids)
+                        )
+                    ).values(text=prompt.text, project_id=project_id, prompt_id=prompt.id, **values))).rowcount
+                    if not updated:
+                        raise HTTPException(status_code=409, detail=_FILENAME_CONFLICT)
+                    if not compressed:
+                        ReplicationService.enqueue(db, filename)
+                    await db.commit()
+                
+                if compressed:
+                    TranscodeService.submit(filename, token, source, storage_path, project_id)
+                    token = None
+                else:
+                    await run_in_threadpool(os.replace, staged, os.path.join(storage_path, filename))
+                    staged = None
+                mark_write()
+                ReplicationService.notify()
+                await run_in_threadpool(response_cache.bump_project, project_id)
+                if not created:
+                    return {"status": status, "filename": filename, "message": "Recording already exists"}
                 
                 log_interaction("upload_audio", {
                     "filename": filename, 
@@ -58,15 +180,22 @@ class RecordingService:
                     "text": text
                 })
                 
-                return {"status": "ok", "filename": filename}
+                return {"status": status, "filename": filename}
                 
+            except HTTPException:
+                await db.rollback()
+                if token:
+                    TranscodeService.abandon(filename, token, source)
+                raise
             except Exception as e:
-                # Clean up the file if it was created but database save failed
-                if 'filename' in locals():
-                    delete_audio_file(filename, storage_path)
+                await db.rollback()
+                if token:
+                    TranscodeService.abandon(filename, token, source)
                 raise HTTPException(status_code=500, detail=f"Failed to save recording: {str(e)}")
             finally:
-                db.close()
+                # the upload did not get the recording (or failed): the stored file stays as it was
+                if staged is not None:
+                    delete_audio_file(os.path.basename(staged), storage_path)
 
     @staticmethod
     def delete_audio(text: str, project_id: int):
@@ -77,17 +206,13 @@ class RecordingService:
             db = SessionLocal()
             try:
                 # Find the prompt for this text and project
-                prompt = db.query(Prompt).filter(
-                    Prompt.project_id == project_id,
-                    Prompt.text == text
-                ).first()
+                prompt = db.query(Prompt).filter(*_prompt_conditions(project_id, text)).order_by(Prompt.order_index).first()
                 
                 if not prompt:
                     raise HTTPException(status_code=404, detail="Prompt not found for this project")
                 
                 # Find and delete recording
                 recording = db.query(Recording).filter(
-                    Recording.text == text,
                     Recording.project_id == project_id,
                     Recording.prompt_id == prompt.id
                 ).first()
@@ -101,6 +226,8 @@ class RecordingService:
                 # Delete from database
                 db.delete(recording)
                 db.commit()
+                mark_write()
+                response_cache.bump_project(project_id)
                 
                 log_interaction("delete_audio", {
                     "filename": recording.filename, 
@@ -118,31 +245,22 @@ class RecordingService:
                 db.close()
 
     @staticmethod
-    def get_project_recordings(project_id: int):
-        """Get all recordings for a specific project"""
-        with session_lock:
-            db = SessionLocal()
-            try:
-                # Get all recordings for this project with prompt information
-                recordings = db.query(Recording).join(Prompt, Recording.prompt_id == Prompt.id).options(
-                    joinedload(Recording.prompt)
-                ).filter(
-                    Recording.project_id == project_id
-                ).order_by(Prompt.order_index).all()
-                
-                result = []
-                for rec in recordings:
-                    result.append({
-                        "text": rec.text,
-                        "filename": rec.filename,
-                        "prompt_id": rec.prompt_id,
-                        "order_index": rec.prompt.order_index,
-                        "recorded_at": rec.recorded_at.isoformat() + 'Z' if rec.recorded_at else None
-                    })
-                
-                return {"recordings": result}
-            finally:
-                db.close()
+    async def get_project_recordings_async(project_id: int, columns: bool = False):
+        """Get all recordings for a specific project (asyncio session), optionally column-oriented"""
+        async with async_read_session() as db:
+            rows = (await db.execute(_project_recordings_statement(project_id))).all()
+            if columns:
+                return _recording_columns(rows)
+            return {"recordings": [_recording_row(*row) for row in rows]}
+
+    @staticmethod
+    async def stream_project_recordings(project_id: int, batch_size: int = 1000):
+        """NDJSON chunks of a project's recordings in prompt order, memory stays flat for huge projects"""
+        async with async_read_session() as db:
+            exists = (await db.execute(select(Project.id).where(Project.id == project_id, Project.deleted_at.is_(None)))).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return _recordings_ndjson(project_id, batch_size)
 
     @staticmethod
     def list_recordings():
@@ -0,0 +1,179 @@
+import os
+import uuid
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text, func
+from models.database import ReplicationJob, Recording
+from database.connection import SessionLocal
+from database.session import session_lock
+from database.coordination import acquire_lease
+from services.settings_service import SettingsService
+from services.export_service import ExportService
+from utils.logging import logger
+from utils.metrics import REPLICATION_UPLOADS, REPLICATION_BACKLOG
+from config import AppConfig
+
+'''
+write-behind replication of recordings to the S3 bucket configured in the settings.
+uploads add a replication_queue row in the same transaction as the recording, so the queue
+survives restarts; a single worker thread claims due jobs in batches and uploads them with
+bounded concurrency outside the session lock. failed uploads are retried with exponential
+backoff (capped, never dropped); jobs whose file is gone (recording deleted) are discarded.
+uploaded files are recorded in the export manifest, so S3 delta exports skip them.
+every worker runs the thread: a batch is claimed with a conditional UPDATE that moves the jobs'
+next_attempt_at past REPLICATION_LEASE and tags them with a claim token, so each job goes to one
+worker; jobs of a worker that died become due again when the lease runs out.
+set S3_ENDPOINT_URL to run against a local S3 stand-in such as MinIO or moto_server.
+'''
+
+
+class ReplicationService:
+    _wakeup = threading.Event()
+    _thread = None
+    _executor = None
+
+    @classmethod
+    def start(cls):
+        """Start the replication worker (idempotent)"""
+        if cls._thread is not None or not AppConfig.REPLICATION_ENABLED:
+            return
+        # with several workers only one of them backfills (the INSERT .. NOT EXISTS is not atomic across them)
+        if AppConfig.REPLICATION_BACKFILL and (not AppConfig.SHARED_STATE or acquire_lease("replication-backfill", 300)):
+            queued = cls.enqueue_unreplicated()
+            if queued:
+                print(f"🔄 Queued {queued} existing recordings for replication")
+        cls._executor = ThreadPoolExecutor(max_workers=AppConfig.REPLICATION_CONCURRENCY, thread_name_prefix="replication-upload")
+        cls._thread = threading.Thread(target=cls._run, name="replication", daemon=True)
+        cls._thread.start()
+
+    @staticmethod
+    def enqueue(db, filename: str):
+        """Queue a recording file in the caller's transaction (sync or asyncio session)"""
+        if AppConfig.REPLICATION_ENABLED:
+            db.add(ReplicationJob(filename=filename))
+
+    @classmethod
+    def notify(cls):
+        """Wake the worker after committing new jobs"""
+        cls._wakeup.set()
+
+    @staticmethod
+    def enqueue_unreplicated() -> int:
+        """Queue every recording that is neither replicated nor queued, returns the number queued"""
+        now = datetime.utcnow()
+        with session_lock:
+            db = SessionLocal()
+            try:
+                result = db.execute(text("""
+                    INSERT INTO replication_queue (filename, attempts, next_attempt_at, created_at)
+                    SELECT r.filename, 0, :now, :now FROM recordings r
+                    WHERE (r.replicated IS NULL OR r.replicated = 0)
+                    AND r.status = 'ready'
+                    AND NOT EXISTS (SELECT 1 FROM replication_queue q WHERE q.filename = r.filename)
+                """), {"now": now})
+                db.commit()
+                return result.rowcount
+            finally:
+                db.close()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wakeup.clear()
+            try:
+                claimed = cls.replicate_due()
+            except Exception as e:
+                logger.error(f"replication round failed: {e}")
+                claimed = 0
+            if claimed < AppConfig.REPLICATION_BATCH_SIZE:
+                # queue drained (or only jobs in backoff left): sleep until the next upload or poll
+                cls._wakeup.wait(timeout=AppConfig.REPLICATION_POLL_INTERVAL)
+
+    @staticmethod
+    def _upload(s3, bucket: str, storage_path: str, filename: str):
+        """Returns (None, fingerprint) on success, ("missing", None) when the file is gone, otherwise (error, None)"""
+        file_path = os.path.join(storage_path, filename)
+        if not os.path.isfile(file_path):
+            return "missing", None
+        try:
+            fingerprint = ExportService.file_fingerprint(file_path)
+            s3.upload_file(file_path, bucket, filename)
+            return None, fingerprint
+        except Exception as e:
+            return str(e) or e.__class__.__name__, None
+
+    @classmethod
+    def replicate_due(cls) -> int:
+        """Upload one batch of due jobs, returns the number of jobs processed"""
+        bucket = SettingsService.get_setting("s3_bucket", "")
+        storage_path = SettingsService.get_setting("storage_path", "recordings")
+        now = datetime.utcnow()
+
+        with session_lock:
+            db = SessionLocal()
+            try:
+                REPLICATION_BACKLOG.set(db.query(func.count(ReplicationJob.id)).scalar())
+                due = [job_id for (job_id,) in db.query(ReplicationJob.id).filter(
+                    ReplicationJob.next_attempt_at <= now
+                ).order_by(ReplicationJob.id).limit(AppConfig.REPLICATION_BATCH_SIZE).all()]
+                if not due:
+                    return 0
+                if not bucket:
+                    logger.warning(f"replication: {len(due)} recordings waiting, no S3 bucket configured")
+                    return 0
+                # claim: jobs another worker claimed in the meantime no longer match next_attempt_at <= now
+                token = uuid.uuid4().hex
+                db.query(ReplicationJob).filter(
+                    ReplicationJob.id.in_(due),
+                    ReplicationJob.next_attempt_at <= now
+                ).update({
+                    "next_attempt_at": now + timedelta(seconds=AppConfig.REPLICATION_LEASE),
+                    "claim_token": token,
+                }, synchronize_session=False)
+                db.commit()
+                jobs = db.query(ReplicationJob.id, ReplicationJob.filename, ReplicationJob.attempts).filter(
+                    ReplicationJob.claim_token == token
+                ).order_by(ReplicationJob.id).all()
+            finally:
+                db.close()
+        if not jobs:
+            return len(due)  # all taken by other workers: look for more right away
+
+        s3 = ExportService.get_s3_client()
+        futures = [(job, cls._executor.submit(cls._upload, s3, bucket, storage_path, job.filename)) for job in jobs]
+        outcomes = [(job, *future.result()) for job, future in futures]
+
+        with session_lock:
+            db = SessionLocal()
+            try:
+                uploaded = {job.filename: fingerprint for job, error, fingerprint in outcomes if error is None}
+                project_ids = dict(db.query(Recording.filename, Recording.project_id).filter(
+                    Recording.filename.in_(list(uploaded))
+                ).all()) if uploaded else {}
+                for job, error, _ in outcomes:
+                    if error is None or error == "missing":
+                        db.query(ReplicationJob).filter(ReplicationJob.id == job.id).delete()
+                        if error is None:
+                            db.query(Recording).filter(Recording.filename == job.filename).update({"replicated": 1})
+                        REPLICATION_UPLOADS.labels("ok" if error is None else "missing").inc()
+                        continue
+                    attempts = job.attempts + 1
+                    delay = min(AppConfig.REPLICATION_RETRY_BASE * 2 ** (attempts - 1), AppConfig.REPLICATION_RETRY_MAX)
+                    db.query(ReplicationJob).filter(ReplicationJob.id == job.id).update({
+                        "attempts": attempts,
+                        "next_attempt_at": now + timedelta(seconds=delay),
+                        "last_error": error[:1000],
+                    })
+                    REPLICATION_UPLOADS.labels("error").inc()
+                    logger.error(f"replication of {job.filename} failed (attempt {attempts}, retry in {delay}s): {error}")
+                # replicated files count as exported for the S3 delta export
+                ExportService.save_manifest(db, bucket, [
+                    {"key": filename, "project_id": project_ids.get(filename), "size": size, "mtime_ns": mtime_ns, "checksum": checksum}
+                    for filename, (size, mtime_ns, checksum) in uploaded.items()
+                ])
+                db.commit()
+                REPLICATION_BACKLOG.set(db.query(func.count(ReplicationJob.id)).scalar())
+            finally:
+                db.close()
+        return len(jobs)
@@ -0,0 +1,166 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.requests import ClientDisconnect
+from models.database import Prompt, UploadSession
+from database.async_connection import AsyncSessionLocal
+from services.settings_service import SettingsService
+from services.recording_service import RecordingService, _prompt_conditions
+from utils.file_utils import staged_upload_path
+from config import AppConfig
+
+'''
+resumable uploads for long recordings, modelled on the tus protocol: POST /uploads/ announces the
+prompt and the total size, PATCH /uploads/{id} writes bytes at the offset the client names in
+Upload-Offset, HEAD /uploads/{id} tells a client that lost its connection where to resume, and
+POST /uploads/{id}/finalize passes the complete file to RecordingService.upload_audio_async.
+each upload has one staging file under <storage path>/.uploads and chunks are written into it at
+their offset, so the file is assembled as it arrives; bytes received before a connection drops
+are kept. the offset lives in upload_sessions and only moves through a conditional UPDATE, so
+any worker can take any chunk. clients send one chunk at a time. the cleanup worker removes
+uploads that got no chunk for UPLOAD_EXPIRY seconds.
+'''
+
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+def _open_staging_file(path: str, offset: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+    handle.seek(offset)
+    return handle
+
+
+def _open_assembled_file(path: str, length: int):
+    """The staging file cut to the announced length (a failed request may have left bytes past it)"""
+    try:
+        handle = open(path, "r+b")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    handle.truncate(length)
+    return handle
+
+
+def _remove_staging_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResumableUploadService:
+    @staticmethod
+    async def _get(db, upload_id: str) -> UploadSession:
+        expired_before = datetime.utcnow() - timedelta(seconds=AppConfig.UPLOAD_EXPIRY)
+        upload = (await db.execute(select(UploadSession).where(
+            UploadSession.id == upload_id,
+            UploadSession.updated_at >= expired_before
+        ))).scalars().first()
+        if upload is None:
+            raise HTTPException(status_code=404, detail="Upload not found or expired")
+        return upload
+
+    @staticmethod
+    async def create(text: str, project_id: int, length: int) -> dict:
+        """Start an upload of length bytes for a project's prompt"""
+        if length > AppConfig.UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Uploads are limited to {AppConfig.UPLOAD_MAX_BYTES} bytes")
+        async with AsyncSessionLocal() as db:
+            prompt = (await db.execute(select(Prompt.id).where(*_prompt_conditions(project_id, text)).limit(1))).first()
+            if not prompt:
+                raise HTTPException(status_code=404, detail="Prompt not found for this project")
+            upload_id = uuid.uuid4().hex
+            db.add(UploadSession(id=upload_id, project_id=project_id, text=text, length=length, received=0))
+            await db.commit()
+        return {"upload_id": upload_id, "offset": 0, "length": length}
+
+    @staticmethod
+    async def status(upload_id: str) -> dict:
+        async with AsyncSessionLocal() as db:
+            upload = await ResumableUploadService._get(db, upload_id)
+            return {"upload_id": upload_id, "offset": upload.received, "length": upload.length}
+
+    @staticmethod
+    async def append(upload_id: str, offset: int, chunks, content_length: int = None) -> int:
+        """Write the request body (an async iterator of bytes) at offset, returns the new offset"""
+        async with AsyncSessionLocal() as db:
+            upload = await ResumableUploadService._get(db, upload_id)
+            length, received = upload.length, upload.received
+        if offset != received:
+            raise HTTPException(status_code=409, detail=f"Upload-Offset {offset} does not match the {received} bytes received")
+        if content_length is not None and offset + content_length > length:
+            raise HTTPException(status_code=413, detail=f"Chunk ends past the upload length of {length} bytes")
+
+        storage_path = await SettingsService.get_setting_async("storage_path", "recordings")
+        handle = await run_in_threadpool(_open_staging_file, staged_upload_path(storage_path, upload_id), offset)
+        written = 0
+        too_long = False
+        try:
+            buffer = bytearray()
+            try:
+                async for chunk in chunks:
+                    if offset + written + len(buffer) + len(chunk) > length:
+                        too_long = True
+                        break
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_BYTES:
+                        await run_in_threadpool(handle.write, buffer)
+                        written += len(buffer)
+                        buffer = bytearray()
+            except ClientDisconnect:
+                pass  # keep what arrived, the client resumes from the new offset
+            if buffer:
+                await run_in_threadpool(handle.write, buffer)
+                written += len(buffer)
+        finally:
+            await run_in_threadpool(handle.close)
+
+        if written:
+            async with AsyncSessionLocal() as db:
+                moved = (await db.execute(update(UploadSession).where(
+                    UploadSession.id == upload_id,
+                    UploadSession.received == offset
+                ).values(received=offset + written, updated_at=datetime.utcnow()))).rowcount
+                await db.commit()
+            if not moved:
+                raise HTTPException(status_code=409, detail="The upload was advanced by a concurrent request")
+        if too_long:
+            raise HTTPException(status_code=413, detail=f"Chunk ends past the upload length of {length} bytes")
+        return offset + written
+
+    @staticmethod
+    async def finalize(upload_id: str) -> dict:
+        """Store the complete file through the normal upload path and drop the staging data"""
+        async with AsyncSessionLocal() as db:
+            upload = await ResumableUploadService._get(db, upload_id)
+            text, project_id, length, received = upload.text, upload.project_id, upload.length, upload.received
+        if received != length:
+            raise HTTPException(status_code=409, detail=f"Upload incomplete: {received} of {length} bytes received")
+
+        storage_path = await SettingsService.get_setting_async("storage_path", "recordings")
+        path = staged_upload_path(storage_path, upload_id)
+        handle = await run_in_threadpool(_open_assembled_file, path, length)
+        try:
+            result = await RecordingService.upload_audio_async(text, UploadFile(handle, filename=f"{upload_id}.wav"), project_id)
+        finally:
+            await run_in_threadpool(handle.close)
+        await ResumableUploadService._discard(upload_id, path)
+        return result
+
+    @staticmethod
+    async def cancel(upload_id: str):
+        async with AsyncSessionLocal() as db:
+            await ResumableUploadService._get(db, upload_id)
+        storage_path = await SettingsService.get_setting_async("storage_path", "recordings")
+        await ResumableUploadService._discard(upload_id, staged_upload_path(storage_path, upload_id))
+
+    @staticmethod
+    async def _discard(upload_id: str, path: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(UploadSession).where(UploadSession.id == upload_id))
+            await db.commit()
+        await run_in_threadpool(_remove_staging_file, path)
@@ -0,0 +1,194 @@
+import io
+import os
+import re
+import gzip
+import math
+import random
+import hashlib
+import string
+from fastapi import HTTPException
+from config import AppConfig
+from services.project_service import ProjectService
+from utils.text_utils import normalize_prompt
+
+'''
+one-pass sampling of prompts from large text corpora (one prompt per line, optionally gzipped).
+lines are normalized and filtered by length and character set while streaming, and a seeded
+reservoir (algorithm L) keeps a uniform sample of the matches, so memory depends on the sample
+size only, never on the corpus. stratified sampling keeps one reservoir per length bucket and
+splits the sample over the buckets at the end, proportionally to their matches or equally.
+repeats are dropped inside each reservoir, so a sample is N distinct prompts whenever the corpus
+has that many. the same file, filters and seed always give the same sample, returned in corpus order.
+'''
+
+# letters allowed by the charset presets; whitespace, digits and punctuation are always allowed
+CHARSETS = {
+    "latin": "A-Za-z\u00c0-\u024f",
+    "arabic": "\u0600-\u06ff\u0750-\u077f\u08a0-\u08ff\ufb50-\ufdff\ufe70-\ufeff\u200c\u200d",
+}
+_ALWAYS_ALLOWED = re.escape(string.punctuation + "،؛؟«»“”‘’…–—")
+
+
+def _disallowed_chars(charset: str):
+    """Regex matching any character outside the charset (a preset name or the allowed letters themselves)"""
+    if not charset or charset == "any":
+        return None
+    letters = CHARSETS.get(charset)
+    if letters is None:
+        letters = "".join(re.escape(char) for char in sorted(set(charset)))
+    return re.compile(f"[^\\s\\d{_ALWAYS_ALLOWED}{letters}]")
+
+
+def _length_strata(edges: str, min_length: int, max_length: int):
+    """Sorted bucket lower bounds from comma separated length edges, e.g. "40,80" -> [min, 40, 80]"""
+    try:
+        bounds = sorted({int(edge) for edge in edges.split(",") if edge.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="strata must be comma separated prompt lengths, e.g. 40,80,160")
+    return [min_length] + [bound for bound in bounds if min_length < bound <= max_length]
+
+
+class _Reservoir:
+    """Uniform sample of up to size distinct prompts from a stream (algorithm L: once full, the
+    position of the next replacement is drawn directly instead of a random number per item)"""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.items = []  # (line number, text)
+        self.hashes = []  # hash of the prompt in every slot
+        self.hash_set = set()
+        self.weight = 1.0
+        self.next_replacement = None
+
+    def _schedule(self):
+        self.weight *= math.exp(math.log(1.0 - self.rng.random()) / self.size)
+        self.next_replacement = self.seen + math.floor(math.log(1.0 - self.rng.random()) / math.log(1.0 - self.weight)) + 1
+
+    def offer(self, line_number: int, text: str):
+        self.seen += 1
+        if len(self.items) < self.size:
+            slot = len(self.items)
+        elif self.seen == self.next_replacement:
+            slot = self.rng.randrange(self.size)
+            self._schedule()
+        else:
+            return
+        text_hash = hashlib.md5(text.encode()).hexdigest()  # text is normalized already
+        if text_hash in self.hash_set:
+            return
+        self.hash_set.add(text_hash)
+        if slot == len(self.items):
+            self.items.append((line_number, text))
+            self.hashes.append(text_hash)
+            if len(self.items) == self.size:
+                self._schedule()
+        else:
+            self.hash_set.discard(self.hashes[slot])
+            self.items[slot] = (line_number, text)
+            self.hashes[slot] = text_hash
+
+
+def _allocate(total: int, matched: list, available: list, equal: bool) -> list:
+    """Split total over buckets: proportionally to their matches (largest remainder) or equally,
+    never giving a bucket more than its reservoir holds; the rest goes to buckets with room"""
+    total = min(total, sum(available))
+    if equal or not sum(matched):
+        shares = [total / len(matched)] * len(matched)
+    else:
+        shares = [total * count / sum(matched) for count in matched]
+    allocation = [min(int(share), room) for share, room in zip(shares, available)]
+    by_remainder = sorted(range(len(matched)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    while sum(allocation) < total:
+        for i in by_remainder:
+            if sum(allocation) < total and allocation[i] < available[i]:
+                allocation[i] += 1
+    return allocation
+
+
+class SamplingService:
+    @staticmethod
+    def local_corpus_path(path: str) -> str:
+        """Resolve a server-local corpus path, which must stay inside CORPUS_DIR"""
+        if not AppConfig.CORPUS_DIR:
+            raise HTTPException(status_code=400, detail="Server-local corpora are disabled (set CORPUS_DIR)")
+        root = os.path.realpath(AppConfig.CORPUS_DIR)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root:
+            raise HTTPException(status_code=400, detail="Corpus path must be inside CORPUS_DIR")
+        if not os.path.isfile(resolved):
+            raise HTTPException(status_code=404, detail="Corpus file not found")
+        return resolved
+
+    @staticmethod
+    def _lines(source, gzipped: bool):
+        """Text lines of a path or a binary file object, decoded as they are read"""
+        handle = open(source, "rb") if isinstance(source, str) else source
+        try:
+            # explicit mode: GzipFile would take it from the file object, and upload spools are "w+b"
+            raw = gzip.GzipFile(fileobj=handle, mode="rb") if gzipped else handle
+            with io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace") as reader:
+                yield from reader
+        finally:
+            if isinstance(source, str):
+                handle.close()
+
+    @staticmethod
+    def sample(source, count: int, seed: int = None, min_length: int = 1, max_length: int = 500,
+               charset: str = "any", strata: str = "", equal_strata: bool = False, gzipped: bool = False):
+        """Stream source (path or binary file object) once and return (prompts, stats)"""
+        if min_length > max_length:
+            raise HTTPException(status_code=400, detail="min_length must not exceed max_length")
+        disallowed = _disallowed_chars(charset)
+        seed = random.randrange(2 ** 32) if seed is None else seed
+        rng = random.Random(seed)
+        bounds = _length_strata(strata, min_length, max_length) if strata else [min_length]
+        reservoirs = [_Reservoir(count, rng) for _ in bounds]
+
+        lines_read = 0
+        for line_number, line in enumerate(SamplingService._lines(source, gzipped)):
+            lines_read += 1
+            if not line.strip():
+                continue
+            text = normalize_prompt(line)
+            if not min_length <= len(text) <= max_length:
+                continue
+            if disallowed is not None and disallowed.search(text):
+                continue
+            bucket = 0
+            while bucket + 1 < len(bounds) and len(text) >= bounds[bucket + 1]:
+                bucket += 1
+            reservoirs[bucket].offer(line_number, text)
+
+        matched = [reservoir.seen for reservoir in reservoirs]
+        allocation = _allocate(count, matched, [len(reservoir.items) for reservoir in reservoirs], equal_strata)
+        picked = []
+        for reservoir, take in zip(reservoirs, allocation):
+            picked.extend(rng.sample(reservoir.items, take))
+        picked.sort()
+
+        stats = {
+            "seed": seed,
+            "lines_read": lines_read,
+            "lines_matched": sum(matched),
+            "sampled": len(picked),
+        }
+        if len(bounds) > 1:
+            stats["strata"] = [{
+                "min_length": lower,
+                "max_length": (upper - 1) if upper is not None else max_length,
+                "matched": seen,
+                "sampled": take,
+            } for lower, upper, seen, take in zip(bounds, bounds[1:] + [None], matched, allocation)]
+        return [text for _, text in picked], stats
+
+    @staticmethod
+    def create_project_from_sample(project_name: str, source, count: int, is_rtl: bool = False, **options):
+        """Sample a corpus and bulk insert the sample as a new project"""
+        prompts, stats = SamplingService.sample(source, count, **options)
+        if not prompts:
+            raise HTTPException(status_code=400, detail="No lines in the corpus match the filters")
+        result = ProjectService.create_project_with_prompts(project_name, prompts, is_rtl)
+        result["sampling"] = stats
+        return result
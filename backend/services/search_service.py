@@ -0,0 +1,115 @@
+from fastapi import HTTPException
+from sqlalchemy import text
+from database.routing import async_read_session
+
+'''
+full-text prompt search across projects.
+SQLite searches the prompts_fts FTS5 table (bm25 ranking), MySQL the FULLTEXT index on
+prompts.text (boolean mode relevance); the database keeps both current (triggers / InnoDB),
+so every write path that touches prompts updates the index. user input is reduced to plain
+terms that must all match, the last one as a prefix so partially typed words find hits.
+databases without either index (SQLite built without FTS5) fall back to unranked LIKE scans.
+'''
+
+# characters with a meaning in FTS5 / MySQL boolean mode query syntax
+_OPERATOR_CHARS = str.maketrans({char: " " for char in '"*+-<>()~@:^{}'})
+
+_HIT_COLUMNS = """
+    p.id, p.project_id, pj.name, p.text, p.order_index,
+    EXISTS (SELECT 1 FROM recordings r WHERE r.prompt_id = p.id) AS recorded
+"""
+
+
+def search_terms(query: str) -> list:
+    return query.translate(_OPERATOR_CHARS).split()
+
+
+def _fts5_statement(terms: list, project_filter: str):
+    match = " ".join('"' + term.replace('"', '""') + '"' for term in terms) + "*"
+    statement = f"""
+        SELECT {_HIT_COLUMNS}, -prompts_fts.rank AS score
+        FROM prompts_fts
+        JOIN prompts p ON p.id = prompts_fts.rowid
+        JOIN projects pj ON pj.id = p.project_id
+        WHERE prompts_fts MATCH :match AND pj.deleted_at IS NULL {project_filter}
+        ORDER BY prompts_fts.rank, p.id
+        LIMIT :limit OFFSET :offset
+    """
+    return statement, {"match": match}
+
+
+def _fulltext_statement(terms: list, project_filter: str):
+    match = " ".join(f"+{term}" for term in terms) + "*"
+    statement = f"""
+        SELECT {_HIT_COLUMNS}, MATCH (p.text) AGAINST (:match IN BOOLEAN MODE) AS score
+        FROM prompts p
+        JOIN projects pj ON pj.id = p.project_id
+        WHERE MATCH (p.text) AGAINST (:match IN BOOLEAN MODE) AND pj.deleted_at IS NULL {project_filter}
+        ORDER BY score DESC, p.id
+        LIMIT :limit OFFSET :offset
+    """
+    return statement, {"match": match}
+
+
+def _like_statement(terms: list, project_filter: str):
+    params = {f"term{i}": "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+              for i, term in enumerate(terms)}
+    conditions = " AND ".join(f"p.text LIKE :term{i} ESCAPE '\\'" for i in range(len(terms)))
+    statement = f"""
+        SELECT {_HIT_COLUMNS}, NULL AS score
+        FROM prompts p
+        JOIN projects pj ON pj.id = p.project_id
+        WHERE {conditions} AND pj.deleted_at IS NULL {project_filter}
+        ORDER BY p.id
+        LIMIT :limit OFFSET :offset
+    """
+    return statement, params
+
+
+class SearchService:
+    _backend = None  # "fts5", "fulltext" or "like", detected on the first search
+
+    @classmethod
+    async def _detect_backend(cls, db) -> str:
+        if cls._backend is None:
+            dialect = db.bind.dialect.name
+            if dialect == "mysql":
+                cls._backend = "fulltext"
+            elif dialect == "sqlite" and (await db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prompts_fts'")
+            )).first():
+                cls._backend = "fts5"
+            else:
+                cls._backend = "like"
+        return cls._backend
+
+    @classmethod
+    async def search_prompts_async(cls, query: str, project_id: int = None, limit: int = 20, offset: int = 0):
+        """Ranked prompt search across live projects, one page of hits with project and recorded status"""
+        terms = search_terms(query)
+        if not terms:
+            raise HTTPException(status_code=400, detail="Search query has no searchable terms")
+
+        async with async_read_session() as db:
+            backend = await cls._detect_backend(db)
+            builder = {"fts5": _fts5_statement, "fulltext": _fulltext_statement, "like": _like_statement}[backend]
+            statement, params = builder(terms, "AND p.project_id = :project_id" if project_id is not None else "")
+            # one extra row tells whether there is a next page without counting every match
+            params.update(limit=limit + 1, offset=offset, project_id=project_id)
+            rows = (await db.execute(text(statement), params)).all()
+
+        return {
+            "query": query,
+            "results": [{
+                "prompt_id": prompt_id,
+                "project_id": hit_project_id,
+                "project_name": project_name,
+                "text": prompt_text,
+                "order_index": order_index,
+                "recorded": bool(recorded),
+                "score": round(float(score), 4) if score is not None else None,
+            } for prompt_id, hit_project_id, project_name, prompt_text, order_index, recorded, score in rows[:limit]],
+            "offset": offset,
+            "limit": limit,
+            "has_more": len(rows) > limit,
+        }
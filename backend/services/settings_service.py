@@ -1,19 +1,96 @@
 import os
+import threading
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.database import Setting
 from database.connection import SessionLocal
 from database.session import session_lock
+from database.async_connection import AsyncSessionLocal
+from database.routing import mark_write
+from database.coordination import version_stamps
+from utils.logging import logger
+
+'''
+settings are read on most requests (storage_path on every upload and audio download), so values
+are cached in the process and dropped whenever the settings version moves: an in-process counter
+with a single worker, the shared 'settings' stamp (see database/coordination.py) with several.
+misses read from the primary: a lagging replica would put an old value under the new version.
+'''
+
+_MISSING = object()
+
+
+class _SettingsCache:
+    def __init__(self, stamps=None):
+        self.stamps = stamps
+        self._lock = threading.Lock()
+        self._values = {}
+        self._version = None
+        self._local_version = 0
+
+    def version(self):
+        return self.stamps.get("settings")[0] if self.stamps is not None else self._local_version
+
+    async def version_async(self):
+        return (await self.stamps.get_async("settings"))[0] if self.stamps is not None else self._local_version
+
+    def get(self, key: str):
+        """(version, cached value or _MISSING); pass the version back to put()"""
+        return self._lookup(key, self.version())
+
+    async def get_async(self, key: str):
+        return self._lookup(key, await self.version_async())
+
+    def _lookup(self, key: str, version):
+        with self._lock:
+            if version != self._version:
+                self._values = {}
+                self._version = version
+            return version, self._values.get(key, _MISSING)
+
+    def put(self, key: str, value, version):
+        with self._lock:
+            # a value read while the settings changed belongs to the old version
+            if version == self._version:
+                self._values[key] = value
+
+    def bump(self):
+        with self._lock:
+            self._local_version += 1
+        if self.stamps is not None:
+            try:
+                self.stamps.bump("settings")
+            except Exception as e:
+                logger.error(f"settings version bump failed: {e}")
+
+
+_cache = _SettingsCache(version_stamps)
+
 
 class SettingsService:
     @staticmethod
     def get_setting(key: str, default: str = "") -> str:
-        with session_lock:
-            db = SessionLocal()
-            try:
-                setting = db.query(Setting).filter(Setting.key == key).first()
-                return setting.value if setting else default
-            finally:
-                db.close()
+        version, value = _cache.get(key)
+        if value is _MISSING:
+            with session_lock:
+                db = SessionLocal()
+                try:
+                    setting = db.query(Setting).filter(Setting.key == key).first()
+                    value = setting.value if setting else None
+                finally:
+                    db.close()
+            _cache.put(key, value, version)
+        return value if value is not None else default
+
+    @staticmethod
+    async def get_setting_async(key: str, default: str = "") -> str:
+        version, value = await _cache.get_async(key)
+        if value is _MISSING:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(select(Setting.value).where(Setting.key == key))).first()
+                value = row[0] if row else None
+            _cache.put(key, value, version)
+        return value if value is not None else default
 
     @staticmethod
     def set_setting(key: str, value: str):
@@ -26,10 +103,18 @@ class SettingsService:
                 else:
                     setting = Setting(key=key, value=value)
                     db.add(setting)
-                db.commit()
+                SettingsService.commit(db)
             finally:
                 db.close()
 
+    @staticmethod
+    def commit(db: Session):
+        """Commit a session that wrote settings rows; every settings write goes through here so
+        cached values are dropped, in this process and (through the stamp) in the other workers"""
+        db.commit()
+        mark_write()
+        _cache.bump()
+
     @staticmethod
     def ensure_storage_path():
         """Ensure storage directory exists"""
@@ -0,0 +1,159 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from models.database import Recording
+from database.connection import SessionLocal
+from database.session import session_lock
+from database.routing import mark_write
+from services.replication_service import ReplicationService
+from utils.audio_utils import transcode_to_wav
+from utils.logging import logger
+from utils.metrics import TRANSCODE_PENDING, observe_transcode
+from utils.response_cache import response_cache
+from config import AppConfig
+
+'''
+server-side conversion of compressed browser recordings to the storage format (16 kHz mono WAV).
+an upload recognised as WebM / Ogg / MP4 is kept in <storage path>/.transcode, its recording is
+committed with status 'processing' and the request returns at once; a bounded process pool
+(TRANSCODE_WORKERS, spawned so no threads or database connections are forked) runs ffmpeg, and
+a single finisher thread renames the output over the recording's file and marks it 'ready'
+(queued for replication) or 'failed'. at most TRANSCODE_QUEUE_LIMIT conversions wait per worker
+process, further compressed uploads get a 503. a newer upload of the same prompt supersedes a
+pending conversion, whose output is then dropped. conversions of a process that died are found
+by the cleanup worker from the age of their source files (see conversion_stale_after).
+'''
+
+
+class TranscodeService:
+    _pool = None
+    _finisher = None
+    _slots = None
+    _jobs = {}  # recording filename -> token of its newest conversion
+    _jobs_lock = threading.Lock()
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def start(cls):
+        """Create the pool (idempotent); without ffmpeg, compressed uploads are stored as sent"""
+        if cls._pool is not None or AppConfig.TRANSCODE_WORKERS <= 0:
+            return
+        if shutil.which(AppConfig.FFMPEG_PATH) is None:
+            print(f"⚠️  {AppConfig.FFMPEG_PATH} not found, compressed recordings are stored without conversion")
+            return
+        cls._slots = threading.BoundedSemaphore(AppConfig.TRANSCODE_WORKERS + AppConfig.TRANSCODE_QUEUE_LIMIT)
+        cls._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcode-finish")
+        cls._pool = _new_pool()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._pool is not None
+
+    @classmethod
+    def reserve(cls, filename: str) -> str:
+        """Take a conversion slot for a recording file, returns the job token; 503 when the queue is full"""
+        if not cls._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Server busy (transcoding), retry later",
+                                headers={"Retry-After": str(AppConfig.ADMISSION_RETRY_AFTER)})
+        token = uuid.uuid4().hex
+        with cls._jobs_lock:
+            cls._jobs[filename] = token
+        TRANSCODE_PENDING.inc()
+        return token
+
+    @classmethod
+    def abandon(cls, filename: str, token: str, source: str = None):
+        """Give back a reserved slot whose upload failed before submit"""
+        with cls._jobs_lock:
+            if cls._jobs.get(filename) == token:
+                del cls._jobs[filename]
+        if source:
+            _remove(source)
+        cls._slots.release()
+        TRANSCODE_PENDING.dec()
+
+    @classmethod
+    def supersede(cls, filename: str):
+        """An upload stored as sent replaced the recording, pending conversions of it are dropped"""
+        with cls._jobs_lock:
+            cls._jobs.pop(filename, None)
+
+    @classmethod
+    def submit(cls, filename: str, token: str, source: str, storage_path: str, project_id: int):
+        """Convert source in the pool, after the recording was committed as 'processing'"""
+        output = source[:-len(".src")] + ".out"
+        started = time.monotonic()
+        args = (transcode_to_wav, source, output, AppConfig.FFMPEG_PATH, AppConfig.AUDIO_SAMPLE_RATE, AppConfig.TRANSCODE_TIMEOUT)
+        with cls._pool_lock:
+            try:
+                future = cls._pool.submit(*args)
+            except BrokenProcessPool:
+                # a pool process died (killed for memory, say): the pool takes no more work, replace it
+                logger.error("transcode pool broken, starting a new one")
+                cls._pool = _new_pool()
+                future = cls._pool.submit(*args)
+        future.add_done_callback(lambda done: cls._finisher.submit(
+            cls._finish, done, filename, token, source, output, storage_path, project_id, started
+        ))
+
+    @classmethod
+    def _finish(cls, future, filename: str, token: str, source: str, output: str, storage_path: str,
+                project_id: int, started: float):
+        outcome = "failed"
+        try:
+            error = future.exception()
+            if error is not None:
+                logger.error(f"transcode of {filename} failed: {error}")
+            # the jobs lock is held from the token check to the rename: an upload superseding this
+            # conversion either comes first and the output is dropped, or replaces the file after the
+            # rename. session_lock first, like every other sync session
+            with session_lock, cls._jobs_lock:
+                if cls._jobs.get(filename) != token:
+                    outcome = "superseded"
+                else:
+                    del cls._jobs[filename]
+                    values = {"status": "failed"} if error else {"status": "ready", "size_bytes": os.path.getsize(output)}
+                    db = SessionLocal()
+                    try:
+                        updated = db.query(Recording).filter(
+                            Recording.filename == filename,
+                            Recording.status == "processing"
+                        ).update(values, synchronize_session=False)
+                        if updated and error is None:
+                            ReplicationService.enqueue(db, filename)
+                        db.commit()
+                    finally:
+                        db.close()
+                    if updated and error is None:
+                        os.replace(output, os.path.join(storage_path, filename))
+                    # not updated: the recording was deleted while it was converted
+                    outcome = values["status"] if updated else "deleted"
+            if outcome in ("ready", "failed"):
+                mark_write()
+                ReplicationService.notify()
+                response_cache.bump_project(project_id)
+        except Exception as e:
+            logger.error(f"finishing the transcode of {filename} failed: {e}")
+        finally:
+            observe_transcode(outcome, time.monotonic() - started)
+            _remove(output)
+            _remove(source)
+            cls._slots.release()
+            TRANSCODE_PENDING.dec()
+
+
+def _new_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=AppConfig.TRANSCODE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,33 @@
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+'''
+the tests run against a throwaway SQLite database, configured before the application modules
+read their settings, with its storage path in the same temporary directory. tests sharing the
+database create their own projects.
+'''
+
+_TMP = tempfile.mkdtemp(prefix="tts-tests-")
+os.environ["MYSQL_PASSWORD_FILE"] = ""
+os.environ["DB_READ_REPLICA_URL"] = ""
+os.environ["SQLITE_DATABASE"] = os.path.join(_TMP, "tts_dataset.db")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The migrated test database, returns its storage path"""
+    from database.migration import migrate_schema
+    from services.settings_service import SettingsService
+    migrate_schema()
+    SettingsService.set_setting("storage_path", os.path.join(_TMP, "recordings"))
+    return SettingsService.ensure_storage_path()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP, ignore_errors=True)
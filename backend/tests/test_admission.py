@@ -0,0 +1,96 @@
+import asyncio
+
+from utils.admission import AdmissionLimit, AdmissionMiddleware, route_class
+
+'''
+admission control: concurrent requests per route class, a fifo wait queue behind them and a
+503 with Retry-After once the queue is full or the wait times out.
+'''
+
+
+def test_route_classes():
+    assert route_class("POST", "/upload_audio/") == "uploads"
+    assert route_class("POST", "/uploads/") == "uploads"
+    assert route_class("PATCH", "/uploads/abc") is None
+    assert route_class("POST", "/export_s3/") == "exports"
+    assert route_class("GET", "/projects/1/recordings") == "listings"
+    assert route_class("GET", "/settings/") is None
+
+
+def test_queue_is_served_in_arrival_order():
+    async def main():
+        limit = AdmissionLimit("test_fifo", limit=1, max_queue=2, queue_timeout=5)
+        order = []
+        assert await limit.acquire()
+
+        async def queued(name):
+            assert await limit.acquire()
+            order.append(name)
+            limit.release()
+
+        waiting = [asyncio.create_task(queued(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        assert len(limit.waiters) == 2
+        # the queue is full
+        assert not await limit.acquire()
+        limit.release()
+        await asyncio.gather(*waiting)
+        assert order == ["first", "second"]
+        assert limit.active == 0 and not limit.waiters
+    asyncio.run(main())
+
+
+def test_queue_wait_times_out():
+    async def main():
+        limit = AdmissionLimit("test_timeout", limit=1, max_queue=1, queue_timeout=0.01)
+        assert await limit.acquire()
+        assert not await limit.acquire()
+        assert not limit.waiters and limit.active == 1
+        limit.release()
+        assert limit.active == 0
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        limit = AdmissionLimit("test_cancel", limit=1, max_queue=1, queue_timeout=5)
+        assert await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert not limit.waiters
+        limit.release()
+        assert limit.active == 0
+    asyncio.run(main())
+
+
+def test_middleware_turns_requests_away_with_retry_after():
+    async def main():
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = AdmissionMiddleware(app, {"uploads": (1, 0)}, queue_timeout=5, retry_after=7)
+
+        async def request():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {"type": "http", "method": "POST", "path": "/upload_audio/", "headers": []}
+            await middleware(scope, None, send)
+            return messages[0]
+
+        admitted = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        rejected = await request()
+        assert rejected["status"] == 503
+        assert (b"retry-after", b"7") in rejected["headers"]
+        release.set()
+        assert (await admitted)["status"] == 200
+    asyncio.run(main())
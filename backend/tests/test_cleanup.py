@@ -0,0 +1,113 @@
+import io
+import os
+import time
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from database.async_connection import async_engine
+from database.connection import SessionLocal
+from models.database import Project, Prompt, Recording, StoragePurge
+from services.cleanup_service import CleanupService
+from services.project_service import ProjectService
+from services.recording_service import RecordingService
+from utils.file_utils import audio_filename
+
+'''
+deleting a project tombstones it: it disappears from the listings right away and its name is
+free, while CleanupService.collect removes its rows and files later. a live project recording
+the same text takes the tombstoned row over and keeps the file. storage purges queued by
+clear_database are rows that survive a restart.
+'''
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+def _upload(project_id: int, text: str, data: bytes = b"RIFF....WAVE") -> dict:
+    return _run(RecordingService.upload_audio_async(text, UploadFile(io.BytesIO(data), filename="a.wav"), project_id))
+
+
+def _rows(model, *conditions) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(model).filter(*conditions).count()
+    finally:
+        db.close()
+
+
+def test_deleted_project_is_hidden_and_collected(database):
+    project_id = ProjectService.create_project_with_prompts("cleanup hidden", ["cleanup one", "cleanup two"])["project_id"]
+    filename = _upload(project_id, "cleanup one")["filename"]
+    ProjectService.delete_project(project_id)
+
+    assert project_id not in [p["id"] for p in _run(ProjectService.list_projects_async())["projects"]]
+    with pytest.raises(HTTPException) as error:
+        _run(ProjectService.get_project_async(project_id))
+    assert error.value.status_code == 404
+    # removed in the background, not by the delete
+    assert os.path.exists(os.path.join(database, filename))
+
+    summary = CleanupService.collect()
+    assert summary["projects"] >= 1 and summary["recordings"] >= 1
+    assert not os.path.exists(os.path.join(database, filename))
+    assert _rows(Project, Project.id == project_id) == 0
+    assert _rows(Prompt, Prompt.project_id == project_id) == 0
+    assert _rows(Recording, Recording.project_id == project_id) == 0
+
+
+def test_deleted_project_name_is_reusable(database):
+    project_id = ProjectService.create_project_with_prompts("cleanup name", ["cleanup name prompt"])["project_id"]
+    ProjectService.delete_project(project_id)
+    assert ProjectService.create_project_with_prompts("cleanup name", ["cleanup name prompt"])["project_id"] != project_id
+
+
+def test_taken_over_recording_keeps_its_file(database):
+    deleted = ProjectService.create_project_with_prompts("cleanup old", ["cleanup shared"])["project_id"]
+    live = ProjectService.create_project_with_prompts("cleanup new", ["cleanup shared"])["project_id"]
+    _upload(deleted, "cleanup shared", b"RIFF-old")
+    ProjectService.delete_project(deleted)
+
+    assert _upload(live, "cleanup shared", b"RIFF-new")["status"] == "ok"
+    CleanupService.collect()
+    path = os.path.join(database, audio_filename("cleanup shared"))
+    with open(path, "rb") as f:
+        assert f.read() == b"RIFF-new"
+    assert _rows(Recording, Recording.project_id == live) == 1
+
+
+def test_live_project_cannot_take_over_another_live_recording(database):
+    first = ProjectService.create_project_with_prompts("cleanup first", ["cleanup live text"])["project_id"]
+    second = ProjectService.create_project_with_prompts("cleanup second", ["cleanup live text"])["project_id"]
+    _upload(first, "cleanup live text")
+    with pytest.raises(HTTPException) as error:
+        _upload(second, "cleanup live text")
+    assert error.value.status_code == 409
+
+
+def test_queued_storage_purge_survives_until_collected(tmp_path, database):
+    old, new = tmp_path / "old.wav", tmp_path / "new.wav"
+    old.write_bytes(b"old")
+    new.write_bytes(b"new")
+    cleared_at = time.time()
+    os.utime(old, (cleared_at - 60, cleared_at - 60))
+    os.utime(new, (cleared_at + 60, cleared_at + 60))
+    db = SessionLocal()
+    try:
+        CleanupService.schedule_purge(db, str(tmp_path), cleared_at)
+        db.commit()
+    finally:
+        db.close()
+    assert _rows(StoragePurge, StoragePurge.storage_path == str(tmp_path)) == 1
+
+    assert CleanupService.collect()["purged_files"] == 1
+    assert not old.exists() and new.exists()
+    assert _rows(StoragePurge, StoragePurge.storage_path == str(tmp_path)) == 0
@@ -0,0 +1,142 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.migration import migrate_schema
+from models.database import Project, Recording
+from services import fsck_service
+from services.fsck_service import FsckService
+
+'''
+the consistency check against a database and storage path of its own: what it reports, what
+repair changes (old orphans, rows of missing files, unknown sizes) and what it leaves alone
+(size mismatches, young orphans, dot files, tombstoned projects), and the refusal to repair an
+apparently unmounted storage path.
+'''
+
+OLD = time.time() - 7200
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fsck.db'}")
+    migrate_schema(engine)
+    path = tmp_path / "recordings"
+    path.mkdir()
+    monkeypatch.setattr(fsck_service, "engine", engine)
+    monkeypatch.setattr(fsck_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(fsck_service.SettingsService, "get_setting", staticmethod(lambda key, default=None: str(path)))
+    yield path, sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _file(path, filename: str, data: bytes = b"RIFF", mtime: float = OLD):
+    (path / filename).write_bytes(data)
+    os.utime(path / filename, (mtime, mtime))
+
+
+def _recordings(Session, rows: list, deleted: bool = False) -> int:
+    db = Session()
+    try:
+        project = Project(name=f"fsck {len(rows)} {deleted}", deleted_at=datetime.utcnow() if deleted else None)
+        db.add(project)
+        db.flush()
+        for filename, size_bytes in rows:
+            db.add(Recording(text=filename, filename=filename, project_id=project.id, size_bytes=size_bytes))
+        db.commit()
+        return project.id
+    finally:
+        db.close()
+
+
+def _sizes(Session) -> dict:
+    db = Session()
+    try:
+        return {r.filename: r.size_bytes for r in db.query(Recording)}
+    finally:
+        db.close()
+
+
+def _consistent(path, Session, count: int = 20):
+    for i in range(count):
+        _file(path, f"ok{i}.wav")
+    _recordings(Session, [(f"ok{i}.wav", 4) for i in range(count)])
+
+
+def test_report_finds_each_kind_of_problem(storage):
+    path, Session = storage
+    _consistent(path, Session)
+    _file(path, "orphan.wav")
+    _file(path, "young.wav", mtime=time.time())
+    _file(path, ".upload.tmp")
+    _file(path, "short.wav", b"RI")
+    _file(path, "unknown.wav")
+    _recordings(Session, [("missing.wav", 4), ("short.wav", 4), ("unknown.wav", None)])
+
+    report = FsckService.run(grace_seconds=3600)
+    assert report["recordings"] == 23
+    assert report["orphans"]["count"] == 2 and report["orphans"]["older_than_grace"] == 1
+    assert sorted(report["orphans"]["sample"]) == ["orphan.wav", "young.wav"]
+    assert report["missing"]["sample"] == ["missing.wav"]
+    assert report["size_mismatches"]["sample"] == [{"filename": "short.wav", "expected": 4, "actual": 2}]
+    assert report["unknown_sizes"] == 1
+    assert "repaired" not in report
+
+
+def test_repair_fixes_what_is_safe_and_reports_the_rest(storage):
+    path, Session = storage
+    _consistent(path, Session)
+    _file(path, "orphan.wav")
+    _file(path, "young.wav", mtime=time.time())
+    _file(path, "short.wav", b"RI")
+    _file(path, "unknown.wav")
+    _recordings(Session, [("missing.wav", 4), ("short.wav", 4), ("unknown.wav", None)])
+
+    report = FsckService.run(repair=True, grace_seconds=3600)
+    assert report["repaired"] == {"orphans_deleted": 1, "missing_rows_deleted": 1, "sizes_updated": 1}
+    assert not (path / "orphan.wav").exists() and (path / "young.wav").exists()
+    sizes = _sizes(Session)
+    assert "missing.wav" not in sizes
+    assert sizes["unknown.wav"] == 4
+    # a truncated file keeps its expected size
+    assert sizes["short.wav"] == 4
+
+
+def test_tombstoned_projects_are_left_to_cleanup(storage):
+    path, Session = storage
+    _consistent(path, Session)
+    _file(path, "deleted.wav")
+    _recordings(Session, [("deleted.wav", 4), ("deleted-missing.wav", 4)], deleted=True)
+
+    report = FsckService.run(repair=True, grace_seconds=0)
+    assert report["orphans"]["count"] == 0 and report["missing"]["count"] == 0
+    assert (path / "deleted.wav").exists()
+    assert "deleted-missing.wav" in _sizes(Session)
+
+
+def test_repair_refused_on_empty_storage_unless_forced(storage):
+    path, Session = storage
+    _recordings(Session, [("a.wav", 4), ("b.wav", 4)])
+
+    report = FsckService.run(repair=True)
+    assert "repaired" not in report and "no files" in report["repair_refused"]
+    assert len(_sizes(Session)) == 2
+
+    report = FsckService.run(repair=True, force=True)
+    assert report["repaired"]["missing_rows_deleted"] == 2
+    assert _sizes(Session) == {}
+
+
+def test_repair_refused_when_too_many_files_are_missing(storage, monkeypatch):
+    path, Session = storage
+    monkeypatch.setattr(fsck_service.AppConfig, "FSCK_MAX_MISSING_FRACTION", 0.1)
+    _consistent(path, Session, count=8)
+    _recordings(Session, [("gone1.wav", 4), ("gone2.wav", 4)])
+
+    report = FsckService.run(repair=True)
+    assert "repair_refused" in report
+    assert len(_sizes(Session)) == 10
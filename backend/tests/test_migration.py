@@ -0,0 +1,53 @@
+import json
+
+from sqlalchemy import create_engine, inspect, text
+
+from database.migration import LATEST_VERSION, get_schema_version, migrate_schema
+
+'''
+schema migrations on a fresh database and on one created before the prompts table and
+schema versioning existed.
+'''
+
+
+def _engine(tmp_path, name="app.db"):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_fresh_database_is_migrated_to_latest(tmp_path):
+    engine = _engine(tmp_path)
+    assert get_schema_version(engine) == 0
+    assert migrate_schema(engine) == LATEST_VERSION
+    tables = set(inspect(engine).get_table_names())
+    assert {"projects", "prompts", "recordings", "schema_version", "storage_purges", "upload_sessions"} <= tables
+    engine.dispose()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    engine = _engine(tmp_path)
+    migrate_schema(engine)
+    assert migrate_schema(engine) == LATEST_VERSION
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+    assert versions == list(range(1, LATEST_VERSION + 1))
+    engine.dispose()
+
+
+def test_legacy_json_prompts_are_moved_and_recordings_linked(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR(255) UNIQUE, prompts JSON, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE recordings (id INTEGER PRIMARY KEY, text TEXT, filename VARCHAR(255) UNIQUE, "
+                          "recorded_at DATETIME, project_id INTEGER)"))
+        conn.execute(text("INSERT INTO projects (id, name, prompts) VALUES (1, 'legacy', :prompts)"),
+                     {"prompts": json.dumps(["first", "second"])})
+        conn.execute(text("INSERT INTO recordings (text, filename, project_id) VALUES ('second', 'a.wav', 1)"))
+
+    assert migrate_schema(engine) == LATEST_VERSION
+    with engine.connect() as conn:
+        prompts = conn.execute(text("SELECT id, text, order_index FROM prompts WHERE project_id = 1 ORDER BY order_index")).all()
+        prompt_id = conn.execute(text("SELECT prompt_id FROM recordings WHERE filename = 'a.wav'")).scalar()
+    assert [(p.text, p.order_index) for p in prompts] == [("first", 0), ("second", 1)]
+    assert prompt_id == prompts[1].id
+    assert not any(column["name"] == "prompts" for column in inspect(engine).get_columns("projects"))
+    engine.dispose()
@@ -0,0 +1,102 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from database import routing
+from database.routing import DatabaseRoutingMiddleware
+from utils.response_cache import ResponseCache, cached_json, etag_matches, response_cache
+
+'''
+ETags of the polled listings: versions bumped by writes, If-None-Match answered with a 304
+without producing the body, rendered bodies reused, and nothing cached from a lagging replica.
+'''
+
+
+def _app(project_id: int, calls: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DatabaseRoutingMiddleware)
+
+    @app.get("/project")
+    async def project(request: Request):
+        async def produce():
+            calls.append(project_id)
+            return {"project_id": project_id, "version": len(calls)}
+        return await cached_json(request, f"project:{project_id}", await response_cache.project_etag_async(project_id), produce)
+
+    return app
+
+
+def test_project_bump_changes_its_etag_and_the_list_etag():
+    cache = ResponseCache()
+    project, other, listing = cache.project_etag(1), cache.project_etag(2), cache.list_etag()
+    cache.bump_project(1)
+    assert cache.project_etag(1) != project
+    assert cache.project_etag(2) == other
+    assert cache.list_etag() != listing
+
+
+def test_bump_all_drops_rendered_bodies():
+    cache = ResponseCache()
+    etag = cache.project_etag(1)
+    cache.put("project:1", etag, b"{}")
+    cache.bump_all()
+    assert cache.get("project:1", etag) is None
+    assert cache.project_etag(1) != etag
+
+
+def test_lru_is_bounded_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", "1", b"aaaa")
+    cache.put("b", "1", b"bbbb")
+    cache.put("c", "1", b"cccc")
+    assert cache.get("a", "1") is None and cache.get("c", "1") == b"cccc"
+    cache.put("d", "1", b"dddddddd")
+    assert cache.get("b", "1") is None and cache.get("c", "1") is None
+    cache.put("e", "1", b"x" * 11)
+    assert cache.get("e", "1") is None
+
+
+def test_etag_matches_weak_and_lists():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_conditional_get_returns_304_without_producing():
+    calls = []
+    client = TestClient(_app(9001, calls))
+    response = client.get("/project")
+    etag = response.headers["etag"]
+    assert response.status_code == 200 and calls == [9001]
+
+    assert client.get("/project", headers={"if-none-match": etag}).status_code == 304
+    assert client.get("/project").json() == response.json()
+    assert calls == [9001]
+
+    response_cache.bump_project(9001)
+    response = client.get("/project", headers={"if-none-match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert calls == [9001, 9001]
+
+
+def test_replica_reads_are_not_cached_until_settled(monkeypatch):
+    monkeypatch.setattr(routing, "has_replica", lambda: True)
+    monkeypatch.setattr(routing.DatabaseConfig, "READ_AFTER_WRITE_SECONDS", 60)
+    calls = []
+    client = TestClient(_app(9002, calls))
+    for _ in range(2):
+        response = client.get("/project")
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+    assert calls == [9002, 9002]
+
+
+def test_replica_reads_are_cached_once_settled(monkeypatch):
+    monkeypatch.setattr(routing, "has_replica", lambda: True)
+    monkeypatch.setattr(routing.DatabaseConfig, "READ_AFTER_WRITE_SECONDS", 0)
+    calls = []
+    client = TestClient(_app(9003, calls))
+    etag = client.get("/project").headers["etag"]
+    assert client.get("/project", headers={"if-none-match": etag}).status_code == 304
+    assert calls == [9003]
@@ -0,0 +1,113 @@
+import os
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import ClientDisconnect
+
+from config import AppConfig
+from database.async_connection import async_engine
+from services.project_service import ProjectService
+from services.resumable_upload_service import ResumableUploadService
+
+'''
+resumable uploads: chunks are accepted only at the offset received so far, bytes that arrived
+before a dropped connection are kept, and a complete upload becomes the prompt's recording.
+'''
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+async def _chunks(*parts, disconnect: bool = False):
+    for part in parts:
+        yield part
+    if disconnect:
+        raise ClientDisconnect()
+
+
+@pytest.fixture(scope="module")
+def project_id(database):
+    return ProjectService.create_project_with_prompts("resumable", ["resumable one", "resumable two"])["project_id"]
+
+
+async def _status_after(coroutine, upload_id: str, status: int) -> int:
+    with pytest.raises(HTTPException) as error:
+        await coroutine
+    assert error.value.status_code == status
+    return (await ResumableUploadService.status(upload_id))["offset"]
+
+
+def test_chunks_are_assembled_and_finalized(database, project_id):
+    async def main():
+        upload_id = (await ResumableUploadService.create("resumable one", project_id, 10))["upload_id"]
+        assert await ResumableUploadService.append(upload_id, 0, _chunks(b"RIFF", b"-"), 5) == 5
+        assert (await ResumableUploadService.status(upload_id))["offset"] == 5
+        assert await ResumableUploadService.append(upload_id, 5, _chunks(b"WAVE!"), 5) == 10
+        result = await ResumableUploadService.finalize(upload_id)
+        with pytest.raises(HTTPException) as error:
+            await ResumableUploadService.status(upload_id)
+        assert error.value.status_code == 404
+        return result
+    result = _run(main())
+    assert result["status"] == "ok"
+    with open(os.path.join(database, result["filename"]), "rb") as f:
+        assert f.read() == b"RIFF-WAVE!"
+
+
+def test_chunk_at_the_wrong_offset_is_rejected(project_id):
+    async def main():
+        upload_id = (await ResumableUploadService.create("resumable two", project_id, 10))["upload_id"]
+        await ResumableUploadService.append(upload_id, 0, _chunks(b"RIFF"))
+        assert await _status_after(ResumableUploadService.append(upload_id, 0, _chunks(b"RIFF")), upload_id, 409) == 4
+        assert await _status_after(ResumableUploadService.append(upload_id, 8, _chunks(b"RIFF")), upload_id, 409) == 4
+    _run(main())
+
+
+def test_chunk_past_the_length_is_rejected(project_id):
+    async def main():
+        upload_id = (await ResumableUploadService.create("resumable two", project_id, 6))["upload_id"]
+        # announced by Content-Length: nothing is written
+        assert await _status_after(ResumableUploadService.append(upload_id, 0, _chunks(b"RIFFWAVE"), 8), upload_id, 413) == 0
+        # streamed without a length: the bytes that fit are kept
+        assert await _status_after(ResumableUploadService.append(upload_id, 0, _chunks(b"RIFF", b"WAVE")), upload_id, 413) == 4
+    _run(main())
+
+
+def test_bytes_before_a_disconnect_are_kept(project_id):
+    async def main():
+        upload_id = (await ResumableUploadService.create("resumable two", project_id, 8))["upload_id"]
+        assert await ResumableUploadService.append(upload_id, 0, _chunks(b"RIF", disconnect=True)) == 3
+        assert (await ResumableUploadService.status(upload_id))["offset"] == 3
+        assert await ResumableUploadService.append(upload_id, 3, _chunks(b"FWAVE")) == 8
+    _run(main())
+
+
+def test_incomplete_upload_cannot_be_finalized(project_id):
+    async def main():
+        upload_id = (await ResumableUploadService.create("resumable two", project_id, 8))["upload_id"]
+        await ResumableUploadService.append(upload_id, 0, _chunks(b"RIFF"))
+        assert await _status_after(ResumableUploadService.finalize(upload_id), upload_id, 409) == 4
+    _run(main())
+
+
+def test_limits_and_expiry(project_id, monkeypatch):
+    monkeypatch.setattr(AppConfig, "UPLOAD_MAX_BYTES", 100)
+    with pytest.raises(HTTPException) as error:
+        _run(ResumableUploadService.create("resumable two", project_id, 101))
+    assert error.value.status_code == 413
+    with pytest.raises(HTTPException) as error:
+        _run(ResumableUploadService.create("not a prompt", project_id, 10))
+    assert error.value.status_code == 404
+
+    upload_id = _run(ResumableUploadService.create("resumable two", project_id, 10))["upload_id"]
+    monkeypatch.setattr(AppConfig, "UPLOAD_EXPIRY", -60)
+    with pytest.raises(HTTPException) as error:
+        _run(ResumableUploadService.status(upload_id))
+    assert error.value.status_code == 404
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database import routing
+from database.routing import DatabaseRoutingMiddleware, WROTE_COOKIE, mark_write, reads_from_primary
+
+'''
+read/write routing: with a replica, a client reads from the primary for the rest of a request
+that wrote and, through the db_wrote cookie, for DB_READ_AFTER_WRITE_SECONDS afterwards; other
+clients keep reading from the replica.
+'''
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DatabaseRoutingMiddleware)
+
+    @app.post("/write")
+    def write():
+        # sync endpoint: runs in the threadpool with a copy of the request context
+        mark_write()
+        return {"primary": reads_from_primary()}
+
+    @app.get("/read")
+    async def read():
+        return {"primary": reads_from_primary()}
+
+    return app
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(routing, "has_replica", lambda: True)
+
+
+def test_without_replica_everything_reads_from_primary():
+    client = TestClient(_app())
+    assert client.get("/read").json() == {"primary": True}
+    response = client.post("/write")
+    assert response.json() == {"primary": True}
+    assert WROTE_COOKIE not in response.cookies
+
+
+def test_reads_go_to_replica_until_the_client_writes(replica):
+    client = TestClient(_app())
+    assert client.get("/read").json() == {"primary": False}
+    response = client.post("/write")
+    assert response.json() == {"primary": True}
+    assert WROTE_COOKIE in response.cookies
+    assert client.get("/read").json() == {"primary": True}
+
+
+def test_other_clients_keep_reading_from_replica(replica):
+    app = _app()
+    TestClient(app).post("/write")
+    assert TestClient(app).get("/read").json() == {"primary": False}
+
+
+def test_expired_write_cookie_reads_from_replica(replica):
+    client = TestClient(_app())
+    written_at = time.time() - routing.DatabaseConfig.READ_AFTER_WRITE_SECONDS - 1
+    response = client.get("/read", headers={"cookie": f"{WROTE_COOKIE}={written_at:.3f}"})
+    assert response.json() == {"primary": False}
+
+
+def test_malformed_write_cookie_is_ignored(replica):
+    client = TestClient(_app())
+    assert client.get("/read", headers={"cookie": f"{WROTE_COOKIE}=soon"}).json() == {"primary": False}
@@ -0,0 +1,38 @@
+import os
+import sys
+import gzip
+import tempfile
+
+from starlette.datastructures import UploadFile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.sampling_service import SamplingService
+
+'''
+corpus uploads reach the sampler as the multipart parser leaves them: an UploadFile spooled to
+a SpooledTemporaryFile opened "w+b".
+'''
+
+LINES = [f"sentence number {i} of the corpus" for i in range(200)]
+
+
+def _uploaded(data: bytes, filename: str) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b")
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, filename=filename)
+
+
+def test_sample_uploaded_gzip_corpus():
+    upload = _uploaded(gzip.compress("\n".join(LINES).encode()), "corpus.txt.gz")
+    prompts, stats = SamplingService.sample(upload.file, 20, seed=7, gzipped=True)
+    assert stats["lines_read"] == len(LINES)
+    assert len(prompts) == 20 and set(prompts) <= set(LINES)
+
+
+def test_sample_uploaded_gzip_matches_plain():
+    plain, _ = SamplingService.sample(_uploaded("\n".join(LINES).encode(), "corpus.txt").file, 20, seed=7)
+    zipped, _ = SamplingService.sample(_uploaded(gzip.compress("\n".join(LINES).encode()), "corpus.txt.gz").file,
+                                       20, seed=7, gzipped=True)
+    assert plain == zipped
@@ -0,0 +1,71 @@
+import unicodedata
+
+import pytest
+from fastapi import HTTPException
+
+from services.project_service import ProjectService
+from utils.text_utils import dedupe_prompts, normalize_prompt, prompt_hash
+
+'''
+prompt normalization (NFC, invisible characters, whitespace) and the deduplication it keys:
+within an uploaded prompt list, and optionally against the prompts of other live projects.
+'''
+
+ARABIC = "سَلام"
+
+
+def test_normalize_nfc_and_whitespace():
+    assert normalize_prompt(unicodedata.normalize("NFD", ARABIC)) == unicodedata.normalize("NFC", ARABIC)
+    assert normalize_prompt("  hello \t  world\n") == "hello world"
+
+
+def test_normalize_drops_invisible_characters_but_keeps_joiners():
+    assert normalize_prompt("\ufeffhel\u200blo\u200f") == "hello"
+    assert normalize_prompt("hello\x00 world") == "hello world"
+    # ZWNJ changes letter joining in Persian and is part of the text
+    assert normalize_prompt("می\u200cخواهم") == "می\u200cخواهم"
+
+
+def test_prompt_hash_of_equivalent_texts():
+    assert prompt_hash("hello  world") == prompt_hash("\u200bhello world ")
+    assert prompt_hash("hello world") != prompt_hash("hello worlds")
+
+
+def test_dedupe_keeps_first_occurrence_in_order():
+    prompts, hashes, dropped = dedupe_prompts(["b", "a", " b ", "", "\u200b", "c", "a"])
+    assert prompts == ["b", "a", "c"]
+    assert hashes == [prompt_hash(text) for text in prompts]
+    assert dropped == 2
+
+
+def test_create_project_reports_dropped_duplicates(database):
+    result = ProjectService.create_project_with_prompts("text dedupe", ["one", "one ", "two"])
+    assert result["prompt_count"] == 2 and result["duplicates_dropped"] == 1
+
+
+def test_dedupe_across_live_projects(database):
+    ProjectService.create_project_with_prompts("text across first", ["across a", "across b"])
+    result = ProjectService.create_project_with_prompts("text across second", ["across a", "across c"],
+                                                        dedupe_across_projects=True)
+    assert result["prompt_count"] == 1 and result["cross_project_duplicates"] == 1
+    with pytest.raises(HTTPException) as error:
+        ProjectService.create_project_with_prompts("text across third", ["across b"], dedupe_across_projects=True)
+    assert error.value.status_code == 400
+
+
+def test_dedupe_ignores_deleted_projects(database):
+    project_id = ProjectService.create_project_with_prompts("text deleted", ["deleted prompt"])["project_id"]
+    ProjectService.delete_project(project_id)
+    result = ProjectService.create_project_with_prompts("text after delete", ["deleted prompt"], dedupe_across_projects=True)
+    assert result["prompt_count"] == 1
+
+
+def test_project_name_is_checked_against_live_projects(database):
+    project_id = ProjectService.create_project_with_prompts("text name", ["name prompt"])["project_id"]
+    with pytest.raises(HTTPException) as error:
+        ProjectService.create_project_with_prompts("text name", ["name prompt"])
+    assert error.value.status_code == 400
+    ProjectService.delete_project(project_id)
+    ProjectService.create_project_with_prompts("text name", ["name prompt"])
+    # a live project may take the name a tombstoned project was renamed to
+    ProjectService.create_project_with_prompts(f"text name~deleted~{project_id}", ["name prompt"])
@@ -0,0 +1,144 @@
+import io
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from config import AppConfig
+from database.async_connection import async_engine
+from database.connection import SessionLocal
+from models.database import Recording
+from services import transcode_service
+from services.project_service import ProjectService
+from services.recording_service import RecordingService
+from services.transcode_service import TranscodeService
+from utils.audio_utils import compressed_format, conversion_stale_after
+
+'''
+status transitions of compressed uploads: a WebM / Ogg / MP4 upload is committed 'processing'
+and becomes 'ready' with the converted file, or 'failed'; a newer upload of the prompt
+supersedes a pending conversion and a full queue turns uploads away. the process pool and
+ffmpeg are replaced by a thread pool and a fake conversion.
+'''
+
+WEBM = b"\x1aE\xdf\xa3webm recording"
+WAV = b"RIFF....WAVE"
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+def _upload(project_id: int, text: str, data: bytes) -> dict:
+    return _run(RecordingService.upload_audio_async(text, UploadFile(io.BytesIO(data), filename="take"), project_id))
+
+
+def _recording(filename: str):
+    db = SessionLocal()
+    try:
+        return db.query(Recording.status, Recording.size_bytes).filter(Recording.filename == filename).one()
+    finally:
+        db.close()
+
+
+class FakeTranscoder:
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = None
+
+    def __call__(self, source, target, ffmpeg, sample_rate, timeout):
+        self.gate.wait(5)
+        if self.error:
+            raise RuntimeError(self.error)
+        with open(target, "wb") as f:
+            f.write(b"RIFF converted")
+
+    def drain(self):
+        """Wait for every submitted conversion to be finished"""
+        for executor in (TranscodeService._pool, TranscodeService._finisher):
+            executor.shutdown(wait=True)
+        TranscodeService._pool = ThreadPoolExecutor(max_workers=1)
+        TranscodeService._finisher = ThreadPoolExecutor(max_workers=1)
+
+
+@pytest.fixture
+def transcoder(database, monkeypatch):
+    fake = FakeTranscoder()
+    monkeypatch.setattr(transcode_service, "transcode_to_wav", fake)
+    monkeypatch.setattr(TranscodeService, "_pool", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(TranscodeService, "_finisher", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(TranscodeService, "_slots", threading.BoundedSemaphore(2))
+    yield fake
+    fake.gate.set()
+    fake.drain()
+
+
+@pytest.fixture
+def prompt(database, request):
+    """(project_id, text) of a prompt of its own, recordings are named after their text"""
+    text = f"transcode {request.node.name}"
+    return ProjectService.create_project_with_prompts(text, [text])["project_id"], text
+
+
+def test_compressed_formats_are_recognised():
+    assert compressed_format(io.BytesIO(WEBM)) == "webm"
+    assert compressed_format(io.BytesIO(b"OggS\x00\x02")) == "ogg"
+    assert compressed_format(io.BytesIO(b"\x00\x00\x00\x18ftypmp42")) == "mp4"
+    assert compressed_format(io.BytesIO(WAV)) is None
+
+
+def test_conversion_stale_after_rounds_the_queue_up(monkeypatch):
+    monkeypatch.setattr(AppConfig, "TRANSCODE_TIMEOUT", 10)
+    monkeypatch.setattr(AppConfig, "TRANSCODE_QUEUE_LIMIT", 5)
+    monkeypatch.setattr(AppConfig, "TRANSCODE_WORKERS", 2)
+    assert conversion_stale_after() == 40
+
+
+def test_processing_then_ready(transcoder, prompt, database):
+    transcoder.gate.clear()
+    result = _upload(*prompt, WEBM)
+    assert result["status"] == "processing"
+    assert _recording(result["filename"]) == ("processing", None)
+
+    transcoder.gate.set()
+    transcoder.drain()
+    assert _recording(result["filename"]) == ("ready", len(b"RIFF converted"))
+    with open(os.path.join(database, result["filename"]), "rb") as f:
+        assert f.read() == b"RIFF converted"
+
+
+def test_processing_then_failed(transcoder, prompt):
+    transcoder.error = "invalid data found"
+    result = _upload(*prompt, WEBM)
+    transcoder.drain()
+    assert _recording(result["filename"]).status == "failed"
+
+
+def test_newer_upload_supersedes_a_pending_conversion(transcoder, prompt, database):
+    transcoder.gate.clear()
+    filename = _upload(*prompt, WEBM)["filename"]
+    assert _upload(*prompt, WAV)["status"] == "ok"
+    transcoder.gate.set()
+    transcoder.drain()
+    assert _recording(filename) == ("ready", len(WAV))
+    with open(os.path.join(database, filename), "rb") as f:
+        assert f.read() == WAV
+
+
+def test_full_queue_turns_compressed_uploads_away(transcoder, prompt):
+    transcoder.gate.clear()
+    _upload(*prompt, WEBM)
+    _upload(*prompt, WEBM)
+    with pytest.raises(HTTPException) as error:
+        _upload(*prompt, WEBM)
+    assert error.value.status_code == 503 and "Retry-After" in error.value.headers
@@ -1,4 +1,5 @@
-from utils.file_utils import save_audio_file, delete_audio_file
+from utils.file_utils import audio_filename, save_audio_file, stage_audio_file, delete_audio_file, upload_staging_dir, staged_upload_path, transcode_staging_dir, save_transcode_source
+from utils.audio_utils import compressed_format, conversion_stale_after, transcode_to_wav
 from utils.logging import log_interaction
 
-__all__ = ['save_audio_file', 'delete_audio_file', 'log_interaction'] 
\ No newline at end of file
+__all__ = ['audio_filename', 'save_audio_file', 'stage_audio_file', 'delete_audio_file', 'upload_staging_dir', 'staged_upload_path', 'transcode_staging_dir', 'save_transcode_source', 'compressed_format', 'conversion_stale_after', 'transcode_to_wav', 'log_interaction'] 
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+from collections import deque
+from starlette.responses import JSONResponse
+from utils.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_QUEUE_WAIT
+
+'''
+admission control: a concurrency limit with a bounded wait queue per route class, so a burst of
+one kind of request (a bulk export, a crawl of the listings) cannot take every threadpool worker
+and session_lock slot from interactive recording. a request over its class limit waits in a fifo
+queue on the event loop (no thread is held) for up to queue_timeout; when the queue is full or
+the wait times out it gets an immediate 503 with Retry-After instead of hanging until the client
+gives up. limits are per process: with several workers the totals are limit x workers.
+'''
+
+# (class, method, path prefix), first match wins; unmatched requests (static files, settings,
+# metrics, fsck status) are not limited
+ROUTE_CLASSES = (
+    ("uploads", "POST", "/upload_audio/"),
+    ("uploads", "POST", "/delete_audio/"),
+    # resumable upload creation / finalize; PATCH chunks are not limited, a speaker on a slow
+    # connection would hold a slot for the whole chunk
+    ("uploads", "POST", "/uploads/"),
+    ("exports", "POST", "/export_"),
+    ("exports", "POST", "/upload_csv/"),
+    ("exports", "POST", "/create_project/sample"),
+    ("exports", "POST", "/coverage/"),
+    ("listings", "GET", "/projects/"),
+    ("listings", "GET", "/list_recordings/"),
+    ("listings", "GET", "/recordings/"),
+    ("listings", "GET", "/prompts/"),
+)
+
+
+def route_class(method: str, path: str):
+    for name, class_method, prefix in ROUTE_CLASSES:
+        if method == class_method and path.startswith(prefix):
+            return name
+    return None
+
+
+class AdmissionLimit:
+    """At most limit requests at once, up to max_queue more waiting in arrival order"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters = deque()
+        # set explicitly rather than through set_function, which prometheus multiprocess mode cannot export
+        self._active_gauge = ADMISSION_ACTIVE.labels(name)
+        self._queued_gauge = ADMISSION_QUEUED.labels(name)
+        self._report()
+
+    def _report(self):
+        self._active_gauge.set(self.active)
+        self._queued_gauge.set(len(self.waiters))
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False when the request should be turned away"""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self._report()
+            return True
+        if len(self.waiters) >= self.max_queue:
+            return False
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.waiters.append(waiter)
+        self._report()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._leave_queue(waiter)
+        except asyncio.CancelledError:
+            # client went away while queued
+            if self._leave_queue(waiter):
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(loop.time() - start)
+
+    def _leave_queue(self, waiter) -> bool:
+        """Drop a waiter from the queue; True when the slot had already been handed to it"""
+        if waiter.done():
+            return True
+        waiter.cancel()
+        self.waiters.remove(waiter)
+        self._report()
+        return False
+
+    def release(self):
+        # hand the slot straight to the next waiter, so a newer request cannot overtake the queue
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._report()
+                return
+        self.active -= 1
+        self._report()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the AdmissionLimit of each request's route class"""
+
+    def __init__(self, app, limits: dict, queue_timeout: float = 5.0, retry_after: int = 2):
+        self.app = app
+        # limits: {class name: (concurrent requests, queued requests)}, a limit of 0 disables the class
+        self.limits = {name: AdmissionLimit(name, limit, max_queue, queue_timeout)
+                       for name, (limit, max_queue) in limits.items() if limit > 0}
+        self.retry_after = str(retry_after)
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(route_class(scope["method"], scope["path"])) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limit.acquire():
+            ADMISSION_REJECTED.labels(limit.name).inc()
+            response = JSONResponse({"detail": f"Server busy ({limit.name}), retry later"}, status_code=503,
+                                    headers={"Retry-After": self.retry_after})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
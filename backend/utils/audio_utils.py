@@ -0,0 +1,47 @@
+import subprocess
+from typing import Optional
+from config import AppConfig
+
+'''
+compressed browser recordings.
+MediaRecorder produces Opus in WebM (Chrome, Edge) or Ogg (Firefox), and AAC in MP4 (Safari),
+whatever name or content type the client gives the file, so uploads are recognised by their
+container signature. transcode_to_wav runs in the transcode pool processes and only drives an
+ffmpeg child; it must stay importable without the database or the app.
+'''
+
+_SIGNATURE_BYTES = 12
+
+
+def compressed_format(fileobj) -> Optional[str]:
+    """'webm', 'ogg' or 'mp4' for a compressed recording, None for WAV and anything else (stored as sent)"""
+    head = fileobj.read(_SIGNATURE_BYTES)
+    fileobj.seek(0)
+    if head[:4] == b"\x1aE\xdf\xa3":  # EBML header (WebM / Matroska)
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    return None
+
+
+def conversion_stale_after() -> float:
+    """Seconds after which a conversion has finished or its process is gone: a full queue drained at the timeout"""
+    queued_rounds = -(-AppConfig.TRANSCODE_QUEUE_LIMIT // max(1, AppConfig.TRANSCODE_WORKERS))  # ceiling division
+    return AppConfig.TRANSCODE_TIMEOUT * (1 + queued_rounds)
+
+
+def transcode_to_wav(source: str, target: str, ffmpeg: str, sample_rate: int, timeout: float):
+    """Decode source into a mono 16-bit PCM WAV at sample_rate, raises RuntimeError with ffmpeg's message"""
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+             "-vn", "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", "-f", "wav", target],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffmpeg took longer than {timeout}s")
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip()
+        raise RuntimeError(message[-500:] or f"ffmpeg exited with code {result.returncode}")
@@ -0,0 +1,172 @@
+import zlib
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+'''
+gzip / brotli response compression for the JSON (and NDJSON) endpoints.
+bodies below minimum_size, audio files and responses that are already encoded pass through.
+a compressed representation is a different set of bytes, so strong ETags get an encoding
+suffix ("...-br"), which is stripped from If-None-Match before the request reaches the app.
+large complete bodies are compressed in the threadpool to keep the event loop responsive;
+streamed bodies are compressed chunk by chunk and flushed so every chunk reaches the client.
+'''
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+THREADPOOL_MIN_SIZE = 256 * 1024
+
+
+def strip_etag_suffix(etag: str) -> str:
+    for suffix in ETAG_SUFFIXES.values():
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def _strip_suffixes(if_none_match: str) -> str:
+    return ", ".join(strip_etag_suffix(tag.strip()) for tag in if_none_match.split(","))
+
+
+def _suffixed(etag: str, encoding: str) -> str:
+    if etag.endswith('"'):
+        return etag[:-1] + ETAG_SUFFIXES[encoding] + '"'
+    return etag
+
+
+def select_encoding(accept_encoding: str, brotli_enabled: bool = True):
+    """Preferred supported content coding from an Accept-Encoding header (q=0 excludes)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    candidates = (["br"] if brotli is not None and brotli_enabled else []) + ["gzip"]
+    best = None
+    for encoding in candidates:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4, brotli_enabled: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        if "if-none-match" in request_headers:
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, _strip_suffixes(value.decode("latin-1")).encode("latin-1")) if name == b"if-none-match" else (name, value)
+                for name, value in scope["headers"]
+            ]
+        encoding = select_encoding(request_headers.get("accept-encoding", ""), self.brotli_enabled)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if message["status"] == 304:
+                    # keep the validator the client holds for the compressed representation
+                    etag = headers.get("etag")
+                    if etag and _suffixed(etag, encoding) in request_headers.get("if-none-match", ""):
+                        headers["etag"] = _suffixed(etag, encoding)
+                    passthrough = True
+                elif "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                else:
+                    headers.add_vary_header("Accept-Encoding")
+                if passthrough:
+                    return await send(message)
+                start_message = message
+                return
+
+            if passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if compressor is None:
+                if not more_body:
+                    # complete body in one message
+                    if len(body) < self.minimum_size:
+                        passthrough = True
+                        await send(start_message)
+                        return await send(message)
+                    compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                    if len(body) >= THREADPOOL_MIN_SIZE:
+                        compressed = await run_in_threadpool(compressor.finish, body)
+                    else:
+                        compressed = compressor.finish(body)
+                    self._set_encoding_headers(headers, encoding)
+                    headers["content-length"] = str(len(compressed))
+                    await send(start_message)
+                    return await send({"type": "http.response.body", "body": compressed})
+                # streamed body: no content-length, compress and flush chunk by chunk
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                self._set_encoding_headers(headers, encoding)
+                del headers["content-length"]
+                await send(start_message)
+
+            if more_body:
+                chunk = compressor.compress(body, flush=True)
+            else:
+                chunk = compressor.finish(body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _set_encoding_headers(headers: MutableHeaders, encoding: str):
+        headers["content-encoding"] = encoding
+        etag = headers.get("etag")
+        if etag:
+            headers["etag"] = _suffixed(etag, encoding)
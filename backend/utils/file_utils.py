@@ -1,24 +1,64 @@
 import os
+import uuid
 import shutil
 import hashlib
 
+def audio_filename(text: str) -> str:
+    """Storage file name of a prompt's recording"""
+    return hashlib.md5(text.encode()).hexdigest() + '.wav'
+
 def save_audio_file(audio_file, text: str, storage_path: str) -> str:
     """Save audio file and return filename"""
-    # Generate filename from text
-    filename = hashlib.md5(text.encode()).hexdigest() + '.wav'
-    file_path = os.path.join(storage_path, filename)
-    
-    # Save the audio file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(audio_file.file, buffer)
-    
+    filename = audio_filename(text)
+    os.replace(stage_audio_file(audio_file, filename, storage_path), os.path.join(storage_path, filename))
     return filename
 
+def stage_audio_file(audio_file, filename: str, storage_path: str) -> str:
+    """Write an upload next to its target under a temporary name, returns the temporary path"""
+    # renamed over the target (os.replace) once the upload owns the recording: concurrent uploads
+    # (from any worker or node sharing the volume) replace the file whole, and readers never see a
+    # partly written one. fsck skips the dot-prefixed temporary files.
+    temp_path = os.path.join(storage_path, f".{filename}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, "wb") as buffer:
+            shutil.copyfileobj(audio_file.file, buffer)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return temp_path
+
+def upload_staging_dir(storage_path: str) -> str:
+    """Directory of partial resumable uploads, inside the storage path so workers on a shared volume see them"""
+    return os.path.join(storage_path, ".uploads")
+
+def staged_upload_path(storage_path: str, upload_id: str) -> str:
+    return os.path.join(upload_staging_dir(storage_path), upload_id + ".part")
+
+def transcode_staging_dir(storage_path: str) -> str:
+    """Directory of compressed uploads waiting for conversion (<filename>.<token>.src) and their output (.out)"""
+    return os.path.join(storage_path, ".transcode")
+
+def save_transcode_source(audio_file, filename: str, token: str, storage_path: str) -> str:
+    """Keep a compressed upload for the transcode pool, returns its path"""
+    staging_dir = transcode_staging_dir(storage_path)
+    os.makedirs(staging_dir, exist_ok=True)
+    source_path = os.path.join(staging_dir, f"{filename}.{token}.src")
+    try:
+        with open(source_path, "wb") as buffer:
+            shutil.copyfileobj(audio_file.file, buffer)
+    except BaseException:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+        raise
+    return source_path
+
 def delete_audio_file(filename: str, storage_path: str):
     """Delete audio file from storage"""
     file_path = os.path.join(storage_path, filename)
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            print(f"Failed to delete file {filename}: {e}") 
\ No newline at end of file
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass  # never written, or already removed by another worker
+    except Exception as e:
+        print(f"Failed to delete file {filename}: {e}")
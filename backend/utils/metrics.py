@@ -0,0 +1,310 @@
+import os
+import time
+import threading
+from functools import wraps
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+'''
+prometheus instrumentation for the api, the db pool and the recordings storage.
+everything recorded on the request path is a label lookup plus a counter/histogram update,
+the expensive bits (pool stats, storage scan) are only computed when /metrics is scraped.
+with several workers set PROMETHEUS_MULTIPROC_DIR (an empty directory shared by the workers):
+prometheus_client then keeps the values in mmapped files and /metrics adds up every worker's;
+the scrape-time collectors report the pool of the worker that served the scrape.
+'''
+
+_MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by router and route",
+    ["router", "method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+SESSION_LOCK_WAIT = Histogram(
+    "db_session_lock_wait_seconds",
+    "Time spent waiting to acquire the global session lock",
+    buckets=(.0005, .001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent checking a connection out of the SQLAlchemy pool",
+    ["engine"],
+    buckets=(.0005, .001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CONNECTS = Counter(
+    "db_pool_connects_total",
+    "New DBAPI connections opened by the SQLAlchemy pool",
+)
+UPLOAD_BYTES = Counter(
+    "recording_upload_bytes_total",
+    "Audio bytes written to storage by uploads",
+)
+UPLOADS = Counter(
+    "recording_uploads_total",
+    "Audio uploads written to storage",
+)
+EXPORT_DURATION = Histogram(
+    "export_duration_seconds",
+    "Duration of export jobs by target and outcome",
+    ["target", "status"],
+    buckets=(.1, .5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+TRANSCODE_DURATION = Histogram(
+    "transcode_duration_seconds",
+    "Time from a compressed upload to its WAV being stored (queue wait included), by outcome",
+    ["status"],
+    buckets=(.1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+TRANSCODE_PENDING = Gauge(
+    "transcode_pending",
+    "Compressed uploads waiting for or in conversion",
+    multiprocess_mode="livesum",
+)
+
+REPLICATION_UPLOADS = Counter(
+    "replication_uploads_total",
+    "Write-behind recording uploads to object storage by outcome",
+    ["status"],
+)
+REPLICATION_BACKLOG = Gauge(
+    "replication_backlog",
+    "Recordings waiting in the replication queue",
+    multiprocess_mode="livemax",  # every worker reports the same queue
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "admission_active_requests",
+    "Requests holding an admission slot, by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for an admission slot, by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time queued requests waited for an admission slot",
+    ["route_class"],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests turned away with 503 because their route class was saturated",
+    ["route_class"],
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every http request, labelled by the router tag and route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_labels = None
+
+    def _labels_for(self, scope):
+        endpoint = scope.get("endpoint")
+        if self._route_labels is None:
+            labels = {}
+            for route in getattr(scope.get("app"), "routes", []):
+                if hasattr(route, "endpoint"):
+                    tags = getattr(route, "tags", None) or ["other"]
+                    labels[route.endpoint] = (str(tags[0]), route.path)
+            self._route_labels = labels
+        # anything that is not a route (the StaticFiles mount at "/", unmatched paths) shares one label:
+        # the raw path would make one series per URL anyone asks for
+        return self._route_labels.get(endpoint, ("static", "/"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            router, route = self._labels_for(scope)
+            REQUEST_LATENCY.labels(router, scope["method"], route, str(status_code)).observe(time.perf_counter() - start)
+
+
+class TimedLock:
+    """threading.Lock drop-in that records how long callers waited to acquire it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        SESSION_LOCK_WAIT.observe(time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited, including opening new connections"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+
+class DatabasePoolCollector:
+    """Reports SQLAlchemy pool gauges for every instrumented engine at scrape time"""
+
+    STATS = {
+        "size": "Configured pool size",
+        "checkedin": "Idle connections in the pool",
+        "checkedout": "Connections currently checked out",
+        "overflow": "Connections opened beyond the pool size",
+    }
+
+    def __init__(self):
+        self.engines = {}
+
+    def add(self, engine, name: str):
+        self.engines[name] = engine
+
+    def collect(self):
+        for stat, doc in self.STATS.items():
+            gauge = GaugeMetricFamily(f"db_pool_{stat}", doc, labels=["engine"])
+            for name, engine in self.engines.items():
+                getter = getattr(engine.pool, stat, None)
+                if getter is not None:
+                    gauge.add_metric([name], float(getter()))
+            yield gauge
+
+
+class StorageCollector:
+    """Reports file count and bytes of the recordings directory, rescanned at most once per ttl"""
+
+    def __init__(self, get_storage_path, ttl: float = 60):
+        self.get_storage_path = get_storage_path
+        self.ttl = ttl
+        self._cached = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def _scan(self, storage_path: str):
+        files = 0
+        size = 0
+        if os.path.isdir(storage_path):
+            with os.scandir(storage_path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        files += 1
+                        size += entry.stat(follow_symlinks=False).st_size
+        return files, size
+
+    def describe(self):
+        # registration must not trigger a scan (or a settings lookup before the tables exist)
+        yield GaugeMetricFamily("storage_files", "Files in the recordings storage directory")
+        yield GaugeMetricFamily("storage_bytes", "Bytes used by the recordings storage directory")
+
+    def collect(self):
+        with self._lock:
+            if self._cached is None or time.monotonic() - self._scanned_at > self.ttl:
+                self._cached = self._scan(self.get_storage_path())
+                self._scanned_at = time.monotonic()
+            files, size = self._cached
+        yield GaugeMetricFamily("storage_files", "Files in the recordings storage directory", value=files)
+        yield GaugeMetricFamily("storage_bytes", "Bytes used by the recordings storage directory", value=size)
+
+
+_pool_collector = None
+_scrape_collectors = []  # also registered on the per-scrape registry in multiprocess mode
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Attach pool event counters and register pool gauges for an engine"""
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics_name = name
+    event.listen(engine, "connect", lambda *args: DB_POOL_CONNECTS.inc())
+    global _pool_collector
+    if _pool_collector is None:
+        _pool_collector = DatabasePoolCollector()
+        REGISTRY.register(_pool_collector)
+        _scrape_collectors.append(_pool_collector)
+    _pool_collector.add(engine, name)
+
+
+def register_storage_collector(get_storage_path, ttl: float = 60):
+    collector = StorageCollector(get_storage_path, ttl)
+    REGISTRY.register(collector)
+    _scrape_collectors.append(collector)
+
+
+def observe_upload(nbytes: int):
+    UPLOADS.inc()
+    UPLOAD_BYTES.inc(nbytes)
+
+
+def observe_transcode(status: str, seconds: float):
+    TRANSCODE_DURATION.labels(status).observe(seconds)
+
+
+def observe_export(target: str):
+    """Decorator timing an export function; the outcome label comes from the returned status"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "exception"
+            try:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict):
+                    status = result.get("status", "ok")
+                return result
+            finally:
+                EXPORT_DURATION.labels(target, status).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    if _MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _scrape_collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from greenlet import greenlet
+from sqlalchemy import event
+from utils.logging import logger
+
+'''
+opt-in request profiling and slow query logging.
+profiles are collected by a sampling profiler (stacks of every thread, so sync endpoints running
+in the threadpool are captured too) and written in the collapsed-stack format understood by
+flamegraph.pl and speedscope. concurrent requests show up in each other's profiles.
+'''
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services")
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads every interval until stopped, then writes them to disk"""
+
+    def __init__(self, output_path: str, interval: float = 0.005):
+        self.output_path = output_path
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # the sampler thread writes the profile itself so the request never waits on disk I/O
+        self._stop.set()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+        self._write()
+
+    def _write(self):
+        try:
+            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+            with open(self.output_path, "w") as out:
+                for stack, count in self.samples.most_common():
+                    out.write(f"{stack} {count}\n")
+        except Exception as e:
+            logger.error(f"failed to write profile {self.output_path}: {e}")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware logging slow requests and profiling sampled or header-triggered ones"""
+
+    def __init__(self, app, profile_dir: str, sample_rate: float = 0.0, header: str = "X-Profile",
+                 slow_request_ms: float = 1000, interval_ms: float = 5):
+        self.app = app
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+        self.slow_request_ms = slow_request_ms
+        self.interval = interval_ms / 1000
+
+    def _should_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == self.header and value not in (b"", b"0", b"false"):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profile_path(self, scope) -> str:
+        route = scope["path"].strip("/").replace("/", "_") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return os.path.join(self.profile_dir, f"{stamp}_{scope['method']}_{route}.folded")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = None
+        send_wrapper = send
+        if self._should_profile(scope):
+            profile_path = self._profile_path(scope)
+            profiler = SamplingProfiler(profile_path, self.interval).start()
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-file", os.path.basename(profile_path).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if profiler is not None:
+                profiler.stop()
+                logger.info(f"profiled {scope['method']} {scope['path']} in {elapsed_ms:.1f}ms -> {profiler.output_path}")
+            if elapsed_ms >= self.slow_request_ms:
+                logger.warning(f"slow request {scope['method']} {scope['path']} took {elapsed_ms:.1f}ms")
+
+
+def _calling_service_method() -> str:
+    """Name the innermost services/ function on the stack, only evaluated for slow queries"""
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(SERVICES_DIR):
+            module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+            return f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+        # async engines run the driver in a child greenlet, the awaiting coroutine is on the parent's stack
+        if frame is None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+    return "unknown"
+
+
+def install_slow_query_logging(engine, threshold_ms: float):
+    """Log statements slower than threshold_ms with their duration and calling service method"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if elapsed_ms >= threshold_ms:
+            statement = " ".join(statement.split())
+            logger.warning(f"slow query {elapsed_ms:.1f}ms in {_calling_service_method()}: {statement[:1000]}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # a statement that raised never reaches after_cursor_execute, drop its start time
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
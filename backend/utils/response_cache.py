@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from config import AppConfig, DatabaseConfig
+from database.routing import reads_from_primary
+from database.coordination import version_stamps
+from utils.logging import logger
+
+'''
+conditional GET support for the polled listing endpoints.
+every project has an in-memory version counter, bumped by the services after each committed
+write (uploads, deletes, project create/delete); the project list uses a global counter bumped
+by any of them. ETags are derived from the counters alone, so a poll with a matching
+If-None-Match is answered with a 304 without touching the database. changed resources are
+served from a small LRU of rendered bodies when another client already fetched that version.
+misses read like any other read (from the replica, when there is one, unless this client just
+wrote). a body read from a replica may be older than the version it would be cached under, so it
+is only cached (and sent with the ETag) from the primary, or once the version was first seen more
+than DB_READ_AFTER_WRITE_SECONDS ago; until then it is served uncached.
+the boot nonce keeps ETags from a previous process (whose counters restarted at 0) from matching.
+with SHARED_STATE (several workers or nodes) the counters are the database version stamps of
+database/coordination.py instead, so every worker derives the same ETags and sees the others'
+writes within SHARED_STATE_TTL; the random 'instance' stamp takes the place of the boot nonce.
+'''
+
+_BOOT_NONCE = os.urandom(4).hex()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, stamps=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._global_version = 0
+        self._project_versions = {}
+        self._entries = OrderedDict()  # key -> (etag, body)
+        self._first_seen = OrderedDict()  # key -> (etag, monotonic time a miss first asked for it)
+        self._bytes = 0
+        self.stamps = stamps  # shared VersionStamps, None for in-process counters
+
+    def _bump_shared(self, *scopes):
+        try:
+            self.stamps.bump(*scopes)
+        except Exception as e:
+            # the write itself is committed; other workers serve stale pages until the next bump
+            logger.error(f"cache version bump of {scopes} failed: {e}")
+
+    def bump_project(self, project_id: int):
+        """A project's data changed: invalidates its ETags and the project list"""
+        if self.stamps is not None:
+            self._bump_shared("global", f"project:{project_id}")
+            return
+        with self._lock:
+            self._project_versions[project_id] = self._project_versions.get(project_id, 0) + 1
+            self._global_version += 1
+
+    def bump_all(self):
+        """Everything changed (e.g. the database was cleared)"""
+        if self.stamps is not None:
+            self._bump_shared("epoch", "global")
+        with self._lock:
+            self._epoch += 1
+            self._global_version += 1
+            self._entries.clear()
+            self._first_seen.clear()
+            self._bytes = 0
+
+    def project_etag(self, project_id: int) -> str:
+        if self.stamps is not None:
+            instance, epoch, version = self.stamps.get("instance", "epoch", f"project:{project_id}")
+            return f'"{instance:08x}-{epoch}-p{project_id}.{version}"'
+        return f'"{_BOOT_NONCE}-{self._epoch}-p{project_id}.{self._project_versions.get(project_id, 0)}"'
+
+    def list_etag(self) -> str:
+        if self.stamps is not None:
+            instance, epoch, version = self.stamps.get("instance", "epoch", "global")
+            return f'"{instance:08x}-{epoch}-g{version}"'
+        return f'"{_BOOT_NONCE}-{self._epoch}-g{self._global_version}"'
+
+    async def project_etag_async(self, project_id: int) -> str:
+        """project_etag for the async routes, the stamps refresh does not block the event loop"""
+        if self.stamps is not None:
+            instance, epoch, version = await self.stamps.get_async("instance", "epoch", f"project:{project_id}")
+            return f'"{instance:08x}-{epoch}-p{project_id}.{version}"'
+        return self.project_etag(project_id)
+
+    async def list_etag_async(self) -> str:
+        """list_etag for the async routes"""
+        if self.stamps is not None:
+            instance, epoch, version = await self.stamps.get_async("instance", "epoch", "global")
+            return f'"{instance:08x}-{epoch}-g{version}"'
+        return self.list_etag()
+
+    def get(self, key: str, etag: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def settled(self, key: str, etag: str, lag: float) -> bool:
+        """Whether the write behind etag is older than lag, i.e. a replica has it too"""
+        now = time.monotonic()
+        with self._lock:
+            seen = self._first_seen.get(key)
+            if seen is None or seen[0] != etag:
+                # the version was committed before its ETag could be read, so this is a safe bound
+                self._first_seen[key] = seen = (etag, now)
+                self._first_seen.move_to_end(key)
+                while len(self._first_seen) > 4 * self.max_entries:
+                    self._first_seen.popitem(last=False)
+            return now - seen[1] >= lag
+
+    def put(self, key: str, etag: str, body: bytes):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (etag, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def cached_json(request: Request, key: str, etag: str, produce) -> Response:
+    """Answer a GET from the ETag / rendered body cache, awaiting produce() only on a miss.
+    the ETag has to be read before producing so the cached body is at least as new as its version"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = ORJSONResponse(await produce()).body
+        if not (reads_from_primary() or response_cache.settled(key, etag, DatabaseConfig.READ_AFTER_WRITE_SECONDS)):
+            # the replica may not have this version yet: no ETag, or a 304 could keep an old body
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        response_cache.put(key, etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    max_entries=AppConfig.RESPONSE_CACHE_ENTRIES,
+    max_bytes=AppConfig.RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    stamps=version_stamps
+)
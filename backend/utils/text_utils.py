@@ -0,0 +1,58 @@
+import re
+import hashlib
+import unicodedata
+
+'''
+prompt text normalization.
+prompts typed, pasted or exported from spreadsheets often differ only in invisible ways:
+NFC vs NFD forms (common in Arabic with harakat), bidi control marks, zero-width spaces,
+byte order marks and runs of mixed whitespace. normalize_prompt maps all of these to a single
+form, so identical looking prompts compare (and hash) equal. ZWNJ / ZWJ are kept: they change
+letter joining in Arabic script (Persian, Urdu) and are part of the text.
+'''
+
+_KEEP_FORMAT_CHARS = {"\u200c", "\u200d"}  # zero width non-joiner / joiner
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _is_invisible(char: str) -> bool:
+    # Cc: control characters, Cf: format characters (bidi marks and isolates, ZWSP, BOM, soft hyphen, ...)
+    return unicodedata.category(char) in ("Cc", "Cf") and char not in _KEEP_FORMAT_CHARS and not char.isspace()
+
+
+def normalize_prompt(text: str) -> str:
+    """NFC, invisible control / format characters removed, whitespace collapsed to single spaces"""
+    text = unicodedata.normalize("NFC", text).strip()
+    if text.isprintable():
+        # no control / format characters and no whitespace but plain spaces: the common case
+        return text if "  " not in text else _WHITESPACE.sub(" ", text)
+    if not text.isascii():
+        text = "".join(char for char in text if not _is_invisible(char))
+    else:
+        text = "".join(char for char in text if char.isprintable() or char.isspace())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def prompt_hash(text: str) -> str:
+    """Deduplication key of a prompt: md5 hex of its normalized text"""
+    return hashlib.md5(normalize_prompt(text).encode()).hexdigest()
+
+
+def dedupe_prompts(prompts: list):
+    """Normalize prompts and drop empty ones and repeats, keeping the first occurrence in order.
+    Returns (prompts, hashes, duplicates_dropped)"""
+    seen = set()
+    unique, hashes = [], []
+    duplicates = 0
+    for prompt in prompts:
+        text = normalize_prompt(prompt)
+        if not text:
+            continue
+        key = hashlib.md5(text.encode()).hexdigest()
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        unique.append(text)
+        hashes.append(key)
+    return unique, hashes, duplicates
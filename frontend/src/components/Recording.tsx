@@ -6,6 +6,10 @@ const BACKEND_URL = 'http://localhost:8500';
 
 type RecordingMap = { [text: string]: string };
 
+// Opus is about a tenth of the size of WAV; the backend converts it to 16 kHz mono WAV
+const RECORDING_MIME_TYPES = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus', 'audio/mp4'];
+const RECORDING_BITS_PER_SECOND = 24000;
+
 interface Project {
   id: number;
   name: string;
@@ -23,7 +27,7 @@ function Recording() {
   const [prompts, setPrompts] = useState<string[]>([]);
   const [currentIdx, setCurrentIdx] = useState(0);
   const [recordings, setRecordings] = useState<RecordingMap>({});
-  const [existingRecordings, setExistingRecordings] = useState<{[text: string]: {filename: string, recorded_at: string}}>({});
+  const [existingRecordings, setExistingRecordings] = useState<{[text: string]: {filename: string, recorded_at: string, status: string}}>({});
   const [showRecordingsList, setShowRecordingsList] = useState(false);
   const [isRecording, setIsRecording] = useState(false);
   const [mediaRecorder, setMediaRecorder] = useState<MediaRecorder | null>(null);
@@ -80,11 +84,12 @@ function Recording() {
       const res = await fetch(`${BACKEND_URL}/projects/${projectId}/recordings`);
       if (res.ok) {
         const data = await res.json();
-        const recordingsMap: {[text: string]: {filename: string, recorded_at: string}} = {};
+        const recordingsMap: {[text: string]: {filename: string, recorded_at: string, status: string}} = {};
         data.recordings.forEach((rec: any) => {
           recordingsMap[rec.text] = {
             filename: rec.filename,
-            recorded_at: rec.recorded_at
+            recorded_at: rec.recorded_at,
+            status: rec.status
           };
         });
         setExistingRecordings(recordingsMap);
@@ -135,7 +140,8 @@ function Recording() {
     if (!navigator.mediaDevices || !project) return alert('No media devices or no project selected');
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      const mr = new MediaRecorder(stream);
+      const mimeType = RECORDING_MIME_TYPES.find((type) => MediaRecorder.isTypeSupported(type));
+      const mr = new MediaRecorder(stream, mimeType ? { mimeType, audioBitsPerSecond: RECORDING_BITS_PER_SECOND } : undefined);
       setMediaRecorder(mr);
       chunks.current = [];
       mr.ondataavailable = (e) => chunks.current.push(e.data);
@@ -145,14 +151,15 @@ function Recording() {
         
         setIsUploading(true);
         try {
-          const blob = new Blob(chunks.current, { type: 'audio/wav' });
+          const blob = new Blob(chunks.current, { type: mr.mimeType || 'audio/webm' });
+          const extension = blob.type.includes('ogg') ? 'ogg' : blob.type.includes('mp4') ? 'm4a' : 'webm';
           const url = URL.createObjectURL(blob);
           setAudioUrl(url);
           
           // Upload to backend
           const formData = new FormData();
           formData.append('text', prompts[currentIdx]);
-          formData.append('audio', new File([blob], 'audio.wav'));
+          formData.append('audio', new File([blob], `audio.${extension}`, { type: blob.type }));
           formData.append('project_id', project.id.toString());
           
           const response = await fetch(`${BACKEND_URL}/upload_audio/`, {
@@ -453,6 +460,8 @@ function Recording() {
                           {recording && (
                             <div className="text-xs text-gray-500 mt-1">
                               Recorded: {new Date(recording.recorded_at).toLocaleString()}
+                              {recording.status === 'processing' && ' (converting)'}
+                              {recording.status === 'failed' && <span className="text-red-500"> (conversion failed, record again)</span>}
                             </div>
                           )}
                         </div>